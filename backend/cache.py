@@ -0,0 +1,180 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+
+class CachedResponse:
+    __slots__ = ("body", "headers", "etag", "expires", "tags")
+
+    def __init__(self, body: bytes, headers: List[Tuple[bytes, bytes]], etag: bytes, expires: float, tags: Sequence[str]):
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        self.expires = expires
+        self.tags = tags
+
+
+def strong_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode("ascii") + b'"'
+
+
+class ResponseCache:
+    """In-process TTL + LRU store of serialized GET responses, invalidated by tag.
+
+    Any object with the same get/set/versions/invalidate methods can be
+    swapped in (e.g. one backed by a shared store) without touching the
+    middleware.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def set(self, key: str, entry: CachedResponse, versions: Tuple[int, ...]) -> bool:
+        """Store unless one of the entry's tags was invalidated since `versions` was read"""
+        if self.versions(entry.tags) != versions:
+            return False
+        self._drop(key)
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, tag: str) -> None:
+        self._versions[tag] = self._versions.get(tag, 0) + 1
+        for key in list(self._keys_by_tag.pop(tag, ())):
+            self._drop(key)
+
+    def clear(self) -> None:
+        for tag in list(self._keys_by_tag):
+            self.invalidate(tag)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def cache_key(scope, vary_headers: Sequence[bytes] = ()) -> str:
+    """Path plus normalized (sorted) query string, plus any headers the response varies on"""
+    query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+    key = scope["path"] + "?" + urlencode(sorted(query))
+    if vary_headers:
+        headers = dict(scope.get("headers") or [])
+        key += "|" + "|".join(headers.get(name, b"").decode("latin-1") for name in vary_headers)
+    return key
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == b"*":
+        return True
+    return any(candidate.strip().removeprefix(b"W/") == etag for candidate in if_none_match.split(b","))
+
+
+class ResponseCacheMiddleware:
+    """Serve cached GET responses for `routes` (exact path -> invalidation tags).
+
+    Hits skip the route handler entirely: no Mongo query and no JSON
+    serialization. Every cached response carries a strong ETag, and a
+    matching If-None-Match gets an empty 304.
+    """
+
+    def __init__(self, app, cache: ResponseCache, routes: Dict[str, Sequence[str]], vary_headers: Sequence[bytes] = ()):
+        self.app = app
+        self.cache = cache
+        self.routes = routes
+        self.vary_headers = vary_headers
+
+    async def __call__(self, scope, receive, send):
+        tags = self.routes.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if tags is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(scope, self.vary_headers)
+        if_none_match = dict(scope.get("headers") or []).get(b"if-none-match", b"")
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._send_entry(entry, if_none_match, send)
+            return
+
+        versions = self.cache.versions(tags)
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        if start.get("status") != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = [
+            (name, value) for name, value in start.get("headers", [])
+            if name not in (b"etag", b"cache-control")
+        ]
+        entry = CachedResponse(body, headers, strong_etag(body), time.monotonic() + self.cache.ttl_s, tags)
+        self.cache.set(key, entry, versions)
+        await self._send_entry(entry, if_none_match, send)
+
+    async def _send_entry(self, entry: CachedResponse, if_none_match: bytes, send) -> None:
+        cache_headers = [(b"etag", entry.etag), (b"cache-control", b"no-cache")]
+        if etag_matches(if_none_match, entry.etag):
+            self.cache.not_modified += 1
+            self.cache.bytes_saved += len(entry.body)
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": entry.headers + cache_headers})
+        await send({"type": "http.response.body", "body": entry.body})
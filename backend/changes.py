@@ -0,0 +1,138 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Set
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+COUNTER_ID = "changes"
+# Tombstones of deleted documents: {"collection", "id", "seq", "deleted_at"}
+DELETIONS_COLLECTION = "deletions"
+
+# Public collection names used by /api/changes, mapped to Mongo collections
+SYNCED_COLLECTIONS = {
+    "resources": "emergency_resources",
+    "incidents": "incidents",
+    "outages": "power_outages",
+}
+
+
+class ChangeSequence:
+    """Monotonic change numbers shared by all writers through a Mongo counter document.
+
+    Every write stamps its document with `seq`. A sequence number is handed
+    out before its document is written, so the numbers reserved but not yet
+    written are tracked, and readers stop just below the oldest of them so a
+    delta never skips a write that lands late.
+
+    A single process tracks its reservations in memory. With `shared` (several
+    workers writing), each reservation is pushed onto the counter document's
+    `inflight` list by the same update that hands out its numbers, and pulled
+    once the write is done, so every worker sees the reservations of all of
+    them. An entry records `floor`, a counter value read before reserving and
+    therefore below its numbers; entries of writers that died are ignored once
+    `expires_at` passes.
+    """
+
+    def __init__(self, db, shared: bool = False, reservation_ttl_s: float = 60.0):
+        self.db = db
+        self.shared = shared
+        self.reservation_ttl_s = reservation_ttl_s
+        self._pending: Set[int] = set()
+        # Highest counter value seen, a lower bound for the next reservation
+        self._seen = 0
+
+    async def ensure_counter(self) -> None:
+        await self.db.counters.update_one(
+            {"_id": COUNTER_ID}, {"$setOnInsert": {"value": 0}}, upsert=True
+        )
+
+    async def backfill(self) -> int:
+        """Stamp documents written before change tracking existed; returns how many"""
+        stamped = 0
+        for collection in SYNCED_COLLECTIONS.values():
+            ids = [doc["_id"] async for doc in self.db[collection].find({"seq": {"$exists": False}}, {"_id": 1})]
+            if not ids:
+                continue
+            async with self.reserve(len(ids)) as seqs:
+                await self.db[collection].bulk_write(
+                    [UpdateOne({"_id": _id, "seq": {"$exists": False}}, {"$set": {"seq": seq}}) for _id, seq in zip(ids, seqs)],
+                    ordered=False,
+                )
+            stamped += len(ids)
+        return stamped
+
+    async def head(self) -> int:
+        counter = await self.db.counters.find_one({"_id": COUNTER_ID})
+        return counter["value"] if counter else 0
+
+    async def horizon(self) -> int:
+        """Highest sequence number below which every reserved write has landed"""
+        counter = await self.db.counters.find_one({"_id": COUNTER_ID}) or {}
+        head = counter.get("value", 0)
+        self._seen = max(self._seen, head)
+        if not self.shared:
+            return min(self._pending) - 1 if self._pending else head
+        now = datetime.utcnow()
+        inflight = counter.get("inflight", [])
+        live = [entry["floor"] for entry in inflight if entry["expires_at"] > now]
+        if len(live) < len(inflight):
+            await self.db.counters.update_one(
+                {"_id": COUNTER_ID}, {"$pull": {"inflight": {"expires_at": {"$lte": now}}}}
+            )
+        return min([head] + live)
+
+    @asynccontextmanager
+    async def reserve(self, count: int = 1) -> AsyncIterator[List[int]]:
+        update: Dict[str, Any] = {"$inc": {"value": count}}
+        if self.shared:
+            if not self._seen:
+                self._seen = await self.head()
+            token = ObjectId()
+            expires_at = datetime.utcnow() + timedelta(seconds=self.reservation_ttl_s)
+            update["$push"] = {"inflight": {"token": token, "floor": self._seen, "expires_at": expires_at}}
+        counter = await self.db.counters.find_one_and_update(
+            {"_id": COUNTER_ID},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        last = counter["value"]
+        self._seen = max(self._seen, last)
+        seqs = list(range(last - count + 1, last + 1))
+        if self.shared:
+            try:
+                yield seqs
+            finally:
+                await self.db.counters.update_one({"_id": COUNTER_ID}, {"$pull": {"inflight": {"token": token}}})
+            return
+        self._pending.update(seqs)
+        try:
+            yield seqs
+        finally:
+            self._pending.difference_update(seqs)
+
+
+async def changes_since(db, since: int, horizon: int, limit: int) -> Dict[str, Any]:
+    """Documents and tombstones with `since < seq <= horizon`, oldest first.
+
+    Each collection is read up to `limit` entries past `since`. If any of them
+    had more, every list is cut at the lowest last sequence number among the
+    truncated ones, so `next_since` never skips a change.
+    """
+    query = {"seq": {"$gt": since, "$lte": horizon}}
+    names = list(SYNCED_COLLECTIONS) + ["deleted"]
+    collections = list(SYNCED_COLLECTIONS.values()) + [DELETIONS_COLLECTION]
+    results = await asyncio.gather(*(
+        db[collection].find(query, {"_id": 0, "location": 0}).sort("seq", 1).limit(limit + 1).to_list(length=None)
+        for collection in collections
+    ))
+
+    truncated = [docs[limit - 1]["seq"] for docs in results if len(docs) > limit]
+    next_since = min(truncated) if truncated else max(since, horizon)
+    body: Dict[str, Any] = {
+        name: [doc for doc in docs if doc["seq"] <= next_since] for name, docs in zip(names, results)
+    }
+    body.update(since=since, next_since=next_since, has_more=bool(truncated))
+    return body
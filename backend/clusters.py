@@ -0,0 +1,236 @@
+import math
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Clusters are grid cells CELL_BITS zoom levels finer than the tile they are
+# served in, i.e. 8x8 cells (32px at 256px tiles) per tile
+CELL_BITS = 3
+MAX_LATITUDE = 85.0511287798
+
+
+def mercator(lat: float, lng: float) -> Tuple[float, float]:
+    """Web Mercator position of a point, scaled to [0, 1) on both axes"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lng + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+def mercator_arrays(lat: np.ndarray, lng: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized `mercator`"""
+    sin_lat = np.sin(np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)))
+    x = (lng + 180.0) / 360.0
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+
+def _codes(values: Sequence[Any]) -> Tuple[List[Any], np.ndarray]:
+    """Distinct values (in first-seen order) and each value's index into them"""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+    return list(index), codes
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lng, min_lat, max_lng, max_lat) of an XYZ tile"""
+    n = 2 ** z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def tile_range(z: int, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> Iterator[Tuple[int, int]]:
+    """(x, y) of every tile at zoom `z` overlapping a bounding box"""
+    n = 2 ** z
+    west, north = mercator(max_lat, min_lng)
+    east, south = mercator(min_lat, max_lng)
+    for x in range(int(west * n), int(east * n) + 1):
+        for y in range(int(north * n), int(south * n) + 1):
+            yield x, y
+
+
+class Cell:
+    """Running aggregate of the points in one grid cell"""
+
+    __slots__ = ("count", "lat_sum", "lng_sum", "by_type", "by_priority")
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lng_sum = 0.0
+        self.by_type: Dict[str, int] = {}
+        self.by_priority: Dict[str, int] = {}
+
+    def add(self, lat: float, lng: float, type: str, priority: str, delta: int) -> None:
+        self.count += delta
+        self.lat_sum += lat * delta
+        self.lng_sum += lng * delta
+        for counts, value in ((self.by_type, type), (self.by_priority, priority)):
+            counts[value] = counts.get(value, 0) + delta
+            if counts[value] <= 0:
+                del counts[value]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "lat": round(self.lat_sum / self.count, 6),
+            "lng": round(self.lng_sum / self.count, 6),
+            "count": self.count,
+            "by_type": dict(self.by_type),
+            "by_priority": dict(self.by_priority),
+        }
+
+
+class ClusterIndex:
+    """Per-zoom grid aggregates of resource positions, for server-side map clustering.
+
+    Each zoom level from 0 to `max_zoom` keeps `Cell`s grouped by the tile
+    they fall in, so a tile is answered from at most 64 cells. Inserting or
+    removing a point touches one cell per level and drops the cached tiles
+    containing it. Above `max_zoom` tiles list the individual points, found
+    through the leaf level's member ids.
+    """
+
+    def __init__(self, max_zoom: int = 14, max_cached_tiles: int = 4096):
+        self.max_zoom = max_zoom
+        self.max_cached_tiles = max_cached_tiles
+        self.points: Dict[str, Tuple[float, float, str, str]] = {}
+        # levels[z][(tile_x, tile_y)][(cell_x, cell_y)] -> Cell
+        self.levels: List[Dict[Tuple[int, int], Dict[Tuple[int, int], Cell]]] = [{} for _ in range(max_zoom + 1)]
+        # Ids per leaf (max_zoom) cell, for point tiles above max_zoom
+        self.members: Dict[Tuple[int, int], set] = {}
+        self._tiles: "OrderedDict[Tuple[int, int, int], List[Dict[str, Any]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def clear(self) -> None:
+        self.points.clear()
+        self.levels = [{} for _ in range(self.max_zoom + 1)]
+        self.members.clear()
+        self._tiles.clear()
+
+    def load(self, keys: Sequence[str], lat: Sequence[float], lng: Sequence[float], types: Sequence[Any], priorities: Sequence[Any]) -> None:
+        """Replace the index with these points, aggregating each level with numpy"""
+        self.clear()
+        if not len(keys):
+            return
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        self.points = dict(zip(keys, zip(lat.tolist(), lng.tolist(), types, priorities)))
+        fx, fy = mercator_arrays(lat, lng)
+        breakdowns = [("by_type", *_codes(types)), ("by_priority", *_codes(priorities))]
+        for z in range(self.max_zoom + 1):
+            scale = 2 ** (z + CELL_BITS)
+            cell_x = (fx * scale).astype(np.int64)
+            cell_y = (fy * scale).astype(np.int64)
+            cell_ids, inverse, counts = np.unique(cell_x * scale + cell_y, return_inverse=True, return_counts=True)
+            lat_sums = np.bincount(inverse, weights=lat)
+            lng_sums = np.bincount(inverse, weights=lng)
+            cells = []
+            tiles = self.levels[z]
+            for cell_id, count, lat_sum, lng_sum in zip(cell_ids.tolist(), counts.tolist(), lat_sums.tolist(), lng_sums.tolist()):
+                cell = Cell()
+                cell.count, cell.lat_sum, cell.lng_sum = count, lat_sum, lng_sum
+                x, y = divmod(cell_id, scale)
+                tiles.setdefault((x >> CELL_BITS, y >> CELL_BITS), {})[(x, y)] = cell
+                cells.append(cell)
+            for attribute, values, codes in breakdowns:
+                pairs, pair_counts = np.unique(inverse * len(values) + codes, return_counts=True)
+                for pair, count in zip(pairs.tolist(), pair_counts.tolist()):
+                    cell_index, code = divmod(pair, len(values))
+                    getattr(cells[cell_index], attribute)[values[code]] = count
+
+        # The max_zoom cells also keep their member ids
+        grouped = np.asarray(keys, dtype=object)[np.argsort(inverse, kind="stable")]
+        for cell_id, members in zip(cell_ids.tolist(), np.split(grouped, np.cumsum(counts)[:-1])):
+            self.members[divmod(cell_id, scale)] = set(members.tolist())
+
+    def _apply(self, key: str, lat: float, lng: float, type: str, priority: str, delta: int) -> None:
+        fx, fy = mercator(lat, lng)
+        for z, tiles in enumerate(self.levels):
+            scale = 2 ** (z + CELL_BITS)
+            cell_key = (int(fx * scale), int(fy * scale))
+            tile_key = (cell_key[0] >> CELL_BITS, cell_key[1] >> CELL_BITS)
+            cells = tiles.setdefault(tile_key, {})
+            cell = cells.get(cell_key)
+            if cell is None:
+                cell = cells[cell_key] = Cell()
+            cell.add(lat, lng, type, priority, delta)
+            if cell.count <= 0:
+                del cells[cell_key]
+                if not cells:
+                    del tiles[tile_key]
+            self._tiles.pop((z,) + tile_key, None)
+        leaf = self.max_zoom + CELL_BITS
+        leaf_key = (int(fx * 2 ** leaf), int(fy * 2 ** leaf))
+        if delta > 0:
+            self.members.setdefault(leaf_key, set()).add(key)
+        else:
+            members = self.members.get(leaf_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self.members[leaf_key]
+
+    def insert(self, key: str, lat: float, lng: float, type: Optional[str], priority: Optional[str]) -> None:
+        record = (lat, lng, type, priority)
+        previous = self.points.get(key)
+        if previous == record:
+            return
+        if previous is not None:
+            self._apply(key, *previous, -1)
+        self.points[key] = record
+        self._apply(key, *record, 1)
+
+    def remove(self, key: str) -> None:
+        previous = self.points.pop(key, None)
+        if previous is not None:
+            self._apply(key, *previous, -1)
+
+    def tile(self, z: int, x: int, y: int) -> List[Dict[str, Any]]:
+        """Clusters (or, above max_zoom, individual points) inside tile z/x/y"""
+        if z > self.max_zoom:
+            return self._point_tile(z, x, y)
+        key = (z, x, y)
+        clusters = self._tiles.get(key)
+        if clusters is None:
+            cells = self.levels[z].get((x, y), {})
+            clusters = [cells[cell_key].summary() for cell_key in sorted(cells)]
+            self._tiles[key] = clusters
+            while len(self._tiles) > self.max_cached_tiles:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return clusters
+
+    def _point_tile(self, z: int, x: int, y: int) -> List[Dict[str, Any]]:
+        leaf = self.max_zoom + CELL_BITS
+        scale = 2 ** z
+        points = []
+        if z >= leaf:
+            # The whole tile lies inside one leaf cell
+            shift = z - leaf
+            candidates = self.members.get((x >> shift, y >> shift), ())
+        else:
+            shift = leaf - z
+            candidates = [
+                key
+                for cell_x in range(x << shift, (x + 1) << shift)
+                for cell_y in range(y << shift, (y + 1) << shift)
+                for key in self.members.get((cell_x, cell_y), ())
+            ]
+        for key in candidates:
+            lat, lng, type, priority = self.points[key]
+            fx, fy = mercator(lat, lng)
+            if int(fx * scale) == x and int(fy * scale) == y:
+                points.append({
+                    "id": key, "lat": lat, "lng": lng, "count": 1,
+                    "by_type": {type: 1}, "by_priority": {priority: 1},
+                })
+        points.sort(key=lambda point: point["id"])
+        return points
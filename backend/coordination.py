@@ -0,0 +1,226 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.cursor import CursorType
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+
+LOCKS_COLLECTION = "locks"
+EVENTS_COLLECTION = "worker_events"
+# Error code of a tailable cursor whose position the capped collection overwrote
+CAPPED_POSITION_LOST = 136
+
+
+def worker_id() -> str:
+    """Identity of this worker process, unique across hosts"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def deployment_id() -> str:
+    """Identity of the supervisor (uvicorn or gunicorn master) that started this worker.
+
+    Workers it respawns share it. Deployments spanning several hosts should
+    set DEPLOYMENT_ID to one value for all of them (a release or boot id).
+    """
+    return os.environ.get("DEPLOYMENT_ID") or f"{socket.gethostname()}:{os.getppid()}"
+
+
+class LeaderLock:
+    """Lease-based lock held in a Mongo document, for work one worker should do on behalf of all.
+
+    The lock document is `{_id: name, owner, expires_at, completed_at, completed_for}`.
+    Acquiring is a single upsert that only matches a free or expired lease;
+    when another worker holds it the upsert collides with the existing `_id`
+    and fails. A holder that dies simply stops renewing, and the lease
+    passes on once `expires_at` is reached.
+    """
+
+    def __init__(self, db, name: str, owner: str, ttl_s: float = 30.0):
+        self.db = db
+        self.name = name
+        self.owner = owner
+        self.ttl_s = ttl_s
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.db[LOCKS_COLLECTION].find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": None}, {"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_s), "acquired_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def renew(self) -> bool:
+        result = await self.db[LOCKS_COLLECTION].update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_s)}},
+        )
+        return result.matched_count == 1
+
+    async def release(self, completed_for: Optional[str] = None) -> None:
+        """Give up the lease; `completed_for` records that the work finished for that run"""
+        update: Dict[str, Any] = {"owner": None, "expires_at": None}
+        if completed_for is not None:
+            update.update(completed_at=datetime.utcnow(), completed_for=completed_for)
+        await self.db[LOCKS_COLLECTION].update_one({"_id": self.name, "owner": self.owner}, {"$set": update})
+
+    async def state(self) -> Optional[Dict[str, Any]]:
+        return await self.db[LOCKS_COLLECTION].find_one({"_id": self.name})
+
+    async def _keep_renewed(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_s / 3)
+            try:
+                if not await self.renew():
+                    print(f"Lock {self.name} was taken over while {self.owner} held it")
+            except Exception as e:
+                # Keep trying: the lease is still ours until expires_at
+                print(f"Renewing lock {self.name} failed: {e}")
+
+    async def run_once(self, work: Callable[[], Awaitable[None]], run_id: str, poll_s: float = 0.2) -> bool:
+        """Run `work` unless another worker is running it or it already completed for `run_id`.
+
+        `run_id` identifies the deployment (see `deployment_id`), so workers
+        restarted or added later by the same supervisor skip the work, while
+        a new deployment runs it again. Workers that find the lock held wait
+        for it to be released, so none of them goes on before the shared
+        work is done. Returns True if this worker ran it. The work should be
+        idempotent: if a holder dies, the next worker runs it again.
+        """
+        while True:
+            state = await self.state()
+            held = state is not None and state.get("owner") and state.get("expires_at") and state["expires_at"] > datetime.utcnow()
+            if not held and state is not None and state.get("completed_for") == run_id:
+                return False
+            if not held and await self.acquire():
+                renewer = asyncio.create_task(self._keep_renewed())
+                completed = False
+                try:
+                    await work()
+                    completed = True
+                finally:
+                    renewer.cancel()
+                    await self.release(run_id if completed else None)
+                return True
+            await asyncio.sleep(poll_s)
+
+
+class WorkerBus:
+    """Fan-out of change messages between the workers sharing a database.
+
+    Messages go into a capped collection that every worker tails, applying
+    the ones other workers wrote. Capped collections keep insertion order
+    and support tailable cursors on a standalone server, so no replica set
+    is needed. A worker resumes after the last message it saw; if that
+    message has been overwritten in the meantime (the collection wrapped),
+    it cannot know what it missed and `on_gap` is called to reload.
+    Publishing is fire-and-forget: `publish` queues the message and a
+    background task inserts queued messages in batches.
+    """
+
+    def __init__(self, db, origin: str, size_bytes: int = 64 * 1024 * 1024, poll_s: float = 0.1):
+        self.db = db
+        self.origin = origin
+        self.size_bytes = size_bytes
+        self.poll_s = poll_s
+        self._outbox: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self.published = 0
+        self.received = 0
+        self.gaps = 0
+        self.errors = 0
+
+    async def ensure(self) -> None:
+        try:
+            await self.db.create_collection(EVENTS_COLLECTION, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self._outbox.append({**message, "origin": self.origin})
+        self._wakeup.set()
+
+    async def run_publisher(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch, self._outbox = self._outbox, []
+            try:
+                await self.db[EVENTS_COLLECTION].insert_many(batch, ordered=True)
+                self.published += len(batch)
+            except Exception as e:
+                print(f"Worker bus publish of {len(batch)} messages failed, retrying: {e}")
+                self._outbox[:0] = batch
+                await asyncio.sleep(self.poll_s)
+                self._wakeup.set()
+
+    async def position(self):
+        """Id of the newest message, to pass to `run_subscriber` as `after`"""
+        last = await self.db[EVENTS_COLLECTION].find({}, {"_id": 1}).sort("$natural", -1).limit(1).to_list(length=1)
+        return last[0]["_id"] if last else None
+
+    async def run_subscriber(
+        self, apply: Callable[[Dict[str, Any]], None], on_gap: Callable[[], Awaitable[None]], after: Any = None
+    ) -> None:
+        """Apply other workers' messages as they arrive, starting after message `after` (None: from the first)"""
+        last_seen = after
+        gap = False
+        retry_in = self.poll_s
+        while True:
+            try:
+                if gap:
+                    # last_seen is gone from the capped collection: messages were missed
+                    last_seen = await self.position()
+                    await on_gap()
+                    gap = False
+                # Tailable cursors cannot filter by position (ObjectIds from different
+                # processes are not ordered), so skip in natural order up to last_seen
+                skipping = last_seen is not None
+                cursor = self.db[EVENTS_COLLECTION].find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                try:
+                    async for message in cursor:
+                        if skipping:
+                            skipping = message["_id"] != last_seen
+                            continue
+                        last_seen = message["_id"]
+                        if message.get("origin") != self.origin:
+                            self.received += 1
+                            try:
+                                apply(message)
+                            except Exception as e:
+                                print(f"Worker bus message {message.get('event')} could not be applied: {e}")
+                finally:
+                    await cursor.close()
+                gap = skipping
+            except OperationFailure as e:
+                if e.code != CAPPED_POSITION_LOST:
+                    self._failed(e, retry_in)
+                    await asyncio.sleep(retry_in)
+                    retry_in = min(retry_in * 2, 5.0)
+                    continue
+                # The collection wrapped past the open cursor
+                gap = True
+            except Exception as e:
+                # Failover or network error: reconnect and resume after last_seen
+                self._failed(e, retry_in)
+                await asyncio.sleep(retry_in)
+                retry_in = min(retry_in * 2, 5.0)
+                continue
+            if gap:
+                self.gaps += 1
+            retry_in = self.poll_s
+            await asyncio.sleep(self.poll_s)
+
+    def _failed(self, error: Exception, retry_in: float) -> None:
+        self.errors += 1
+        print(f"Worker bus subscription failed, retrying in {retry_in:.2f}s: {error}")
+
+    def stats(self) -> Dict[str, float]:
+        return {"outbox": len(self._outbox), "published": self.published, "received": self.received, "gaps": self.gaps, "errors": self.errors}
@@ -0,0 +1,104 @@
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import geo
+
+
+def timestamp(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds of a stored ISO timestamp, or None if missing or malformed"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class IncidentDeduplicator:
+    """Open incidents with a recent report, spatially hashed for duplicate matching.
+
+    A new report duplicates an open incident of the same type whose location
+    is within `distance_m` and whose latest report is within `window_s`.
+    Incidents are kept on a grid with cells about `distance_m` wide, so a
+    match only looks at the neighbouring cells. Entries older than the
+    window are dropped lazily.
+    """
+
+    def __init__(self, distance_m: float = 200.0, window_s: float = 1800.0):
+        self.distance_m = distance_m
+        self.window_s = window_s
+        self.grid = geo.GridIndex(cell_deg=max(distance_m / geo.METERS_PER_DEGREE, 1e-4))
+        self._inserting: Dict[str, asyncio.Event] = {}
+        self._pruned_at = 0.0
+        self.merged = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.distance_m > 0 and self.window_s > 0
+
+    def __len__(self) -> int:
+        return len(self.grid)
+
+    def load(self, incidents: Iterable[Dict[str, Any]], now: float) -> None:
+        """Replace the tracked set with the open incidents reported within the window"""
+        self.grid.clear()
+        for incident in incidents:
+            reported = timestamp(incident.get("last_reported_at") or incident.get("reported_at"))
+            if reported is not None and now - reported <= self.window_s:
+                self.track(incident["id"], incident["lat"], incident["lng"], incident.get("type"), reported)
+        self._pruned_at = now
+
+    def track(self, incident_id: str, lat: float, lng: float, type: Optional[str], reported: float) -> None:
+        self.grid.insert(incident_id, lat, lng, (type, reported))
+
+    def touch(self, incident_id: str, reported: float) -> None:
+        """Record another report for a tracked incident; its location stays that of the first report"""
+        entry = self.grid.get(incident_id)
+        if entry is not None:
+            lat, lng, (type, last) = entry
+            self.track(incident_id, lat, lng, type, max(last, reported))
+
+    def forget(self, incident_id: str) -> None:
+        self.grid.remove(incident_id)
+
+    def match(self, lat: float, lng: float, type: Optional[str], reported: float) -> Optional[str]:
+        """Id of the nearest open incident this report duplicates, if any"""
+        if reported - self._pruned_at > self.window_s / 10:
+            self._prune(reported)
+        hits = self.grid.within_radius(
+            lat, lng, self.distance_m,
+            where=lambda data: data[0] == type and abs(reported - data[1]) <= self.window_s,
+        )
+        return hits[0][0] if hits else None
+
+    def _prune(self, now: float) -> None:
+        stale = [key for key, (_, _, (_, last)) in self.grid.items() if now - last > self.window_s]
+        for key in stale:
+            self.grid.remove(key)
+        self._pruned_at = now
+
+    def begin_insert(self, incident_id: str) -> None:
+        """Mark an incident as being written so concurrent duplicates wait for it to exist"""
+        self._inserting[incident_id] = asyncio.Event()
+
+    def end_insert(self, incident_id: str, failed: bool = False) -> None:
+        if failed:
+            self.forget(incident_id)
+        event = self._inserting.pop(incident_id, None)
+        if event is not None:
+            event.set()
+
+    @contextmanager
+    def inserting(self, incident_id: str) -> Iterator[None]:
+        self.begin_insert(incident_id)
+        try:
+            yield
+        except BaseException:
+            self.end_insert(incident_id, failed=True)
+            raise
+        self.end_insert(incident_id)
+
+    async def inserted(self, incident_id: str) -> None:
+        event = self._inserting.get(incident_id)
+        if event is not None:
+            await event.wait()
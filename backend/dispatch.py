@@ -0,0 +1,173 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geo import EARTH_RADIUS_M
+
+# Similarity matrix cells computed at once in batch mode (bounds memory to ~64 MB)
+BATCH_CELLS = 8_000_000
+CODED_FIELDS = ("type", "status", "priority")
+
+
+class ResourceArrays:
+    """Resource positions and dispatch attributes as numpy columns, one row per resource.
+
+    Maintained in place by the resource write handlers: inserts append
+    (the arrays grow geometrically), updates overwrite their row and deletes
+    clear the row's `alive` flag until the next `load`. Type, status and
+    priority are stored as integer codes so filters are vectorized compares.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._allocate(initial_capacity)
+        self.rows: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.codes: Dict[str, Dict[Any, int]] = {field: {} for field in CODED_FIELDS}
+
+    def _allocate(self, capacity: int) -> None:
+        self.lat_rad = np.zeros(capacity)
+        self.lng_rad = np.zeros(capacity)
+        self.cos_lat = np.zeros(capacity)
+        self.xyz = np.zeros((capacity, 3))
+        self.capacity = np.full(capacity, np.nan)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.columns = {field: np.zeros(capacity, dtype=np.int32) for field in CODED_FIELDS}
+
+    def _grow(self, needed: int) -> None:
+        size = len(self.lat_rad)
+        if needed <= size:
+            return
+        extra = max(needed, size * 2) - size
+        for name in ("lat_rad", "lng_rad", "cos_lat", "xyz", "capacity", "alive"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros((extra,) + array.shape[1:], dtype=array.dtype)]))
+        for field, array in self.columns.items():
+            self.columns[field] = np.concatenate([array, np.zeros(extra, dtype=array.dtype)])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def code(self, field: str, value: Any) -> int:
+        """Integer code of a field value, allocated on first sight"""
+        codes = self.codes[field]
+        return codes.setdefault(value, len(codes))
+
+    def load(self, resources: Sequence[Dict[str, Any]]) -> None:
+        count = len(resources)
+        self._allocate(max(1024, count))
+        self.ids = [resource["id"] for resource in resources]
+        self.rows = {resource_id: row for row, resource_id in enumerate(self.ids)}
+        self.codes = {field: {} for field in CODED_FIELDS}
+        lat = np.radians(np.fromiter((resource["lat"] for resource in resources), dtype=np.float64, count=count))
+        lng = np.radians(np.fromiter((resource["lng"] for resource in resources), dtype=np.float64, count=count))
+        self.lat_rad[:count] = lat
+        self.lng_rad[:count] = lng
+        self.cos_lat[:count] = np.cos(lat)
+        self.xyz[:count] = unit_vectors(lat, lng)
+        self.capacity[:count] = [np.nan if resource.get("capacity") is None else resource["capacity"] for resource in resources]
+        for field in CODED_FIELDS:
+            self.columns[field][:count] = [self.code(field, resource.get(field)) for resource in resources]
+        self.alive[:count] = True
+
+    def upsert(self, resource: Dict[str, Any]) -> None:
+        row = self.rows.get(resource["id"])
+        if row is None:
+            row = len(self.ids)
+            self._grow(row + 1)
+            self.rows[resource["id"]] = row
+            self.ids.append(resource["id"])
+        lat = math.radians(resource["lat"])
+        lng = math.radians(resource["lng"])
+        self.lat_rad[row] = lat
+        self.lng_rad[row] = lng
+        self.cos_lat[row] = math.cos(lat)
+        self.xyz[row] = (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+        capacity = resource.get("capacity")
+        self.capacity[row] = np.nan if capacity is None else capacity
+        for field in CODED_FIELDS:
+            self.columns[field][row] = self.code(field, resource.get(field))
+        self.alive[row] = True
+
+    def remove(self, resource_id: str) -> None:
+        row = self.rows.pop(resource_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.ids[row] = None
+
+    def candidates(
+        self,
+        type: Optional[str] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+    ) -> np.ndarray:
+        """Rows of the live resources matching every given filter"""
+        count = len(self.ids)
+        mask = self.alive[:count].copy()
+        for field, value in (("type", type), ("status", status), ("priority", priority)):
+            if value is None:
+                continue
+            code = self.codes[field].get(value)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.columns[field][:count] == code
+        if min_capacity is not None:
+            # NaN (unknown capacity) compares False, so those resources drop out
+            with np.errstate(invalid="ignore"):
+                mask &= self.capacity[:count] >= min_capacity
+        return np.flatnonzero(mask)
+
+    def nearest(
+        self,
+        points: Sequence[Tuple[float, float]],
+        k: int,
+        rows: np.ndarray,
+        max_distance_m: Optional[float] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """The `k` nearest candidate rows to each (lat, lng), as (id, distance_m) lists nearest first.
+
+        Great-circle distance falls as the dot product of unit vectors rises,
+        so candidates are ranked with one matrix product per block of points;
+        haversine distances are then computed for the k winners only.
+        """
+        if not len(points):
+            return []
+        if not len(rows) or k <= 0:
+            return [[] for _ in points]
+        k = min(k, len(rows))
+        points = np.radians(np.asarray(points, dtype=np.float64))
+        candidates = self.xyz[rows]
+        chunk = max(1, BATCH_CELLS // len(rows))
+        results: List[List[Tuple[str, float]]] = []
+        for start in range(0, len(points), chunk):
+            block = points[start:start + chunk]
+            similarity = unit_vectors(block[:, 0], block[:, 1]) @ candidates.T
+            if k < len(rows):
+                top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(len(rows)), similarity.shape)
+            top_rows = rows[top]
+            distances = haversine_m(block[:, :1], block[:, 1:], self.lat_rad[top_rows], self.lng_rad[top_rows], self.cos_lat[top_rows])
+            order = np.argsort(distances, axis=1, kind="stable")
+            top_rows = np.take_along_axis(top_rows, order, axis=1)
+            distances = np.take_along_axis(distances, order, axis=1)
+            for ranked_rows, ranked_distances in zip(top_rows.tolist(), distances.tolist()):
+                results.append([
+                    (self.ids[row], distance)
+                    for row, distance in zip(ranked_rows, ranked_distances)
+                    if max_distance_m is None or distance <= max_distance_m
+                ])
+        return results
+
+
+def unit_vectors(lat_rad: np.ndarray, lng_rad: np.ndarray) -> np.ndarray:
+    """(n, 3) points on the unit sphere"""
+    cos_lat = np.cos(lat_rad)
+    return np.stack([cos_lat * np.cos(lng_rad), cos_lat * np.sin(lng_rad), np.sin(lat_rad)], axis=-1)
+
+
+def haversine_m(lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray, cos_lat2: np.ndarray) -> np.ndarray:
+    """Vectorized haversine (radian inputs, broadcasting), with cos(lat2) precomputed"""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * cos_lat2 * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
@@ -0,0 +1,182 @@
+import gzip
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import msgpack
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# MessagePack body whose document lists are replaced by parallel column arrays
+COLUMNAR = "application/vnd.emergency.columnar+msgpack"
+MEDIA_TYPE_ALIASES = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    COLUMNAR: COLUMNAR,
+}
+
+# Columns sent as little-endian float32 (about 0.2 m of precision in Israel)
+FLOAT32_FIELDS = ("lat", "lng", "distance_m")
+# Columns sent as small integer codes into a per-response list of values
+ENUM_FIELDS = ("type", "status", "priority")
+
+
+def _weighted(header: str) -> Iterator[Tuple[str, float]]:
+    """(token, q) pairs of an Accept / Accept-Encoding header"""
+    for part in header.split(","):
+        token, *params = (piece.strip() for piece in part.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token:
+            yield token.lower(), q
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Media type to respond with for an Accept header; JSON unless another is preferred"""
+    best, best_q = JSON, 0.0
+    for media_type, q in _weighted(accept or ""):
+        media_type = MEDIA_TYPE_ALIASES.get(media_type)
+        if media_type is not None and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def _binary(values: np.ndarray) -> Dict[str, Any]:
+    return {"dtype": values.dtype.str, "data": values.tobytes()}
+
+
+def columns(docs: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Parallel arrays, one per field, for a list of documents.
+
+    Float fields become float32 buffers (missing values are NaN), enum fields
+    become uint8/uint16 code buffers plus their `values`, and everything else
+    stays a plain array. A field missing from a document is sent as None.
+    """
+    names: Dict[str, None] = {}
+    for doc in docs:
+        names.update(dict.fromkeys(doc))
+
+    encoded: Dict[str, Any] = {}
+    for name in names:
+        values = [doc.get(name) for doc in docs]
+        if name in FLOAT32_FIELDS:
+            encoded[name] = _binary(np.array([np.nan if v is None else v for v in values], dtype="<f4"))
+        elif name in ENUM_FIELDS:
+            index: Dict[Any, int] = {}
+            codes = [index.setdefault(value, len(index)) for value in values]
+            column = _binary(np.array(codes, dtype="<u1" if len(index) <= 256 else "<u2"))
+            column["values"] = list(index)
+            encoded[name] = column
+        else:
+            encoded[name] = values
+    return {"count": len(docs), "columns": encoded}
+
+
+def respond(accept: Optional[str], body: Dict[str, Any], list_key: str) -> Response:
+    """Encode a list endpoint's body as JSON, MessagePack or columnar per the Accept header"""
+    media_type = negotiate(accept)
+    headers = {"Vary": "Accept"}
+    if media_type == JSON:
+        return JSONResponse(body, headers=headers)
+    if media_type == COLUMNAR:
+        body = {**body, list_key: columns(body[list_key])}
+    return Response(msgpack.packb(body, use_bin_type=True, default=str), media_type=media_type, headers=headers)
+
+
+# Content types worth compressing (prefix match)
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/vnd.", "application/geo+json", "text/")
+
+
+def choose_coding(header: bytes) -> Optional[str]:
+    """Preferred content coding the client accepts: brotli when available, else gzip"""
+    codings = [coding for coding, q in _weighted(header.decode("latin-1")) if q > 0]
+    if brotli is not None and "br" in codings:
+        return "br"
+    if "gzip" in codings or "*" in codings:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, coding: str, gzip_level: int = 5, brotli_quality: int = 4) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    """Brotli/gzip for complete (non-streaming) responses.
+
+    Streaming responses such as /api/stream and exports pass through
+    untouched so events are never held back in a compressor buffer. The
+    ETag of a compressed response is weakened, since it names the
+    uncompressed representation.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = choose_coding(dict(scope.get("headers") or []).get(b"accept-encoding", b""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Dict[str, Any] = {}
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._compressible(start, body):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            compressed = compress(body, coding, self.gzip_level, self.brotli_quality)
+            headers = [
+                (name, b"W/" + value if name == b"etag" and not value.startswith(b"W/") else value)
+                for name, value in start.get("headers", [])
+                if name != b"content-length"
+            ]
+            headers += [
+                (b"content-encoding", coding.encode("ascii")),
+                (b"content-length", str(len(compressed)).encode("ascii")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
+
+    def _compressible(self, start: Dict[str, Any], body: bytes) -> bool:
+        if len(body) < self.minimum_size or start.get("status") in (204, 304):
+            return False
+        headers = dict(start.get("headers", []))
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
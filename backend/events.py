@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional, Set, Tuple
+
+# Sent to a subscriber whose queue overflowed: its backlog was dropped and it
+# should refetch the REST endpoints instead of trusting the event stream
+RESYNC_EVENT = "resync"
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+def sse_frame(event_id: int, event_type: str, data: Any) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def topic_of(event_type: str) -> str:
+    """`incident.created` -> `incident`"""
+    return event_type.split(".", 1)[0]
+
+
+class Subscriber:
+    def __init__(self, position: int, topics: Optional[Set[str]] = None):
+        self.position = position
+        self.topics = topics
+        self.delivered = 0
+        self.overflows = 0
+
+    def wants(self, topic: str) -> bool:
+        # Every subscriber has to hear that it missed events, whatever its topics
+        return self.topics is None or topic in self.topics or topic == RESYNC_EVENT
+
+
+class Broadcaster:
+    """Single in-process fan-out point for change events.
+
+    Events are serialized once into SSE frames and appended to a bounded
+    shared log; publishing is O(1) and never waits on a client. Each
+    subscriber only keeps its position in the log and drains everything it
+    missed in one chunk, so a slow client costs nothing until it falls off
+    the end of the log, at which point it gets a `resync` event and skips
+    ahead to the present.
+    """
+
+    def __init__(self, buffer_size: int = 1024):
+        self.subscribers: Set[Subscriber] = set()
+        self._log: Deque[Tuple[int, str, bytes]] = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    @property
+    def published(self) -> int:
+        return self._seq
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscriber:
+        subscriber = Subscriber(self._seq, set(topics) if topics else None)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def _notify(self) -> None:
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        self._seq += 1
+        self._log.append((self._seq, topic_of(event_type), sse_frame(self._seq, event_type, data)))
+        if self.subscribers:
+            self._notify()
+        return self._seq
+
+    def heartbeat(self) -> None:
+        """Wake every subscriber; idle ones send a comment frame so proxies keep the connection"""
+        self._notify()
+
+    async def run_heartbeat(self, interval_s: float = 15.0) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            self.heartbeat()
+
+    def _pending(self, subscriber: Subscriber) -> bytes:
+        """Frames published since the subscriber's position, advancing it"""
+        if subscriber.position >= self._seq:
+            return b""
+        oldest = self._log[0][0]
+        if subscriber.position + 1 < oldest:
+            subscriber.overflows += 1
+            self.dropped += 1
+            subscriber.position = self._seq
+            return sse_frame(self._seq, RESYNC_EVENT, {"reason": "slow consumer"})
+        frames = [
+            frame
+            for _, topic, frame in itertools.islice(self._log, subscriber.position + 1 - oldest, None)
+            if subscriber.wants(topic)
+        ]
+        subscriber.position = self._seq
+        subscriber.delivered += len(frames)
+        return b"".join(frames)
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """SSE body for one subscriber; unsubscribes when the client goes away"""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                wakeup = self._wakeup
+                chunk = self._pending(subscriber)
+                if chunk:
+                    yield chunk
+                    continue
+                await wakeup.wait()
+                if subscriber.position >= self._seq:
+                    yield HEARTBEAT_FRAME
+        finally:
+            self.unsubscribe(subscriber)
+
+
+CHANGE_STREAM_TOPICS = {
+    "emergency_resources": "resource",
+    "incidents": "incident",
+    "power_outages": "outage",
+}
+
+CHANGE_STREAM_ACTIONS = {
+    "insert": "created",
+    "update": "updated",
+    "replace": "updated",
+}
+
+# Deletions are announced from their tombstones, which carry the public `id`
+# that the delete event itself no longer has. Keys are the tombstones'
+# `collection` names (see changes.SYNCED_COLLECTIONS)
+TOMBSTONE_COLLECTION = "deletions"
+TOMBSTONE_TOPICS = {
+    "resources": "resource",
+    "incidents": "incident",
+    "outages": "outage",
+}
+
+# A resume token older than the oplog window cannot be resumed from
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+def _change_event(change: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(event type, data) to broadcast for one change stream event, or None to skip it"""
+    collection = change["ns"]["coll"]
+    document = change.get("fullDocument") or {}
+    if collection == TOMBSTONE_COLLECTION:
+        topic = TOMBSTONE_TOPICS.get(document.get("collection"))
+        if change["operationType"] != "insert" or topic is None:
+            return None
+        return f"{topic}.deleted", {"id": document["id"]}
+    action = CHANGE_STREAM_ACTIONS.get(change["operationType"])
+    if action is None:
+        return None
+    document.pop("_id", None)
+    document.pop("location", None)
+    return f"{CHANGE_STREAM_TOPICS[collection]}.{action}", document
+
+
+async def watch_change_streams(db, broadcaster: Broadcaster, retry_max_s: float = 5.0) -> None:
+    """Publish Mongo change stream events (requires a replica set) instead of in-process writes.
+
+    This keeps every worker's broadcaster in sync no matter which process
+    handled the write. When the stream fails it is reopened after the last
+    event published, backing off up to `retry_max_s`.
+    """
+    from pymongo.errors import OperationFailure, PyMongoError
+
+    pipeline = [{"$match": {"ns.coll": {"$in": list(CHANGE_STREAM_TOPICS) + [TOMBSTONE_COLLECTION]}}}]
+    resume_token = None
+    retry_in = 0.1
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                retry_in = 0.1
+                async for change in stream:
+                    event = _change_event(change)
+                    if event is not None:
+                        broadcaster.publish(*event)
+                    resume_token = stream.resume_token
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAM_HISTORY_LOST:
+                print(f"Change stream failed, resuming in {retry_in:.2f}s: {e}")
+            else:
+                # Events were missed; subscribers have to refetch
+                print(f"Change stream history lost, restarting from now: {e}")
+                resume_token = None
+                broadcaster.publish(RESYNC_EVENT, {"reason": "change stream history lost"})
+        except PyMongoError as e:
+            print(f"Change stream failed, resuming in {retry_in:.2f}s: {e}")
+        await asyncio.sleep(retry_in)
+        retry_in = min(retry_in * 2, retry_max_s)
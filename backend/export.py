@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List
+
+# Flush to the client once this many bytes are buffered
+CHUNK_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "geojson": "application/geo+json",
+    "csv": "text/csv; charset=utf-8",
+}
+
+EXTENSIONS = {
+    "ndjson": "ndjson",
+    "geojson": "geojson",
+    "csv": "csv",
+}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def geometry(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """GeoJSON geometry for a resource/incident point or an outage polygon"""
+    if "coordinates" in doc and doc["coordinates"]:
+        # Outage polygons are stored as [lat, lng] pairs; GeoJSON wants a closed [lng, lat] ring
+        ring = [[lng, lat] for lat, lng in doc["coordinates"]]
+        if ring[0] != ring[-1]:
+            ring.append(ring[0])
+        return {"type": "Polygon", "coordinates": [ring]}
+    return {"type": "Point", "coordinates": [doc.get("lng"), doc.get("lat")]}
+
+
+def feature(doc: Dict[str, Any]) -> Dict[str, Any]:
+    properties = {key: value for key, value in doc.items() if key not in ("coordinates", "location")}
+    return {"type": "Feature", "id": doc.get("id"), "geometry": geometry(doc), "properties": properties}
+
+
+async def ndjson_lines(docs: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for doc in docs:
+        yield _dumps(doc) + "\n"
+
+
+async def geojson_lines(docs: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    yield '{"type":"FeatureCollection","features":['
+    separator = ""
+    async for doc in docs:
+        yield separator + _dumps(feature(doc))
+        separator = ","
+    yield "]}\n"
+
+
+async def csv_lines(docs: AsyncIterator[Dict[str, Any]], columns: List[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(values: Iterable[Any]) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield row(columns)
+    async for doc in docs:
+        yield row(
+            _dumps(doc.get(column)) if isinstance(doc.get(column), (list, dict)) else doc.get(column)
+            for column in columns
+        )
+
+
+async def chunked(lines: AsyncIterator[str], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Coalesce small text pieces into ~chunk_size byte chunks for the response body.
+
+    The first piece is sent on its own so clients see bytes immediately.
+    """
+    pending: List[bytes] = []
+    size = 0
+    first = True
+    async for line in lines:
+        data = line.encode("utf-8")
+        if first:
+            first = False
+            yield data
+            continue
+        pending.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b"".join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield b"".join(pending)
+
+
+def stream(docs: AsyncIterator[Dict[str, Any]], format: str, columns: List[str]) -> AsyncIterator[bytes]:
+    if format == "ndjson":
+        lines = ndjson_lines(docs)
+    elif format == "geojson":
+        lines = geojson_lines(docs)
+    elif format == "csv":
+        lines = csv_lines(docs, columns)
+    else:
+        raise ValueError(f"unsupported format: {format}")
+    return chunked(lines)
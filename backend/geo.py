@@ -0,0 +1,297 @@
+import math
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+
+def point(lat: float, lng: float) -> Dict[str, Any]:
+    """GeoJSON point for a lat/lng pair (GeoJSON orders coordinates lng, lat)"""
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse `min_lng,min_lat,max_lng,max_lat` (Leaflet's toBBoxString order)"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be 'min_lng,min_lat,max_lng,max_lat'")
+    if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lng <= max_lng <= 180):
+        raise ValueError("bbox is out of range or inverted")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def parse_latlng(value: str) -> Tuple[float, float]:
+    """Parse `lat,lng`"""
+    try:
+        lat, lng = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("point must be 'lat,lng'")
+    if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+        raise ValueError("point is out of range")
+    return lat, lng
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lng: float, precision: int) -> str:
+    """Geohash of a point; each extra character divides the cell into 32"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def geohash_bounds(cell: str) -> Tuple[float, float, float, float]:
+    """(min_lng, min_lat, max_lng, max_lat) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lng_range[0], lat_range[0], lng_range[1], lat_range[1]
+
+
+def _geodesic_bulge(lat: float, half_span_deg: float) -> float:
+    """Degrees by which the geodesic between two points on parallel `lat`, `2 * half_span_deg` apart, bows poleward"""
+    peak = math.degrees(math.atan(math.tan(math.radians(lat)) / math.cos(math.radians(half_span_deg))))
+    return abs(peak - lat)
+
+
+def bbox_query(min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> Dict[str, Any]:
+    """Mongo filter matching documents whose lat/lng lie in a bounding box (narrowed by the 2dsphere index).
+
+    `$geoWithin` polygon edges are geodesics, which bow toward the pole from
+    the parallels they join; across a country-wide box the edge nearer the
+    equator would drop points a few hundred metres inside it. The polygon is
+    widened by that bow and plain lat/lng ranges then select exactly the
+    rectangle, matching GridIndex.within_bbox.
+    """
+    query: Dict[str, Any] = {"lat": {"$gte": min_lat, "$lte": max_lat}, "lng": {"$gte": min_lng, "$lte": max_lng}}
+    half_span = (max_lng - min_lng) / 2
+    if half_span >= 90:
+        # Too wide for a polygon; the ranges alone answer it
+        return query
+    south = max(-90.0, min_lat - _geodesic_bulge(min_lat, half_span))
+    north = min(90.0, max_lat + _geodesic_bulge(max_lat, half_span))
+    ring = [
+        [min_lng, south],
+        [max_lng, south],
+        [max_lng, north],
+        [min_lng, north],
+        [min_lng, south],
+    ]
+    query["location"] = {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}}
+    return query
+
+
+def geo_near_stage(lat: float, lng: float, query: Dict[str, Any], max_distance_m: Optional[float] = None) -> Dict[str, Any]:
+    """`$geoNear` pipeline stage returning documents sorted by distance with a `distance_m` field"""
+    stage = {
+        "near": point(lat, lng),
+        "distanceField": "distance_m",
+        "spherical": True,
+        "key": "location",
+        "query": query,
+    }
+    if max_distance_m is not None:
+        stage["maxDistance"] = max_distance_m
+    return {"$geoNear": stage}
+
+
+class GridIndex:
+    """Uniform lat/lng grid over point keys.
+
+    In-process stand-in for the 2dsphere index, used when the Mongo deployment
+    has no geo support (e.g. mongomock in tests). Each key maps to a
+    (lat, lng, data) entry; `where` callbacks receive `data` so callers can
+    filter (for example by resource type) before the k-nearest cut.
+    """
+
+    def __init__(self, cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float, Any]]] = defaultdict(dict)
+        self._points: Dict[str, Tuple[float, float, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._points
+
+    def get(self, key: str) -> Optional[Tuple[float, float, Any]]:
+        return self._points.get(key)
+
+    def items(self) -> List[Tuple[str, Tuple[float, float, Any]]]:
+        return list(self._points.items())
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._points.clear()
+
+    def insert(self, key: str, lat: float, lng: float, data: Any = None) -> None:
+        self.remove(key)
+        entry = (lat, lng, data)
+        self._points[key] = entry
+        self._cells[self._cell(lat, lng)][key] = entry
+
+    def remove(self, key: str) -> None:
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return
+        cell = self._cell(entry[0], entry[1])
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def within_bbox(
+        self,
+        min_lng: float,
+        min_lat: float,
+        max_lng: float,
+        max_lat: float,
+        where: Optional[Callable[[Any], bool]] = None,
+    ) -> List[str]:
+        min_cy, min_cx = self._cell(min_lat, min_lng)
+        max_cy, max_cx = self._cell(max_lat, max_lng)
+        keys = []
+        # Walk whichever is smaller: the covered cells or the occupied cells
+        if (max_cy - min_cy + 1) * (max_cx - min_cx + 1) <= len(self._cells):
+            cells = (
+                self._cells.get((cy, cx))
+                for cy in range(min_cy, max_cy + 1)
+                for cx in range(min_cx, max_cx + 1)
+            )
+        else:
+            cells = (
+                bucket for (cy, cx), bucket in self._cells.items()
+                if min_cy <= cy <= max_cy and min_cx <= cx <= max_cx
+            )
+        for bucket in cells:
+            if not bucket:
+                continue
+            for key, (lat, lng, data) in bucket.items():
+                if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng and (where is None or where(data)):
+                    keys.append(key)
+        return keys
+
+    def within_radius(
+        self,
+        lat: float,
+        lng: float,
+        radius_m: float,
+        where: Optional[Callable[[Any], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """(key, distance_m) pairs within `radius_m`, nearest first"""
+        dlat = radius_m / METERS_PER_DEGREE
+        coslat = max(math.cos(math.radians(min(89.9, abs(lat) + dlat))), 1e-6)
+        dlng = radius_m / (METERS_PER_DEGREE * coslat)
+        candidates = self.within_bbox(
+            max(-180.0, lng - dlng), max(-90.0, lat - dlat),
+            min(180.0, lng + dlng), min(90.0, lat + dlat),
+            where,
+        )
+        hits = []
+        for key in candidates:
+            plat, plng, _ = self._points[key]
+            distance = haversine_m(lat, lng, plat, plng)
+            if distance <= radius_m:
+                hits.append((key, distance))
+        hits.sort(key=lambda hit: hit[1])
+        return hits
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        max_distance_m: Optional[float] = None,
+        where: Optional[Callable[[Any], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """The `k` nearest (key, distance_m) pairs, found by searching rings of cells outward"""
+        if k <= 0 or not self._points:
+            return []
+
+        cy, cx = self._cell(lat, lng)
+        occupied_y = [cell[0] for cell in self._cells]
+        occupied_x = [cell[1] for cell in self._cells]
+        max_ring = max(
+            abs(cy - min(occupied_y)), abs(cy - max(occupied_y)),
+            abs(cx - min(occupied_x)), abs(cx - max(occupied_x)),
+        )
+        hits: List[Tuple[str, float]] = []
+        for ring in range(max_ring + 1):
+            for ry in range(cy - ring, cy + ring + 1):
+                edge = ry in (cy - ring, cy + ring)
+                xs = range(cx - ring, cx + ring + 1) if edge else (cx - ring, cx + ring)
+                for rx in xs:
+                    bucket = self._cells.get((ry, rx))
+                    if not bucket:
+                        continue
+                    for key, (plat, plng, data) in bucket.items():
+                        if where is not None and not where(data):
+                            continue
+                        distance = haversine_m(lat, lng, plat, plng)
+                        if max_distance_m is None or distance <= max_distance_m:
+                            hits.append((key, distance))
+
+            # Anything outside the searched square is at least this far away
+            coslat = max(math.cos(math.radians(min(89.9, abs(lat) + (ring + 1) * self.cell_deg))), 1e-6)
+            reach_deg = min(
+                lat - (cy - ring) * self.cell_deg,
+                (cy + ring + 1) * self.cell_deg - lat,
+                (lng - (cx - ring) * self.cell_deg) * coslat,
+                ((cx + ring + 1) * self.cell_deg - lng) * coslat,
+            )
+            reach_m = reach_deg * METERS_PER_DEGREE
+            if max_distance_m is not None and reach_m > max_distance_m:
+                break
+            if len(hits) >= k:
+                hits.sort(key=lambda hit: hit[1])
+                del hits[k:]
+                if hits[-1][1] <= reach_m:
+                    break
+
+        hits.sort(key=lambda hit: hit[1])
+        return hits[:k]
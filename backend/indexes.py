@@ -0,0 +1,115 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import ASCENDING, GEOSPHERE, IndexModel
+
+import geo
+
+# Every index the routes in server.py rely on, per collection. ensure_indexes()
+# creates them at startup; create_indexes is a no-op for ones that exist.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "emergency_resources": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("type", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("last_updated", ASCENDING)]),
+        IndexModel([("lat", ASCENDING), ("lng", ASCENDING)]),
+        IndexModel([("seq", ASCENDING)]),
+    ],
+    "incidents": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("type", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("reported_at", ASCENDING)]),
+        IndexModel([("reported_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("lat", ASCENDING), ("lng", ASCENDING)]),
+        IndexModel([("seq", ASCENDING)]),
+    ],
+    "power_outages": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("reported_at", ASCENDING)]),
+        IndexModel([("reported_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("seq", ASCENDING)]),
+    ],
+    "deletions": [
+        IndexModel([("seq", ASCENDING)]),
+    ],
+    "incident_rollups": [
+        IndexModel([("hour", ASCENDING)]),
+        IndexModel([("geohash", ASCENDING), ("hour", ASCENDING)]),
+    ],
+}
+
+# Created separately because some deployments (e.g. mongomock) cannot build it
+GEO_INDEXES: Dict[str, List[IndexModel]] = {
+    "emergency_resources": [IndexModel([("location", GEOSPHERE)])],
+}
+
+# Representative query shapes of the hot routes: (route, collection, filter, sort).
+# check_query_plans() explains each one and reports any that scan the collection.
+ROUTE_QUERIES: List[Tuple[str, str, Dict[str, Any], Optional[List[Tuple[str, int]]]]] = [
+    ("GET /api/resources/{id}", "emergency_resources", {"id": "probe"}, None),
+    ("PUT /api/resources/{id}", "emergency_resources", {"id": "probe"}, None),
+    ("GET /api/resources?type=", "emergency_resources", {"type": "medical"}, None),
+    ("GET /api/resources?limit=", "emergency_resources", {"id": {"$gt": "probe"}}, [("id", ASCENDING)]),
+    ("GET /api/export/resources?status=", "emergency_resources", {"status": "active"}, None),
+    ("GET /api/incidents?limit=", "incidents", {"reported_at": {"$gt": "probe"}}, [("reported_at", ASCENDING), ("id", ASCENDING)]),
+    ("GET /api/power-outages/affected (incidents)", "incidents", {"status": {"$ne": "resolved"}, "lat": {"$gte": 31.9, "$lte": 32.1}, "lng": {"$gte": 34.7, "$lte": 34.9}}, None),
+    ("GET /api/power-outages/affected (resources)", "emergency_resources", {"lat": {"$gte": 31.9, "$lte": 32.1}, "lng": {"$gte": 34.7, "$lte": 34.9}}, None),
+    ("GET /api/export/incidents?type=", "incidents", {"type": "fire"}, None),
+    ("PUT /api/power-outages/{id}", "power_outages", {"id": "probe"}, None),
+    ("GET /api/power-outages/affected", "power_outages", {"status": "active"}, None),
+    ("GET /api/power-outages?limit=", "power_outages", {"reported_at": {"$gt": "probe"}}, [("reported_at", ASCENDING), ("id", ASCENDING)]),
+    ("GET /api/changes (resources)", "emergency_resources", {"seq": {"$gt": 0, "$lte": 1}}, [("seq", ASCENDING)]),
+    ("GET /api/changes (incidents)", "incidents", {"seq": {"$gt": 0, "$lte": 1}}, [("seq", ASCENDING)]),
+    ("GET /api/changes (outages)", "power_outages", {"seq": {"$gt": 0, "$lte": 1}}, [("seq", ASCENDING)]),
+    ("GET /api/changes (deletions)", "deletions", {"seq": {"$gt": 0, "$lte": 1}}, [("seq", ASCENDING)]),
+    ("GET /api/incidents/timeseries", "incident_rollups", {"hour": {"$gte": "probe", "$lte": "probe"}}, None),
+    ("GET /api/incidents/timeseries?geohash=", "incident_rollups", {"geohash": {"$regex": "^sv8"}, "hour": {"$gte": "probe"}}, None),
+]
+
+
+async def ensure_indexes(db, geo_enabled: bool = True) -> bool:
+    """Create the registered indexes; returns False if geo queries are unavailable.
+
+    Some backends (mongomock) accept the 2dsphere index and only fail on the
+    queries, so one `$geoWithin` and one `$geoNear` are run against it too.
+    """
+    for collection, models in INDEXES.items():
+        await db[collection].create_indexes(models)
+    if not geo_enabled:
+        return False
+    try:
+        for collection, models in GEO_INDEXES.items():
+            await db[collection].create_indexes(models)
+            await db[collection].find_one(geo.bbox_query(34.0, 31.0, 35.0, 33.0), {"_id": 1})
+            await db[collection].aggregate([geo.geo_near_stage(32.0, 34.8, {}), {"$limit": 1}]).to_list(length=1)
+    except Exception as e:
+        print(f"2dsphere queries unavailable ({e}), falling back to in-memory geo index")
+        return False
+    return True
+
+
+def _stages(plan: Any) -> Iterator[str]:
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def winning_plan_stages(explain: Dict[str, Any]) -> List[str]:
+    return list(_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+
+
+def check_query_plans(db) -> List[str]:
+    """Explain every ROUTE_QUERIES entry with a synchronous pymongo `db`; list the COLLSCAN ones"""
+    violations = []
+    for route, collection, query, sort in ROUTE_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = winning_plan_stages(cursor.explain())
+        if "COLLSCAN" in stages:
+            violations.append(f"{route}: {collection}.find({query}) -> {' > '.join(stages)}")
+    return violations
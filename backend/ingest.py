@@ -0,0 +1,158 @@
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonlines", "application/x-jsonlines")
+
+
+class BulkRequestError(Exception):
+    """The request as a whole is unusable (as opposed to a single bad item)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class InvalidItem:
+    """Placeholder for an NDJSON line that is not valid JSON"""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return InvalidItem(f"invalid JSON: {e}")
+
+
+async def read_items(request, max_items: int) -> AsyncIterator[Tuple[int, Any]]:
+    """(index, item) pairs from a JSON array body or an NDJSON stream.
+
+    NDJSON is parsed as it arrives, so items are validated while the upload
+    is still in progress. Raises BulkRequestError (413) as soon as the
+    stream goes past `max_items`.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        index = 0
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                if index >= max_items:
+                    raise BulkRequestError(f"at most {max_items} items per request", status_code=413)
+                yield index, _parse_line(line)
+                index += 1
+        if pending.strip():
+            if index >= max_items:
+                raise BulkRequestError(f"at most {max_items} items per request", status_code=413)
+            yield index, _parse_line(pending)
+        return
+
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BulkRequestError("body must be a JSON array or NDJSON")
+    if not isinstance(body, list):
+        raise BulkRequestError("body must be a JSON array or NDJSON")
+    if len(body) > max_items:
+        raise BulkRequestError(f"at most {max_items} items per request", status_code=413)
+    for index, item in enumerate(body):
+        yield index, item
+
+
+async def bulk_insert(
+    collection,
+    items: AsyncIterator[Tuple[int, Any]],
+    model,
+    new_document: Callable[[Any], Dict[str, Any]],
+    created: Callable[[Any], None],
+    batch_size: int,
+    sequence=None,
+    duplicate_of: Optional[Callable[[Any], Optional[str]]] = None,
+    merge: Optional[Callable[[str, Any], Awaitable[Optional[Dict[str, Any]]]]] = None,
+) -> Dict[str, Any]:
+    """Validate items with `model` and write them through unordered `insert_many` batches.
+
+    `new_document` turns a validated model into the stored document (assigning
+    its id); `created` runs the usual post-insert bookkeeping for each item
+    that was actually written. With a `sequence` (changes.ChangeSequence) each
+    batch reserves one change number per document and stamps it as `seq`.
+    Nothing is written until every item has been read, so a request that is
+    rejected as a whole (e.g. over the item limit) stores nothing.
+
+    With `duplicate_of` (the id of an existing document the item repeats, or
+    None once the item is registered as a new one) and `merge`, an item that
+    repeats another is merged into it instead of inserted, as the single-item
+    route does; that includes items repeating an earlier item of the same
+    request. Returns per-item results in request order.
+    """
+    results: List[Dict[str, Any]] = []
+    batch: List[Tuple[int, Any, Dict[str, Any]]] = []
+
+    async def write(docs):
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            return {error["index"]: error.get("errmsg", "write failed") for error in e.details.get("writeErrors", [])}
+        return {}
+
+    async def flush():
+        if not batch:
+            return
+        docs = [doc for _, _, doc in batch]
+        if sequence is None:
+            failed = await write(docs)
+        else:
+            async with sequence.reserve(len(docs)) as seqs:
+                for doc, seq in zip(docs, seqs):
+                    doc["seq"] = seq
+                failed = await write(docs)
+        for position, (index, item, _) in enumerate(batch):
+            if position in failed:
+                results.append({"index": index, "status": "error", "errors": [failed[position]]})
+            else:
+                created(item)
+                results.append({"index": index, "status": "created", "id": item.id})
+        batch.clear()
+
+    accepted: List[Tuple[int, Any]] = []
+    async for index, raw in items:
+        if isinstance(raw, InvalidItem):
+            results.append({"index": index, "status": "error", "errors": [raw.error]})
+            continue
+        try:
+            accepted.append((index, model.parse_obj(raw)))
+        except ValidationError as e:
+            results.append({"index": index, "status": "error", "errors": e.errors()})
+
+    for index, item in accepted:
+        document = new_document(item)
+        merged = None
+        while duplicate_of is not None and merged is None:
+            existing = duplicate_of(item)
+            if existing is None:
+                break
+            if any(queued.id == existing for _, queued, _ in batch):
+                # The item it repeats has to be written before it can be merged into
+                await flush()
+            # None if `existing` is gone; the next candidate (if any) is tried
+            merged = await merge(existing, item)
+        if merged is not None:
+            results.append({"index": index, "status": "merged", "id": merged["id"]})
+            continue
+        batch.append((index, item, document))
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+
+    results.sort(key=lambda result: result["index"])
+    counts = {status: sum(1 for result in results if result["status"] == status) for status in ("created", "merged")}
+    return {**counts, "failed": len(results) - counts["created"] - counts["merged"], "results": results}
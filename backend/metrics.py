@@ -0,0 +1,172 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+REQUESTS = Counter(
+    "http_requests", "HTTP requests by route template and status", ["method", "route", "status"], registry=registry
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to the last response byte", ["method", "route"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body bytes as sent (after compression)", ["route"],
+    buckets=SIZE_BUCKETS, registry=registry,
+)
+IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being handled", registry=registry)
+REQUEST_MONGO_COMMANDS = Histogram(
+    "http_request_mongo_commands", "Mongo commands issued while handling one request", ["route"],
+    buckets=COUNT_BUCKETS, registry=registry,
+)
+REQUEST_MONGO_SECONDS = Histogram(
+    "http_request_mongo_seconds", "Mongo time spent while handling one request", ["route"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+MONGO_COMMANDS = Counter(
+    "mongo_commands", "Mongo commands by name and outcome", ["command", "outcome"], registry=registry
+)
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "Mongo command round-trip time", ["command"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+LOOP_LAG = Gauge("event_loop_lag_seconds", "Most recent event-loop scheduling delay", registry=registry)
+LOOP_LAG_HISTOGRAM = Histogram(
+    "event_loop_lag_histogram_seconds", "Event-loop scheduling delay", buckets=LATENCY_BUCKETS, registry=registry
+)
+WRITE_BEHIND_FLUSH_SECONDS = Histogram(
+    "write_behind_flush_seconds", "Time to fsync the journal and insert one write-behind batch",
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+WRITE_BEHIND_BATCH_SIZE = Histogram(
+    "write_behind_batch_size", "Documents per write-behind flush", buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+    registry=registry,
+)
+
+# Durations (s) of the Mongo commands issued for the current request. motor
+# runs pymongo on executor threads with a copy of the caller's context, so
+# the listener below sees the list set by the middleware; list.append is
+# atomic, which keeps concurrent commands of one request from racing.
+_request_mongo: ContextVar[Optional[List[float]]] = ContextVar("request_mongo", default=None)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Counts and times every Mongo command, globally and for the current request"""
+
+    def started(self, event) -> None:
+        pass
+
+    def _record(self, event, outcome: str) -> None:
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMANDS.labels(event.command_name, outcome).inc()
+        MONGO_LATENCY.labels(event.command_name).observe(seconds)
+        durations = _request_mongo.get()
+        if durations is not None:
+            durations.append(seconds)
+
+    def succeeded(self, event) -> None:
+        self._record(event, "success")
+
+    def failed(self, event) -> None:
+        self._record(event, "failure")
+
+
+class StatsCollector:
+    """Exposes a `stats()` dict at scrape time; keys in `counters` become counters, the rest gauges"""
+
+    def __init__(self, prefix: str, stats: Callable[[], Dict[str, float]], counters: Iterable[str] = ()):
+        self.prefix = prefix
+        self.stats = stats
+        self.counters = set(counters)
+
+    def collect(self):
+        for key, value in self.stats().items():
+            name = f"{self.prefix}_{key}"
+            if key in self.counters:
+                yield CounterMetricFamily(name, f"{self.prefix} {key}", value=value)
+            else:
+                yield GaugeMetricFamily(name, f"{self.prefix} {key}", value=value)
+
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, float]], counters: Iterable[str] = ()) -> None:
+    registry.register(StatsCollector(prefix, stats, counters))
+
+
+class MetricsMiddleware:
+    """Per-route request count, latency, response size and Mongo usage.
+
+    Routes are labelled by their path template (`/api/resources/{resource_id}`)
+    so ids never become label values. Requests answered before routing, such
+    as response-cache hits, are labelled with their path when it is a
+    static route and `unmatched` otherwise.
+    """
+
+    def __init__(self, app, routes: Callable[[], Iterable]):
+        self.app = app
+        self._routes = routes
+        self._templates: Optional[Dict[Callable, str]] = None
+        self._static_paths: Optional[set] = None
+
+    def _route_label(self, scope) -> str:
+        if self._templates is None:
+            routes = list(self._routes())
+            self._templates = {route.endpoint: route.path for route in routes if hasattr(route, "endpoint")}
+            self._static_paths = {route.path for route in routes if "{" not in getattr(route, "path", "{")}
+        endpoint = scope.get("endpoint")
+        if endpoint is not None and endpoint in self._templates:
+            return self._templates[endpoint]
+        return scope["path"] if scope["path"] in self._static_paths else "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+        durations: List[float] = []
+        token = _request_mongo.set(durations)
+
+        async def counting_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_PROGRESS.dec()
+            _request_mongo.reset(token)
+            route = self._route_label(scope)
+            REQUESTS.labels(scope["method"], route, str(status)).inc()
+            REQUEST_LATENCY.labels(scope["method"], route).observe(elapsed)
+            RESPONSE_SIZE.labels(route).observe(size)
+            REQUEST_MONGO_COMMANDS.labels(route).observe(len(durations))
+            REQUEST_MONGO_SECONDS.labels(route).observe(sum(durations))
+
+
+async def monitor_event_loop_lag(interval_s: float = 0.5) -> None:
+    """Sleep `interval_s` repeatedly and record how late each wakeup is"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval_s)
+        lag = max(0.0, loop.time() - started - interval_s)
+        LOOP_LAG.set(lag)
+        LOOP_LAG_HISTOGRAM.observe(lag)
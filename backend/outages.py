@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def points_in_polygon(lat: np.ndarray, lng: np.ndarray, poly_lat: np.ndarray, poly_lng: np.ndarray) -> np.ndarray:
+    """Even-odd ray casting of many points against one polygon, vectorized over the points"""
+    inside = np.zeros(lat.shape, dtype=bool)
+    j = len(poly_lat) - 1
+    for i in range(len(poly_lat)):
+        yi, xi = poly_lat[i], poly_lng[i]
+        yj, xj = poly_lat[j], poly_lng[j]
+        crosses = (yi > lat) != (yj > lat)
+        if crosses.any():
+            # Only evaluated where the edge spans the point's latitude, so yj != yi
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_cross = (xj - xi) * (lat - yi) / (yj - yi) + xi
+            inside ^= crosses & (lng < x_cross)
+        j = i
+    return inside
+
+
+class PointSet:
+    """Points sorted by latitude so each polygon's bounding box is a binary-searched slice"""
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray):
+        self.order = np.argsort(lat, kind="stable")
+        self.lat = np.asarray(lat, dtype=np.float64)[self.order]
+        self.lng = np.asarray(lng, dtype=np.float64)[self.order]
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+
+class OutagePolygons:
+    """Preprocessed polygons of the active outages.
+
+    Vertex arrays and bounding boxes are built once and reused by every
+    containment query until `invalidate()` is called from a write path.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.summaries: List[Dict[str, Any]] = []
+        self.vertices: List[tuple] = []
+        self.bboxes = np.empty((0, 4))  # min_lat, min_lng, max_lat, max_lng
+        # Bumped on every invalidation; a load only counts as fresh if nothing
+        # was invalidated while its query was in flight
+        self.generation = 0
+        self.loaded_generation = -1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def stale(self) -> bool:
+        return self.loaded_generation != self.generation
+
+    def invalidate(self) -> None:
+        self.generation += 1
+
+    def load(self, outages: List[Dict[str, Any]], generation: int) -> None:
+        ids = []
+        summaries = []
+        vertices = []
+        bboxes = []
+        for outage in outages:
+            coords = np.asarray(outage.get("coordinates") or [], dtype=np.float64)
+            if coords.ndim != 2 or coords.shape[0] < 3 or coords.shape[1] < 2:
+                continue
+            poly_lat, poly_lng = coords[:, 0].copy(), coords[:, 1].copy()
+            ids.append(outage["id"])
+            summaries.append({key: value for key, value in outage.items() if key != "coordinates"})
+            vertices.append((poly_lat, poly_lng))
+            bboxes.append((poly_lat.min(), poly_lng.min(), poly_lat.max(), poly_lng.max()))
+        self.ids = ids
+        self.summaries = summaries
+        self.vertices = vertices
+        self.bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        self.loaded_generation = generation
+
+    def boxes(self, outage_id: Optional[str] = None) -> List[tuple]:
+        """Bounding boxes (min_lat, min_lng, max_lat, max_lng) of the polygons, or only of `outage_id`"""
+        return [tuple(bbox) for polygon_id, bbox in zip(self.ids, self.bboxes.tolist()) if outage_id in (None, polygon_id)]
+
+    def contains(self, points: PointSet, outage_id: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Map of outage id to the (original) indices of the points inside it"""
+        result = {}
+        if not len(points):
+            return result
+        lows = np.searchsorted(points.lat, self.bboxes[:, 0], side="left")
+        highs = np.searchsorted(points.lat, self.bboxes[:, 2], side="right")
+        for k, polygon_id in enumerate(self.ids):
+            if outage_id is not None and polygon_id != outage_id:
+                continue
+            lo, hi = lows[k], highs[k]
+            if lo >= hi:
+                continue
+            _, min_lng, _, max_lng = self.bboxes[k]
+            lng = points.lng[lo:hi]
+            candidates = np.nonzero((lng >= min_lng) & (lng <= max_lng))[0]
+            if not len(candidates):
+                continue
+            candidates += lo
+            poly_lat, poly_lng = self.vertices[k]
+            inside = points_in_polygon(points.lat[candidates], points.lng[candidates], poly_lat, poly_lng)
+            hits = candidates[inside]
+            if len(hits):
+                result[polygon_id] = np.sort(points.order[hits])
+        return result
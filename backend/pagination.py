@@ -0,0 +1,86 @@
+import base64
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def encode_cursor(doc: Dict[str, Any], sort_keys: Sequence[str]) -> str:
+    """Opaque cursor pointing just past `doc` in `sort_keys` order"""
+    raw = json.dumps([doc.get(key) for key in sort_keys], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_keys: Sequence[str]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def keyset_filter(sort_keys: Sequence[str], after: Sequence[Any]) -> Dict[str, Any]:
+    """Filter for documents strictly after `after` in ascending `sort_keys` order.
+
+    For keys (a, b) this is `a > va OR (a == va AND b > vb)`.
+    """
+    clauses = []
+    for i, key in enumerate(sort_keys):
+        clause = {prev: after[j] for j, prev in enumerate(sort_keys[:i])}
+        clause[key] = {"$gt": after[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """Split a `fields=a,b,c` projection, rejecting names that are not model fields"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def projection(fields: Optional[List[str]], always: Sequence[str] = (), exclude: Sequence[str] = ()) -> Dict[str, int]:
+    """Mongo projection for the requested fields (plus `always`), or everything but `exclude`"""
+    if fields is None:
+        result = {"_id": 0}
+        result.update({name: 0 for name in exclude})
+        return result
+    result = {"_id": 0}
+    result.update({name: 1 for name in list(always) + fields})
+    return result
+
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_keys: Sequence[str],
+    fields_projection: Dict[str, int],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One keyset page of `collection` and the cursor for the next one.
+
+    Without `limit` or `cursor` the whole result set is returned unsorted, as
+    the list endpoints always did.
+    """
+    if limit is None and cursor is None:
+        return await collection.find(query, fields_projection).to_list(length=None), None
+
+    if cursor is not None:
+        query = {"$and": [query, keyset_filter(sort_keys, decode_cursor(cursor, sort_keys))]}
+    sort = [(key, 1) for key in sort_keys]
+    fetch = collection.find(query, fields_projection).sort(sort)
+    if limit is None:
+        return await fetch.to_list(length=None), None
+
+    # One extra document tells us whether another page exists
+    docs = await fetch.limit(limit + 1).to_list(length=None)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], sort_keys)
@@ -0,0 +1,71 @@
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler for the event-loop thread.
+
+    While running, a daemon thread records the stack of the target thread
+    every `interval_s` and counts identical stacks. `collapsed()` renders
+    them in the collapsed format flamegraph.pl and speedscope read
+    (`frame;frame;frame count`, outermost frame first). Sampling costs one
+    stack walk per interval, so it is off unless enabled.
+    """
+
+    def __init__(self, interval_s: float = 0.005, max_depth: int = 64):
+        self.interval_s = interval_s
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self._target: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        """Sample `thread_id` (the calling thread by default); clears earlier samples"""
+        if self.running:
+            return
+        self._target = thread_id or threading.get_ident()
+        self.samples.clear()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "interval_s": self.interval_s,
+            "started_at": self.started_at,
+            "samples": sum(self.samples.values()),
+            "stacks": len(self.samples),
+        }
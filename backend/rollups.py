@@ -0,0 +1,223 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+import geo
+
+ROLLUPS_COLLECTION = "incident_rollups"
+# Bumped whenever the rollup document layout changes, forcing a rebuild
+ROLLUPS_VERSION = 1
+HOUR_FORMAT = "%Y-%m-%dT%H"
+# Characters of the hour key kept per interval ("2026-10-17T13" / "2026-10-17")
+INTERVAL_WIDTHS = {"hour": 13, "day": 10}
+BREAKDOWNS = ("type", "priority")
+
+# (hour, type, priority, geohash)
+Key = Tuple[str, Optional[str], Optional[str], str]
+
+
+def hour_key(value: Any) -> Optional[str]:
+    """Hour bucket ("YYYY-MM-DDTHH") of a stored ISO timestamp, or None if malformed"""
+    try:
+        return datetime.fromisoformat(value).strftime(HOUR_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_time(value: str) -> datetime:
+    """Naive local datetime of an ISO timestamp, matching how reported_at is stored"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+class IncidentRollups:
+    """Hourly incident and report counts per type, priority and geohash cell.
+
+    One Mongo document per non-empty (hour, type, priority, cell) holds
+    `incidents` (new incidents reported in that hour) and `reports`
+    (reports received, including ones merged into an existing incident).
+    Write handlers `record_*` into in-memory deltas that `flush` applies as
+    `$inc` upserts, so a write costs no extra round-trip; queries flush
+    first so they always include this process's writes. Time-series and
+    heatmap queries group these documents instead of the incidents.
+    """
+
+    def __init__(self, db, precision: int = 6):
+        self.db = db
+        self.precision = precision
+        self._deltas: Dict[Key, List[int]] = {}
+
+    def _key(self, incident: Dict[str, Any], reported_at: Any) -> Optional[Key]:
+        hour = hour_key(reported_at)
+        if hour is None or incident.get("lat") is None or incident.get("lng") is None:
+            return None
+        cell = geo.geohash(incident["lat"], incident["lng"], self.precision)
+        return hour, incident.get("type"), incident.get("priority"), cell
+
+    def _add(self, key: Optional[Key], incidents: int, reports: int) -> None:
+        if key is None:
+            return
+        delta = self._deltas.setdefault(key, [0, 0])
+        delta[0] += incidents
+        delta[1] += reports
+
+    def record_incident(self, incident: Dict[str, Any]) -> None:
+        self._add(self._key(incident, incident.get("reported_at")), 1, 1)
+
+    def record_report(self, incident: Dict[str, Any], reported_at: Any) -> None:
+        """Another report merged into `incident`, counted in the hour it arrived"""
+        self._add(self._key(incident, reported_at), 0, 1)
+
+    @staticmethod
+    def _document_id(key: Key) -> str:
+        return "|".join("" if part is None else part for part in key)
+
+    async def flush(self) -> int:
+        """Apply the pending deltas; returns how many rollup documents were touched"""
+        if not self._deltas:
+            return 0
+        deltas, self._deltas = self._deltas, {}
+        try:
+            await self.db[ROLLUPS_COLLECTION].bulk_write([
+                UpdateOne(
+                    {"_id": self._document_id(key)},
+                    {
+                        "$setOnInsert": dict(zip(("hour", "type", "priority", "geohash"), key)),
+                        "$inc": {"incidents": incidents, "reports": reports},
+                    },
+                    upsert=True,
+                )
+                for key, (incidents, reports) in deltas.items()
+            ], ordered=False)
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            for key, (incidents, reports) in deltas.items():
+                self._add(key, incidents, reports)
+            raise
+        return len(deltas)
+
+    async def ensure(self) -> bool:
+        """Build the rollups from the incidents unless they are current; True if rebuilt"""
+        marker = await self.db.counters.find_one({"_id": ROLLUPS_COLLECTION})
+        if marker is not None and marker.get("version") == ROLLUPS_VERSION and marker.get("precision") == self.precision:
+            return False
+        await self.rebuild()
+        return True
+
+    async def rebuild(self) -> None:
+        """Recompute every rollup document from the incidents collection.
+
+        Merged reports are counted in their incident's first hour, since only
+        the report count (not each report's time) is stored.
+        """
+        self._deltas = {}
+        projection = {"_id": 0, "reported_at": 1, "report_count": 1, "lat": 1, "lng": 1, "type": 1, "priority": 1}
+        async for incident in self.db.incidents.find({}, projection):
+            self._add(self._key(incident, incident.get("reported_at")), 1, incident.get("report_count") or 1)
+        deltas, self._deltas = self._deltas, {}
+        collection = self.db[ROLLUPS_COLLECTION]
+        await collection.delete_many({})
+        if deltas:
+            await collection.insert_many([
+                {
+                    "_id": self._document_id(key),
+                    **dict(zip(("hour", "type", "priority", "geohash"), key)),
+                    "incidents": incidents,
+                    "reports": reports,
+                }
+                for key, (incidents, reports) in deltas.items()
+            ])
+        await self.db.counters.update_one(
+            {"_id": ROLLUPS_COLLECTION},
+            {"$set": {"version": ROLLUPS_VERSION, "precision": self.precision}},
+            upsert=True,
+        )
+
+    def _match(self, since: datetime, until: datetime, filters: Dict[str, Optional[str]], cell_prefix: Optional[str]) -> Dict[str, Any]:
+        match: Dict[str, Any] = {"hour": {"$gte": since.strftime(HOUR_FORMAT), "$lte": until.strftime(HOUR_FORMAT)}}
+        match.update({field: value for field, value in filters.items() if value is not None})
+        if cell_prefix:
+            # Anchored prefix regexes are answered from the geohash index range
+            match["geohash"] = {"$regex": "^" + cell_prefix}
+        return match
+
+    async def timeseries(
+        self,
+        since: datetime,
+        until: datetime,
+        interval: str,
+        by: Optional[str],
+        filters: Dict[str, Optional[str]],
+        cell_prefix: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Per-interval incident and report counts (broken down `by` type or priority), gaps filled with zeros"""
+        await self.flush()
+        width = INTERVAL_WIDTHS[interval]
+        pipeline = [
+            {"$match": self._match(since, until, filters, cell_prefix)},
+            {"$group": {
+                "_id": {"bucket": {"$substr": ["$hour", 0, width]}, "key": f"${by}" if by else None},
+                "incidents": {"$sum": "$incidents"},
+                "reports": {"$sum": "$reports"},
+            }},
+        ]
+        groups = await self.db[ROLLUPS_COLLECTION].aggregate(pipeline).to_list(length=None)
+
+        step = timedelta(hours=1) if interval == "hour" else timedelta(days=1)
+        current = since.replace(minute=0, second=0, microsecond=0)
+        if interval == "day":
+            current = current.replace(hour=0)
+        buckets: Dict[str, Dict[str, Any]] = {}
+        while current <= until:
+            label = current.strftime(HOUR_FORMAT)[:width]
+            buckets[label] = {"bucket": label, "incidents": 0, "reports": 0}
+            if by:
+                buckets[label]["by_" + by] = {}
+            current += step
+        for group in groups:
+            bucket = buckets.get(group["_id"]["bucket"])
+            if bucket is None:
+                continue
+            bucket["incidents"] += group["incidents"]
+            bucket["reports"] += group["reports"]
+            if by and group["incidents"]:
+                bucket["by_" + by][group["_id"]["key"]] = group["incidents"]
+        return list(buckets.values())
+
+    async def heatmap(
+        self,
+        since: datetime,
+        until: datetime,
+        precision: int,
+        filters: Dict[str, Optional[str]],
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Incident and report counts per geohash cell of `precision` characters"""
+        await self.flush()
+        pipeline = [
+            {"$match": self._match(since, until, filters, None)},
+            {"$group": {
+                "_id": {"$substr": ["$geohash", 0, precision]},
+                "incidents": {"$sum": "$incidents"},
+                "reports": {"$sum": "$reports"},
+            }},
+        ]
+        groups = await self.db[ROLLUPS_COLLECTION].aggregate(pipeline).to_list(length=None)
+        cells = []
+        for group in groups:
+            min_lng, min_lat, max_lng, max_lat = geo.geohash_bounds(group["_id"])
+            if bbox is not None and (max_lng < bbox[0] or min_lat > bbox[3] or min_lng > bbox[2] or max_lat < bbox[1]):
+                continue
+            cells.append({
+                "geohash": group["_id"],
+                "lat": round((min_lat + max_lat) / 2, 6),
+                "lng": round((min_lng + max_lng) / 2, 6),
+                "bounds": [round(min_lng, 6), round(min_lat, 6), round(max_lng, 6), round(max_lat, 6)],
+                "incidents": group["incidents"],
+                "reports": group["reports"],
+            })
+        cells.sort(key=lambda cell: cell["geohash"])
+        return cells
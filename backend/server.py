@@ -1,16 +1,66 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
+import time
 import uuid
 import json
 
+import cache
+import changes
+import clusters
+import coordination
+import dedup
+import dispatch
+import encoding
+import events
+import export
+import geo
+import indexes
+import ingest
+import metrics
+import numpy as np
+import outages
+import pagination
+import profiler
+import rollups
+import stats
+import writebehind
+
 app = FastAPI()
 
+# Read-through cache for the endpoints dashboards poll, keyed on path + query
+# + Accept (the list endpoints negotiate JSON/MessagePack/columnar) and
+# invalidated by tag from publish_change(). Registered before CORS so that
+# CORS stays the outer middleware and its headers are never cached.
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '30'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+CACHED_ROUTES = {
+    "/api/resources": ("resource",),
+    "/api/incidents": ("incident",),
+    "/api/power-outages": ("outage",),
+    "/api/power-outages/affected": ("outage", "resource", "incident"),
+    "/api/statistics": ("resource", "incident", "outage", "statistics"),
+    "/api/incidents/timeseries": ("incident",),
+    "/api/incidents/heatmap": ("incident",),
+}
+response_cache = cache.ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+app.add_middleware(cache.ResponseCacheMiddleware, cache=response_cache, routes=CACHED_ROUTES, vary_headers=(b"accept",))
+
+# Brotli/gzip for complete responses of at least COMPRESSION_MIN_BYTES; outside
+# the cache so cached entries stay uncompressed and serve every coding
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+app.add_middleware(encoding.CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -20,11 +70,170 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus metrics served on /metrics. Outermost middleware so latency and
+# response size cover the cache, compression and CORS layers as well
+app.add_middleware(metrics.MetricsMiddleware, routes=lambda: app.routes)
+# Seconds between event-loop lag probes
+LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('LOOP_LAG_INTERVAL_SECONDS', '0.5'))
+# Sampling profiler of the event-loop thread, started at boot with
+# PROFILER_ENABLED and toggled at /api/debug/profiler. The API is public and
+# unauthenticated and stacks expose source paths, so /api/debug/* answers 404
+# unless DEBUG_ENDPOINTS (default: PROFILER_ENABLED) is set
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+DEBUG_ENDPOINTS = os.environ.get('DEBUG_ENDPOINTS', str(PROFILER_ENABLED)).lower() == 'true'
+PROFILER_INTERVAL_SECONDS = float(os.environ.get('PROFILER_INTERVAL_SECONDS', '0.005'))
+sampling_profiler = profiler.SamplingProfiler(PROFILER_INTERVAL_SECONDS)
+
 # MongoDB connection
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-client = MongoClient(MONGO_URL)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '10000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000'))
+# primary, primaryPreferred, secondary, secondaryPreferred or nearest
+MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'primary')
+
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    readPreference=MONGO_READ_PREFERENCE,
+    event_listeners=[metrics.MongoCommandListener()],
+)
 db = client.emergency_platform
 
+# 'mongo' answers bbox/near queries with the 2dsphere index; 'memory' uses an
+# in-process grid for deployments without geo support (e.g. mongomock).
+# 'mongo' falls back to 'memory' at startup if the index cannot be built or
+# a probe $geoWithin/$geoNear query fails
+GEO_QUERY_BACKEND = os.environ.get('GEO_QUERY_BACKEND', 'mongo')
+resource_grid = geo.GridIndex()
+
+# Server-side marker clustering for /api/tiles and /api/clusters: grid
+# aggregates per zoom level up to CLUSTER_MAX_ZOOM, individual points above it
+CLUSTER_MAX_ZOOM = int(os.environ.get('CLUSTER_MAX_ZOOM', '14'))
+CLUSTER_CACHED_TILES = int(os.environ.get('CLUSTER_CACHED_TILES', '4096'))
+MAX_TILE_ZOOM = 22
+# Upper bound on the tiles one /api/clusters request may cover
+MAX_CLUSTER_TILES = int(os.environ.get('MAX_CLUSTER_TILES', '64'))
+resource_clusters = clusters.ClusterIndex(CLUSTER_MAX_ZOOM, CLUSTER_CACHED_TILES)
+
+# Resource coordinates and dispatch filters as numpy columns for the
+# nearest-resources endpoints, maintained by the resource write handlers
+resource_arrays = dispatch.ResourceArrays()
+MAX_NEAREST_K = int(os.environ.get('MAX_NEAREST_K', '100'))
+
+# Sample data at startup: 'off', 'if-empty' (seed collections that have no
+# documents) or 'reset' (wipe and reseed; development only, and with worker
+# coordination only on a database no deployment has started on yet)
+SEED_MODE = os.environ.get('SEED_MODE', 'if-empty')
+SEED_NAMESPACE = uuid.UUID('5b0f6a8e-2c1d-4e3f-9a7b-6c5d4e3f2a1b')
+
+# Polygons of the active outages, rebuilt lazily after outage writes
+outage_polygons = outages.OutagePolygons()
+
+# 'local' publishes change events from the write handlers below; 'change_stream'
+# tails Mongo change streams instead (requires a replica set)
+EVENT_SOURCE = os.environ.get('EVENT_SOURCE', 'local')
+# Events kept for subscribers that fall behind before they are told to resync
+STREAM_BUFFER_SIZE = int(os.environ.get('STREAM_BUFFER_SIZE', '1024'))
+broadcaster = events.Broadcaster(STREAM_BUFFER_SIZE)
+
+# /api/statistics is served from these counters; they are adjusted by every
+# write handler and re-read from Mongo every STATS_RECONCILE_SECONDS
+statistics = stats.StatisticsCounters()
+STATS_RECONCILE_SECONDS = float(os.environ.get('STATS_RECONCILE_SECONDS', '60'))
+
+# New incident reports of the same type within INCIDENT_DEDUP_DISTANCE_M of an
+# open incident last reported within INCIDENT_DEDUP_WINDOW_SECONDS are merged
+# into it (report_count += 1) instead of stored separately; 0 disables
+INCIDENT_DEDUP_DISTANCE_M = float(os.environ.get('INCIDENT_DEDUP_DISTANCE_M', '200'))
+INCIDENT_DEDUP_WINDOW_SECONDS = float(os.environ.get('INCIDENT_DEDUP_WINDOW_SECONDS', '1800'))
+incident_dedup = dedup.IncidentDeduplicator(INCIDENT_DEDUP_DISTANCE_M, INCIDENT_DEDUP_WINDOW_SECONDS)
+
+# Hourly incident counts per type, priority and geohash cell of
+# ROLLUP_GEOHASH_PRECISION characters (6 is about 1.2 x 0.6 km), served by
+# /api/incidents/timeseries and /api/incidents/heatmap. Writes are buffered
+# and applied every ROLLUP_FLUSH_SECONDS (and before every rollup query)
+ROLLUP_GEOHASH_PRECISION = int(os.environ.get('ROLLUP_GEOHASH_PRECISION', '6'))
+ROLLUP_FLUSH_SECONDS = float(os.environ.get('ROLLUP_FLUSH_SECONDS', '1'))
+TIMESERIES_DEFAULT_HOURS = 48
+MAX_TIMESERIES_BUCKETS = int(os.environ.get('MAX_TIMESERIES_BUCKETS', '2000'))
+incident_rollups = rollups.IncidentRollups(db, ROLLUP_GEOHASH_PRECISION)
+
+# Multi-worker deployments (`python server.py` with WORKERS > 1, or gunicorn
+# with uvicorn.workers.UvicornWorker). With WORKER_COORDINATION=mongo the
+# shared startup work runs once under a Mongo leader lock, and every write is
+# fanned out to the other workers through the capped `worker_events`
+# collection, so their in-memory indexes, statistics, response caches and
+# event streams follow writes handled elsewhere. The shared startup runs once
+# per DEPLOYMENT_ID (default: this host's master process), so respawned
+# workers skip it
+WORKERS = int(os.environ.get('WORKERS', '1'))
+WORKER_COORDINATION = os.environ.get('WORKER_COORDINATION', 'mongo' if WORKERS > 1 else 'off')
+WORKER_BUS_SIZE_MB = int(os.environ.get('WORKER_BUS_SIZE_MB', '64'))
+worker_name = coordination.worker_id()
+deployment_name = coordination.deployment_id()
+startup_lock = coordination.LeaderLock(db, "startup", worker_name)
+worker_bus = coordination.WorkerBus(db, worker_name, WORKER_BUS_SIZE_MB * 1024 * 1024)
+
+# Change sequence stamped as `seq` on every write, read back by /api/changes;
+# shared between workers so no worker's delta runs ahead of another's writes
+change_sequence = changes.ChangeSequence(db, shared=WORKER_COORDINATION == 'mongo')
+
+metrics.register_stats("response_cache", response_cache.stats, counters=("hits", "misses", "not_modified", "bytes_saved"))
+metrics.register_stats("event_stream", lambda: {
+    "subscribers": len(broadcaster), "published": broadcaster.published, "dropped": broadcaster.dropped,
+}, counters=("published", "dropped"))
+metrics.register_stats("incident_dedup", lambda: {"merged": incident_dedup.merged}, counters=("merged",))
+metrics.register_stats("worker_bus", worker_bus.stats, counters=("published", "received", "gaps", "errors"))
+
+# Upper bound on `limit` for the paginated list endpoints
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '1000'))
+RESOURCE_SORT_KEYS = ("id",)
+REPORT_SORT_KEYS = ("reported_at", "id")
+
+# Bulk ingest: documents per insert_many round-trip and items per request
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '500'))
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '10000'))
+
+# Write-behind for POST /api/incidents and /api/power-outages: reports are
+# journalled to WRITE_BEHIND_JOURNAL and acknowledged at once, then inserted in
+# batches of up to BULK_BATCH_SIZE every WRITE_BEHIND_FLUSH_MS. Statistics and
+# created events follow the flush, so a report is listed (and can be updated)
+# once it has landed. At most WRITE_BEHIND_MAX_PENDING reports wait in memory.
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_JOURNAL = os.environ.get('WRITE_BEHIND_JOURNAL', 'data/write-behind.journal')
+WRITE_BEHIND_FLUSH_MS = float(os.environ.get('WRITE_BEHIND_FLUSH_MS', '50'))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '10000'))
+# fsync the journal before each flush; without it only a process crash is survived
+WRITE_BEHIND_FSYNC = os.environ.get('WRITE_BEHIND_FSYNC', 'true').lower() == 'true'
+write_behind = writebehind.WriteBehindQueue(
+    db,
+    # One journal per worker; journals of exited workers are replayed at startup
+    f"{WRITE_BEHIND_JOURNAL}.{os.getpid()}" if WORKER_COORDINATION == 'mongo' else WRITE_BEHIND_JOURNAL,
+    change_sequence,
+    batch_size=BULK_BATCH_SIZE,
+    max_pending=WRITE_BEHIND_MAX_PENDING,
+    flush_interval_s=WRITE_BEHIND_FLUSH_MS / 1000,
+    fsync=WRITE_BEHIND_FSYNC,
+)
+metrics.register_stats("write_behind", write_behind.stats, counters=("flushed", "batches", "failures"))
+
+# Fields an update needs from the previous document to adjust the counters
+STATS_PROJECTION = {"_id": 0, "type": 1, "status": 1, "priority": 1}
+
+# Documents fetched per Mongo round-trip while streaming exports
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
 # Pydantic models
 class EmergencyResource(BaseModel):
     id: str = None
@@ -54,6 +263,17 @@ class IncidentReport(BaseModel):
     priority: str = 'medium'
     reported_by: str = 'anonymous'
     reported_at: str = None
+    report_count: int = 1  # reports merged into this incident by deduplication
+    last_reported_at: Optional[str] = None
+
+class NearestResourcesRequest(BaseModel):
+    incident_ids: Optional[List[str]] = None  # default: every unresolved incident
+    type: Optional[str] = None
+    k: int = 5
+    status: Optional[str] = 'active'
+    priority: Optional[str] = None
+    min_capacity: Optional[int] = None
+    max_distance_m: Optional[float] = None
 
 class PowerOutage(BaseModel):
     id: str = None
@@ -66,60 +286,79 @@ class PowerOutage(BaseModel):
     reported_at: str = None
 
 # Sample data initialization
-def init_sample_data():
-    # Clear existing data
-    db.emergency_resources.delete_many({})
-    db.incidents.delete_many({})
-    db.power_outages.delete_many({})
+def seed_id(name):
+    """Stable id for a sample document, so concurrent or repeated seeding cannot duplicate it"""
+    return str(uuid.uuid5(SEED_NAMESPACE, name))
+
+async def init_sample_data(mode=None):
+    mode = mode or SEED_MODE
+    if mode == 'off':
+        return
+    if mode == 'reset':
+        # Clear existing data
+        await asyncio.gather(
+            db.emergency_resources.delete_many({}),
+            db.incidents.delete_many({}),
+            db.power_outages.delete_many({}),
+        )
+        seed_resources = seed_outages = True
+    else:
+        has_resources, has_outages = await asyncio.gather(
+            db.emergency_resources.find_one({}, {"_id": 1}),
+            db.power_outages.find_one({}, {"_id": 1}),
+        )
+        seed_resources = has_resources is None
+        seed_outages = has_outages is None
+    if not seed_resources and not seed_outages:
+        return
     
     # Emergency resources sample data
     sample_resources = [
         # Generators
-        {"id": str(uuid.uuid4()), "name": "Central Generator Unit", "name_he": "יחידת גנרטור מרכזית", "type": "generator", "lat": 32.0853, "lng": 34.7818, "status": "active", "capacity": 500, "description": "Main backup power for downtown area", "description_he": "כוח גיבוי ראשי לאזור המרכז", "contact_phone": "03-1234567", "priority": "high"},
-        {"id": str(uuid.uuid4()), "name": "Hospital Backup Generator", "name_he": "גנרטור גיבוי בית חולים", "type": "generator", "lat": 32.0808, "lng": 34.7805, "status": "active", "capacity": 300, "description": "Emergency power for medical facilities", "description_he": "כוח חירום למתקנים רפואיים", "contact_phone": "03-2345678", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "North Generator Station", "name_he": "תחנת גנרטור צפון", "type": "generator", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 400, "description": "Northern district emergency power", "description_he": "כוח חירום למחוז הצפוני", "contact_phone": "04-3456789", "priority": "high"},
-        {"id": str(uuid.uuid4()), "name": "South Generator Hub", "name_he": "מרכז גנרטור דרום", "type": "generator", "lat": 31.2518, "lng": 34.7915, "status": "maintenance", "capacity": 250, "description": "Southern region backup power", "description_he": "כוח גיבוי לאזור הדרום", "contact_phone": "08-4567890", "priority": "medium"},
-        {"id": str(uuid.uuid4()), "name": "Industrial Generator", "name_he": "גנרטור תעשייתי", "type": "generator", "lat": 31.8927, "lng": 34.8077, "status": "active", "capacity": 600, "description": "Industrial zone emergency power", "description_he": "כוח חירום לאזור התעשייה", "contact_phone": "02-5678901", "priority": "high"},
+        {"name": "Central Generator Unit", "name_he": "יחידת גנרטור מרכזית", "type": "generator", "lat": 32.0853, "lng": 34.7818, "status": "active", "capacity": 500, "description": "Main backup power for downtown area", "description_he": "כוח גיבוי ראשי לאזור המרכז", "contact_phone": "03-1234567", "priority": "high"},
+        {"name": "Hospital Backup Generator", "name_he": "גנרטור גיבוי בית חולים", "type": "generator", "lat": 32.0808, "lng": 34.7805, "status": "active", "capacity": 300, "description": "Emergency power for medical facilities", "description_he": "כוח חירום למתקנים רפואיים", "contact_phone": "03-2345678", "priority": "critical"},
+        {"name": "North Generator Station", "name_he": "תחנת גנרטור צפון", "type": "generator", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 400, "description": "Northern district emergency power", "description_he": "כוח חירום למחוז הצפוני", "contact_phone": "04-3456789", "priority": "high"},
+        {"name": "South Generator Hub", "name_he": "מרכז גנרטור דרום", "type": "generator", "lat": 31.2518, "lng": 34.7915, "status": "maintenance", "capacity": 250, "description": "Southern region backup power", "description_he": "כוח גיבוי לאזור הדרום", "contact_phone": "08-4567890", "priority": "medium"},
+        {"name": "Industrial Generator", "name_he": "גנרטור תעשייתי", "type": "generator", "lat": 31.8927, "lng": 34.8077, "status": "active", "capacity": 600, "description": "Industrial zone emergency power", "description_he": "כוח חירום לאזור התעשייה", "contact_phone": "02-5678901", "priority": "high"},
         
         # Medical facilities
-        {"id": str(uuid.uuid4()), "name": "Ichilov Hospital", "name_he": "בית חולים איכילוב", "type": "medical", "lat": 32.0853, "lng": 34.7818, "status": "active", "capacity": 500, "description": "Major medical center", "description_he": "מרכז רפואי מרכזי", "contact_phone": "03-6974444", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "Hadassah Medical Center", "name_he": "המרכז הרפואי הדסה", "type": "medical", "lat": 31.7683, "lng": 35.1370, "status": "active", "capacity": 800, "description": "Leading medical facility", "description_he": "מתקן רפואי מוביל", "contact_phone": "02-6777111", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "Rambam Health Care Campus", "name_he": "קמפוס הבריאות רמב\"ם", "type": "medical", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 600, "description": "Northern medical hub", "description_he": "מרכז רפואי צפוני", "contact_phone": "04-7772888", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "Soroka Medical Center", "name_he": "המרכז הרפואי סורוקה", "type": "medical", "lat": 31.2518, "lng": 34.7915, "status": "active", "capacity": 400, "description": "Southern region medical center", "description_he": "מרכז רפואי באזור הדרום", "contact_phone": "08-6400111", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "Emergency Clinic Center", "name_he": "מרכז מרפאת חירום", "type": "medical", "lat": 32.0808, "lng": 34.7805, "status": "active", "capacity": 100, "description": "24/7 emergency clinic", "description_he": "מרפאת חירום 24/7", "contact_phone": "03-1112222", "priority": "high"},
+        {"name": "Ichilov Hospital", "name_he": "בית חולים איכילוב", "type": "medical", "lat": 32.0853, "lng": 34.7818, "status": "active", "capacity": 500, "description": "Major medical center", "description_he": "מרכז רפואי מרכזי", "contact_phone": "03-6974444", "priority": "critical"},
+        {"name": "Hadassah Medical Center", "name_he": "המרכז הרפואי הדסה", "type": "medical", "lat": 31.7683, "lng": 35.1370, "status": "active", "capacity": 800, "description": "Leading medical facility", "description_he": "מתקן רפואי מוביל", "contact_phone": "02-6777111", "priority": "critical"},
+        {"name": "Rambam Health Care Campus", "name_he": "קמפוס הבריאות רמב\"ם", "type": "medical", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 600, "description": "Northern medical hub", "description_he": "מרכז רפואי צפוני", "contact_phone": "04-7772888", "priority": "critical"},
+        {"name": "Soroka Medical Center", "name_he": "המרכז הרפואי סורוקה", "type": "medical", "lat": 31.2518, "lng": 34.7915, "status": "active", "capacity": 400, "description": "Southern region medical center", "description_he": "מרכז רפואי באזור הדרום", "contact_phone": "08-6400111", "priority": "critical"},
+        {"name": "Emergency Clinic Center", "name_he": "מרכז מרפאת חירום", "type": "medical", "lat": 32.0808, "lng": 34.7805, "status": "active", "capacity": 100, "description": "24/7 emergency clinic", "description_he": "מרפאת חירום 24/7", "contact_phone": "03-1112222", "priority": "high"},
         
         # Shelters
-        {"id": str(uuid.uuid4()), "name": "Central Shelter Complex", "name_he": "מתחם מקלט מרכזי", "type": "shelter", "lat": 32.0665, "lng": 34.7748, "status": "active", "capacity": 1000, "description": "Main emergency shelter", "description_he": "מקלט חירום ראשי", "contact_phone": "03-9998888", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "School Emergency Shelter", "name_he": "מקלט חירום בבית ספר", "type": "shelter", "lat": 32.0753, "lng": 34.7888, "status": "active", "capacity": 300, "description": "School converted to shelter", "description_he": "בית ספר שהוסב למקלט", "contact_phone": "03-7776666", "priority": "high"},
-        {"id": str(uuid.uuid4()), "name": "Community Center Shelter", "name_he": "מקלט במרכז קהילתי", "type": "shelter", "lat": 31.7683, "lng": 35.1370, "status": "active", "capacity": 200, "description": "Community emergency shelter", "description_he": "מקלט חירום קהילתי", "contact_phone": "02-5554444", "priority": "medium"},
-        {"id": str(uuid.uuid4()), "name": "Underground Shelter", "name_he": "מקלט תת קרקעי", "type": "shelter", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 500, "description": "Underground emergency shelter", "description_he": "מקלט חירום תת קרקעי", "contact_phone": "04-3332222", "priority": "high"},
-        {"id": str(uuid.uuid4()), "name": "Sports Hall Shelter", "name_he": "מקלט באולם ספורט", "type": "shelter", "lat": 31.2518, "lng": 34.7915, "status": "active", "capacity": 400, "description": "Sports facility emergency shelter", "description_he": "מקלט חירום במתקן ספורט", "contact_phone": "08-1119999", "priority": "medium"},
+        {"name": "Central Shelter Complex", "name_he": "מתחם מקלט מרכזי", "type": "shelter", "lat": 32.0665, "lng": 34.7748, "status": "active", "capacity": 1000, "description": "Main emergency shelter", "description_he": "מקלט חירום ראשי", "contact_phone": "03-9998888", "priority": "critical"},
+        {"name": "School Emergency Shelter", "name_he": "מקלט חירום בבית ספר", "type": "shelter", "lat": 32.0753, "lng": 34.7888, "status": "active", "capacity": 300, "description": "School converted to shelter", "description_he": "בית ספר שהוסב למקלט", "contact_phone": "03-7776666", "priority": "high"},
+        {"name": "Community Center Shelter", "name_he": "מקלט במרכז קהילתי", "type": "shelter", "lat": 31.7683, "lng": 35.1370, "status": "active", "capacity": 200, "description": "Community emergency shelter", "description_he": "מקלט חירום קהילתי", "contact_phone": "02-5554444", "priority": "medium"},
+        {"name": "Underground Shelter", "name_he": "מקלט תת קרקעי", "type": "shelter", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 500, "description": "Underground emergency shelter", "description_he": "מקלט חירום תת קרקעי", "contact_phone": "04-3332222", "priority": "high"},
+        {"name": "Sports Hall Shelter", "name_he": "מקלט באולם ספורט", "type": "shelter", "lat": 31.2518, "lng": 34.7915, "status": "active", "capacity": 400, "description": "Sports facility emergency shelter", "description_he": "מקלט חירום במתקן ספורט", "contact_phone": "08-1119999", "priority": "medium"},
         
         # Fire stations
-        {"id": str(uuid.uuid4()), "name": "Central Fire Station", "name_he": "תחנת כיבוי מרכזית", "type": "fire_station", "lat": 32.0853, "lng": 34.7818, "status": "active", "capacity": 20, "description": "Main fire and rescue station", "description_he": "תחנת כיבוי והצלה ראשית", "contact_phone": "102", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "North Fire Station", "name_he": "תחנת כיבוי צפון", "type": "fire_station", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 15, "description": "Northern fire station", "description_he": "תחנת כיבוי צפונית", "contact_phone": "102", "priority": "high"},
-        {"id": str(uuid.uuid4()), "name": "South Fire Station", "name_he": "תחנת כיבוי דרום", "type": "fire_station", "lat": 31.2518, "lng": 34.7915, "status": "active", "capacity": 12, "description": "Southern fire station", "description_he": "תחנת כיבוי דרומית", "contact_phone": "102", "priority": "high"},
+        {"name": "Central Fire Station", "name_he": "תחנת כיבוי מרכזית", "type": "fire_station", "lat": 32.0853, "lng": 34.7818, "status": "active", "capacity": 20, "description": "Main fire and rescue station", "description_he": "תחנת כיבוי והצלה ראשית", "contact_phone": "102", "priority": "critical"},
+        {"name": "North Fire Station", "name_he": "תחנת כיבוי צפון", "type": "fire_station", "lat": 32.7940, "lng": 34.9896, "status": "active", "capacity": 15, "description": "Northern fire station", "description_he": "תחנת כיבוי צפונית", "contact_phone": "102", "priority": "high"},
+        {"name": "South Fire Station", "name_he": "תחנת כיבוי דרום", "type": "fire_station", "lat": 31.2518, "lng": 34.7915, "status": "active", "capacity": 12, "description": "Southern fire station", "description_he": "תחנת כיבוי דרומית", "contact_phone": "102", "priority": "high"},
         
         # Police stations
-        {"id": str(uuid.uuid4()), "name": "Central Police Station", "name_he": "תחנת משטרה מרכזית", "type": "police", "lat": 32.0808, "lng": 34.7805, "status": "active", "capacity": 50, "description": "Main police headquarters", "description_he": "מטה המשטרה הראשי", "contact_phone": "100", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "District Police Station", "name_he": "תחנת משטרה מחוזית", "type": "police", "lat": 31.7683, "lng": 35.1370, "status": "active", "capacity": 30, "description": "District police station", "description_he": "תחנת משטרה מחוזית", "contact_phone": "100", "priority": "high"},
+        {"name": "Central Police Station", "name_he": "תחנת משטרה מרכזית", "type": "police", "lat": 32.0808, "lng": 34.7805, "status": "active", "capacity": 50, "description": "Main police headquarters", "description_he": "מטה המשטרה הראשי", "contact_phone": "100", "priority": "critical"},
+        {"name": "District Police Station", "name_he": "תחנת משטרה מחוזית", "type": "police", "lat": 31.7683, "lng": 35.1370, "status": "active", "capacity": 30, "description": "District police station", "description_he": "תחנת משטרה מחוזית", "contact_phone": "100", "priority": "high"},
         
         # Supply points
-        {"id": str(uuid.uuid4()), "name": "Emergency Supply Center", "name_he": "מרכז אספקה לחירום", "type": "supply", "lat": 32.0753, "lng": 34.7888, "status": "active", "capacity": 1000, "description": "Food and medical supplies", "description_he": "מזון ואספקה רפואית", "contact_phone": "03-4445555", "priority": "high"},
-        {"id": str(uuid.uuid4()), "name": "Water Distribution Point", "name_he": "נקודת חלוקת מים", "type": "water", "lat": 32.0665, "lng": 34.7748, "status": "active", "capacity": 2000, "description": "Emergency water distribution", "description_he": "חלוקת מים לחירום", "contact_phone": "03-6667777", "priority": "critical"},
-        {"id": str(uuid.uuid4()), "name": "Mobile Supply Unit", "name_he": "יחידת אספקה נייד", "type": "supply", "lat": 31.8927, "lng": 34.8077, "status": "active", "capacity": 500, "description": "Mobile emergency supplies", "description_he": "אספקת חירום נייד", "contact_phone": "02-8889999", "priority": "medium"},
+        {"name": "Emergency Supply Center", "name_he": "מרכז אספקה לחירום", "type": "supply", "lat": 32.0753, "lng": 34.7888, "status": "active", "capacity": 1000, "description": "Food and medical supplies", "description_he": "מזון ואספקה רפואית", "contact_phone": "03-4445555", "priority": "high"},
+        {"name": "Water Distribution Point", "name_he": "נקודת חלוקת מים", "type": "water", "lat": 32.0665, "lng": 34.7748, "status": "active", "capacity": 2000, "description": "Emergency water distribution", "description_he": "חלוקת מים לחירום", "contact_phone": "03-6667777", "priority": "critical"},
+        {"name": "Mobile Supply Unit", "name_he": "יחידת אספקה נייד", "type": "supply", "lat": 31.8927, "lng": 34.8077, "status": "active", "capacity": 500, "description": "Mobile emergency supplies", "description_he": "אספקת חירום נייד", "contact_phone": "02-8889999", "priority": "medium"},
     ]
     
-    # Insert sample resources
+    now = datetime.now().isoformat()
     for resource in sample_resources:
-        if resource.get('last_updated') is None:
-            resource['last_updated'] = datetime.now().isoformat()
-        db.emergency_resources.insert_one(resource)
+        resource['id'] = seed_id(resource['name'])
+        resource.setdefault('last_updated', now)
+        resource['location'] = geo.point(resource['lat'], resource['lng'])
     
     # Sample power outages
     sample_outages = [
         {
-            "id": str(uuid.uuid4()),
             "area_name": "Downtown Tel Aviv",
             "area_name_he": "מרכز תל אביב",
             "coordinates": [[32.0853, 34.7818], [32.0753, 34.7818], [32.0753, 34.7918], [32.0853, 34.7918]],
@@ -129,7 +368,6 @@ def init_sample_data():
             "reported_at": datetime.now().isoformat()
         },
         {
-            "id": str(uuid.uuid4()),
             "area_name": "North Jerusalem",
             "area_name_he": "ירושלים צפון",
             "coordinates": [[31.7783, 35.1270], [31.7683, 35.1270], [31.7683, 35.1470], [31.7783, 35.1470]],
@@ -141,87 +379,817 @@ def init_sample_data():
     ]
     
     for outage in sample_outages:
-        db.power_outages.insert_one(outage)
+        outage['id'] = seed_id(outage['area_name'])
+
+    # Duplicate-id errors from a concurrent seeder are expected and harmless
+    if seed_resources:
+        await _insert_seed(db.emergency_resources, sample_resources)
+    if seed_outages:
+        await _insert_seed(db.power_outages, sample_outages)
     
+    outage_polygons.invalidate()
     print("Sample data initialized successfully!")
 
-# Initialize sample data on startup
+async def _insert_seed(collection, docs):
+    async with change_sequence.reserve(len(docs)) as seqs:
+        for doc, seq in zip(docs, seqs):
+            doc['seq'] = seq
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
+async def ensure_indexes():
+    global GEO_QUERY_BACKEND
+    geo_indexed = await indexes.ensure_indexes(db, geo_enabled=GEO_QUERY_BACKEND == 'mongo')
+    if not geo_indexed:
+        GEO_QUERY_BACKEND = 'memory'
+
+async def init_geo_index():
+    # Backfill GeoJSON points for documents written before `location` existed
+    await db.emergency_resources.update_many(
+        {"location": {"$exists": False}},
+        [{"$set": {"location": {"type": "Point", "coordinates": ["$lng", "$lat"]}}}],
+    )
+    if GEO_QUERY_BACKEND == 'memory':
+        resource_grid.clear()
+        async for resource in db.emergency_resources.find({}, {"_id": 0, "id": 1, "lat": 1, "lng": 1, "type": 1}):
+            resource_grid.insert(resource["id"], resource["lat"], resource["lng"], resource.get("type"))
+
+async def init_incident_dedup():
+    if not incident_dedup.enabled:
+        return
+    open_incidents = await db.incidents.find(
+        {"status": {"$ne": "resolved"}},
+        {"_id": 0, "id": 1, "lat": 1, "lng": 1, "type": 1, "reported_at": 1, "last_reported_at": 1},
+    ).to_list(length=None)
+    incident_dedup.load(open_incidents, time.time())
+
+async def init_resource_indexes():
+    resources = await db.emergency_resources.find(
+        {}, {"_id": 0, "id": 1, "lat": 1, "lng": 1, "type": 1, "priority": 1, "status": 1, "capacity": 1}
+    ).to_list(length=None)
+    resource_arrays.load(resources)
+    resource_clusters.load(
+        [resource["id"] for resource in resources],
+        [resource["lat"] for resource in resources],
+        [resource["lng"] for resource in resources],
+        [resource.get("type") for resource in resources],
+        [resource.get("priority") for resource in resources],
+    )
+
+async def run_shared_startup():
+    """Setup of the shared database; with several workers only one of them runs it"""
+    # Indexes first: the unique id index is what makes concurrent seeding safe
+    await ensure_indexes()
+    await change_sequence.ensure_counter()
+    seed_mode = SEED_MODE
+    if seed_mode == 'reset' and WORKER_COORDINATION == 'mongo' and (await startup_lock.state() or {}).get("completed_at"):
+        # Another deployment already started on this database and may still be
+        # serving it; wiping it under its workers' in-memory state is never safe
+        print("SEED_MODE=reset ignored: shared startup already ran on this database (seeding if empty instead)")
+        seed_mode = 'if-empty'
+    await init_sample_data(seed_mode)
+    await change_sequence.backfill()
+    await incident_rollups.ensure()
+    if WORKER_COORDINATION == 'mongo':
+        await worker_bus.ensure()
+
+async def load_worker_state():
+    """This worker's in-memory indexes and counters, read from Mongo"""
+    await asyncio.gather(init_geo_index(), init_resource_indexes(), init_incident_dedup(), stats.reconcile(db, statistics))
+
+async def reload_worker_state():
+    """Rebuild the in-memory state after missing other workers' writes"""
+    print("Worker bus fell behind; reloading in-memory state")
+    await load_worker_state()
+    outage_polygons.invalidate()
+    response_cache.clear()
+
 @app.on_event("startup")
 async def startup_event():
-    init_sample_data()
+    started = time.perf_counter()
+    if WORKER_COORDINATION == 'mongo':
+        ran = await startup_lock.run_once(run_shared_startup, deployment_name)
+        print(f"Shared startup {'ran in' if ran else 'already done for'} worker {worker_name}")
+        # Position taken before loading, so writes made meanwhile are replayed on top
+        bus_position = await worker_bus.position()
+    else:
+        await run_shared_startup()
+    if WRITE_BEHIND_ENABLED:
+        write_behind.on_flushed = _write_behind_flushed
+        orphans = writebehind.orphaned_journals(WRITE_BEHIND_JOURNAL) if WORKER_COORDINATION == 'mongo' else ()
+        recovered = await write_behind.recover(orphans)
+        if recovered:
+            print(f"Recovered {recovered} journalled writes into {write_behind.journal_path}")
+        app.state.write_behind_task = asyncio.create_task(write_behind.run())
+    await load_worker_state()
+    if WORKER_COORDINATION == 'mongo':
+        app.state.bus_publisher_task = asyncio.create_task(worker_bus.run_publisher())
+        app.state.bus_subscriber_task = asyncio.create_task(
+            worker_bus.run_subscriber(_apply_worker_message, reload_worker_state, bus_position)
+        )
+    app.state.heartbeat_task = asyncio.create_task(broadcaster.run_heartbeat())
+    app.state.reconcile_task = asyncio.create_task(reconcile_statistics_periodically())
+    app.state.rollup_task = asyncio.create_task(flush_rollups_periodically())
+    app.state.loop_lag_task = asyncio.create_task(metrics.monitor_event_loop_lag(LOOP_LAG_INTERVAL_SECONDS))
+    if PROFILER_ENABLED:
+        sampling_profiler.start()
+    if EVENT_SOURCE == 'change_stream':
+        app.state.change_stream_task = asyncio.create_task(events.watch_change_streams(db, broadcaster))
+    print(f"Startup completed in {(time.perf_counter() - started) * 1000:.0f} ms (seed mode: {SEED_MODE})")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.heartbeat_task.cancel()
+    app.state.reconcile_task.cancel()
+    app.state.rollup_task.cancel()
+    app.state.loop_lag_task.cancel()
+    sampling_profiler.stop()
+    if EVENT_SOURCE == 'change_stream':
+        app.state.change_stream_task.cancel()
+    if WRITE_BEHIND_ENABLED:
+        # Stop the flush loop before draining so the two never flush concurrently
+        app.state.write_behind_task.cancel()
+        try:
+            await app.state.write_behind_task
+        except asyncio.CancelledError:
+            pass
+        await write_behind.close()
+    await incident_rollups.flush()
+    if WORKER_COORDINATION == 'mongo':
+        app.state.bus_subscriber_task.cancel()
+        app.state.bus_publisher_task.cancel()
+    client.close()
+
+async def reconcile_statistics_periodically():
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_SECONDS)
+        try:
+            await stats.reconcile(db, statistics)
+            response_cache.invalidate("statistics")
+        except Exception as e:
+            print(f"Statistics reconciliation failed: {e}")
+
+async def flush_rollups_periodically():
+    while True:
+        await asyncio.sleep(ROLLUP_FLUSH_SECONDS)
+        try:
+            await incident_rollups.flush()
+        except Exception as e:
+            print(f"Incident rollup flush failed: {e}")
+
+def publish_change(event_type, data, previous=None):
+    """Announce a write: invalidate cached responses, notify subscribers and the other workers.
+
+    `previous` is the document's STATS_PROJECTION before an update or
+    delete, which other workers need to adjust their statistics.
+    """
+    response_cache.invalidate(events.topic_of(event_type))
+    if EVENT_SOURCE == 'local':
+        broadcaster.publish(event_type, data)
+    if WORKER_COORDINATION == 'mongo':
+        worker_bus.publish({"event": event_type, "data": data, "previous": previous})
+
+def _apply_worker_message(message):
+    """Mirror a write handled by another worker into this worker's in-memory state"""
+    event_type, data, previous = message["event"], message["data"], message.get("previous")
+    topic = events.topic_of(event_type)
+    if event_type == "resource.deleted":
+        statistics.record_delete("emergency_resources", previous)
+        _unindex_resource(data["id"])
+    elif topic == "resource":
+        if previous is None:
+            statistics.record_insert("emergency_resources", data)
+        else:
+            statistics.record_update("emergency_resources", previous, data)
+        _index_resource(data)
+    elif event_type == "incident.created":
+        statistics.record_insert("incidents", data)
+        if incident_dedup.enabled and data.get("status") != "resolved":
+            incident_dedup.track(data["id"], data["lat"], data["lng"], data.get("type"), dedup.timestamp(data.get("reported_at")))
+    elif event_type == "incident.updated":
+        incident_dedup.touch(data["id"], dedup.timestamp(data.get("last_reported_at")))
+    elif topic == "outage":
+        if previous is None:
+            statistics.record_insert("power_outages", data)
+        else:
+            statistics.record_update("power_outages", previous, data)
+        outage_polygons.invalidate()
+    response_cache.invalidate(topic)
+    if EVENT_SOURCE == 'local':
+        broadcaster.publish(event_type, data)
+
+async def _bulk_create(request, collection, model, new_document, created, duplicate_of=None, merge=None):
+    try:
+        items = ingest.read_items(request, BULK_MAX_ITEMS)
+        return await ingest.bulk_insert(
+            collection, items, model, new_document, created, BULK_BATCH_SIZE, change_sequence, duplicate_of, merge
+        )
+    except ingest.BulkRequestError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
 # API Routes
+def _list_params(model, fields, limit, sort_keys, exclude=()):
+    """Projection and capped page size for a list endpoint"""
+    try:
+        names = pagination.parse_fields(fields, model.__fields__)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None:
+        if limit <= 0:
+            raise HTTPException(status_code=400, detail="limit must be positive")
+        limit = min(limit, MAX_PAGE_SIZE)
+    return pagination.projection(names, always=sort_keys, exclude=exclude), limit
+
+async def _fetch_page(collection, query, sort_keys, fields_projection, limit, cursor):
+    try:
+        return await pagination.fetch_page(collection, query, sort_keys, fields_projection, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/resources")
-async def get_resources(type: Optional[str] = None):
+async def get_resources(
+    request: Request,
+    type: Optional[str] = None,
+    bbox: Optional[str] = None,
+    near: Optional[str] = None,
+    radius_m: Optional[float] = None,
+    nearest: Optional[int] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
     query = {}
     if type:
         query["type"] = type
-    
-    resources = list(db.emergency_resources.find(query, {"_id": 0}))
-    return {"resources": resources}
+
+    try:
+        bounds = geo.parse_bbox(bbox) if bbox else None
+        center = geo.parse_latlng(near) if near else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if (radius_m is not None or nearest is not None) and center is None:
+        raise HTTPException(status_code=400, detail="radius_m and nearest require near=lat,lng")
+    if radius_m is not None and radius_m <= 0:
+        raise HTTPException(status_code=400, detail="radius_m must be positive")
+    if nearest is not None and nearest <= 0:
+        raise HTTPException(status_code=400, detail="nearest must be positive")
+    if bounds and center:
+        raise HTTPException(status_code=400, detail="bbox cannot be combined with near")
+    if center and cursor:
+        raise HTTPException(status_code=400, detail="near results are not paginated, use nearest")
+
+    fields_projection, limit = _list_params(EmergencyResource, fields, limit, RESOURCE_SORT_KEYS, exclude=("location",))
+
+    if center:
+        if limit is not None:
+            nearest = min(nearest, limit) if nearest else limit
+        if GEO_QUERY_BACKEND == 'memory':
+            resources = await _grid_nearest(query, center, radius_m, nearest, fields_projection)
+        else:
+            pipeline = [geo.geo_near_stage(center[0], center[1], query, radius_m)]
+            if nearest is not None:
+                pipeline.append({"$limit": nearest})
+            if fields:
+                fields_projection["distance_m"] = 1
+            pipeline.append({"$project": fields_projection})
+            resources = await db.emergency_resources.aggregate(pipeline).to_list(length=None)
+        return encoding.respond(request.headers.get("accept"), {"resources": resources, "next_cursor": None}, "resources")
+
+    if bounds and GEO_QUERY_BACKEND == 'memory':
+        where = (lambda resource_type: resource_type == type) if type else None
+        query["id"] = {"$in": resource_grid.within_bbox(*bounds, where=where)}
+    elif bounds:
+        query.update(geo.bbox_query(*bounds))
+
+    resources, next_cursor = await _fetch_page(
+        db.emergency_resources, query, RESOURCE_SORT_KEYS, fields_projection, limit, cursor
+    )
+    return encoding.respond(request.headers.get("accept"), {"resources": resources, "next_cursor": next_cursor}, "resources")
+
+async def _grid_nearest(query, center, radius_m, nearest, fields_projection):
+    where = (lambda resource_type: resource_type == query["type"]) if "type" in query else None
+    if nearest is not None:
+        hits = resource_grid.nearest(center[0], center[1], nearest, radius_m, where=where)
+    elif radius_m is not None:
+        hits = resource_grid.within_radius(center[0], center[1], radius_m, where=where)
+    else:
+        hits = resource_grid.nearest(center[0], center[1], len(resource_grid), where=where)
+
+    docs = await db.emergency_resources.find(
+        {"id": {"$in": [key for key, _ in hits]}}, fields_projection
+    ).to_list(length=None)
+    by_id = {doc["id"]: doc for doc in docs}
+    resources = []
+    for key, distance in hits:
+        doc = by_id.get(key)
+        if doc is None:
+            continue
+        doc["distance_m"] = distance
+        resources.append(doc)
+    return resources
 
 @app.get("/api/resources/{resource_id}")
 async def get_resource(resource_id: str):
-    resource = db.emergency_resources.find_one({"id": resource_id}, {"_id": 0})
+    resource = await db.emergency_resources.find_one({"id": resource_id}, {"_id": 0, "location": 0})
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     return resource
 
-@app.post("/api/resources")
-async def create_resource(resource: EmergencyResource):
+def _new_resource_document(resource: EmergencyResource):
     resource.id = str(uuid.uuid4())
     resource.last_updated = datetime.now().isoformat()
-    db.emergency_resources.insert_one(resource.dict())
+    return {**resource.dict(), "location": geo.point(resource.lat, resource.lng)}
+
+def _index_resource(resource):
+    """Add or move a resource (as a dict) in the in-memory geo, cluster and dispatch indexes"""
+    if GEO_QUERY_BACKEND == 'memory':
+        resource_grid.insert(resource["id"], resource["lat"], resource["lng"], resource.get("type"))
+    resource_clusters.insert(resource["id"], resource["lat"], resource["lng"], resource.get("type"), resource.get("priority"))
+    resource_arrays.upsert(resource)
+
+def _unindex_resource(resource_id):
+    resource_grid.remove(resource_id)
+    resource_clusters.remove(resource_id)
+    resource_arrays.remove(resource_id)
+
+def _resource_created(resource: EmergencyResource):
+    statistics.record_insert("emergency_resources", resource.dict())
+    _index_resource(resource.dict())
+    publish_change("resource.created", resource.dict())
+
+@app.post("/api/resources")
+async def create_resource(resource: EmergencyResource):
+    async with change_sequence.reserve() as (seq,):
+        await db.emergency_resources.insert_one({**_new_resource_document(resource), "seq": seq})
+    _resource_created(resource)
     return resource
 
+@app.post("/api/resources:bulk")
+async def create_resources_bulk(request: Request):
+    """Insert a JSON array or NDJSON stream of resources in unordered batches"""
+    return await _bulk_create(request, db.emergency_resources, EmergencyResource, _new_resource_document, _resource_created)
+
 @app.put("/api/resources/{resource_id}")
 async def update_resource(resource_id: str, resource: EmergencyResource):
+    resource.id = resource_id
     resource.last_updated = datetime.now().isoformat()
-    result = db.emergency_resources.update_one(
-        {"id": resource_id}, 
-        {"$set": resource.dict()}
-    )
-    if result.matched_count == 0:
+    async with change_sequence.reserve() as (seq,):
+        previous = await db.emergency_resources.find_one_and_update(
+            {"id": resource_id}, 
+            {"$set": {**resource.dict(exclude={"id"}), "location": geo.point(resource.lat, resource.lng), "seq": seq}},
+            projection=STATS_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+        )
+    if previous is None:
         raise HTTPException(status_code=404, detail="Resource not found")
+    statistics.record_update("emergency_resources", previous, resource.dict())
+    _index_resource(resource.dict())
+    publish_change("resource.updated", resource.dict(), previous)
     return resource
 
+@app.delete("/api/resources/{resource_id}")
+async def delete_resource(resource_id: str):
+    async with change_sequence.reserve() as (seq,):
+        previous = await db.emergency_resources.find_one_and_delete({"id": resource_id}, projection=STATS_PROJECTION)
+        if previous is None:
+            raise HTTPException(status_code=404, detail="Resource not found")
+        # Tombstone so /api/changes can tell clients to drop their copy
+        await db[changes.DELETIONS_COLLECTION].insert_one({
+            "collection": "resources", "id": resource_id, "seq": seq, "deleted_at": datetime.now().isoformat(),
+        })
+    statistics.record_delete("emergency_resources", previous)
+    _unindex_resource(resource_id)
+    publish_change("resource.deleted", {"id": resource_id}, previous)
+    return {"id": resource_id, "deleted": True}
+
+@app.get("/api/tiles/{z}/{x}/{y}")
+async def get_tile(z: int, x: int, y: int):
+    """Resource clusters in XYZ tile z/x/y with counts by type and priority"""
+    if not 0 <= z <= MAX_TILE_ZOOM:
+        raise HTTPException(status_code=400, detail=f"z must be between 0 and {MAX_TILE_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="tile x/y out of range for zoom")
+    return JSONResponse({"z": z, "x": x, "y": y, "clusters": resource_clusters.tile(z, x, y)})
+
+@app.get("/api/clusters")
+async def get_clusters(bbox: str, zoom: int):
+    """Resource clusters at `zoom` whose centroid lies in `bbox`"""
+    if not 0 <= zoom <= MAX_TILE_ZOOM:
+        raise HTTPException(status_code=400, detail=f"zoom must be between 0 and {MAX_TILE_ZOOM}")
+    try:
+        min_lng, min_lat, max_lng, max_lat = geo.parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tiles = list(clusters.tile_range(zoom, min_lng, min_lat, max_lng, max_lat))
+    if len(tiles) > MAX_CLUSTER_TILES:
+        raise HTTPException(status_code=400, detail=f"bbox covers more than {MAX_CLUSTER_TILES} tiles at this zoom")
+    found = [
+        cluster
+        for x, y in tiles
+        for cluster in resource_clusters.tile(zoom, x, y)
+        if min_lat <= cluster["lat"] <= max_lat and min_lng <= cluster["lng"] <= max_lng
+    ]
+    return JSONResponse({"zoom": zoom, "clusters": found})
+
 @app.get("/api/incidents")
-async def get_incidents():
-    incidents = list(db.incidents.find({}, {"_id": 0}))
-    return {"incidents": incidents}
+async def get_incidents(request: Request, fields: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    fields_projection, limit = _list_params(IncidentReport, fields, limit, REPORT_SORT_KEYS)
+    incidents, next_cursor = await _fetch_page(
+        db.incidents, {}, REPORT_SORT_KEYS, fields_projection, limit, cursor
+    )
+    return encoding.respond(request.headers.get("accept"), {"incidents": incidents, "next_cursor": next_cursor}, "incidents")
+
+def _new_incident_document(incident: IncidentReport):
+    incident.id = str(uuid.uuid4())
+    incident.reported_at = incident.last_reported_at = datetime.now().isoformat()
+    incident.report_count = 1
+    return incident.dict()
+
+def _incident_created(incident: IncidentReport):
+    statistics.record_insert("incidents", incident.dict())
+    incident_rollups.record_incident(incident.dict())
+    if incident_dedup.enabled and incident.status != "resolved":
+        incident_dedup.track(incident.id, incident.lat, incident.lng, incident.type, dedup.timestamp(incident.reported_at))
+    publish_change("incident.created", incident.dict())
+
+async def _merge_incident_report(incident_id: str, report: IncidentReport):
+    """Count `report` against an existing open incident; None if that incident is gone or resolved"""
+    await incident_dedup.inserted(incident_id)
+    async with change_sequence.reserve() as (seq,):
+        merged = await db.incidents.find_one_and_update(
+            {"id": incident_id, "status": {"$ne": "resolved"}},
+            [{"$set": {
+                "report_count": {"$add": [{"$ifNull": ["$report_count", 1]}, 1]},
+                "last_reported_at": report.reported_at,
+                "seq": seq,
+            }}],
+            # Same shape as a freshly created incident
+            projection={"_id": 0, "seq": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+    if merged is None:
+        incident_dedup.forget(incident_id)
+        return None
+    incident_dedup.touch(incident_id, dedup.timestamp(report.reported_at))
+    incident_dedup.merged += 1
+    incident_rollups.record_report(merged, report.reported_at)
+    publish_change("incident.updated", merged)
+    return merged
 
 @app.post("/api/incidents")
 async def create_incident(incident: IncidentReport):
-    incident.id = str(uuid.uuid4())
-    incident.reported_at = datetime.now().isoformat()
-    db.incidents.insert_one(incident.dict())
+    document = _new_incident_document(incident)
+    if incident_dedup.enabled and incident.status != "resolved":
+        duplicate_of = incident_dedup.match(incident.lat, incident.lng, incident.type, dedup.timestamp(incident.reported_at))
+        if duplicate_of is not None:
+            merged = await _merge_incident_report(duplicate_of, incident)
+            if merged is not None:
+                return merged
+        # Tracked before the insert so that concurrent duplicates merge into it
+        incident_dedup.track(incident.id, incident.lat, incident.lng, incident.type, dedup.timestamp(incident.reported_at))
+    if WRITE_BEHIND_ENABLED:
+        # Duplicates of this report wait in _merge_incident_report until it is flushed
+        incident_dedup.begin_insert(incident.id)
+        try:
+            await write_behind.submit("incidents", document)
+        except BaseException:
+            incident_dedup.end_insert(incident.id, failed=True)
+            raise
+        return incident
+    with incident_dedup.inserting(incident.id):
+        async with change_sequence.reserve() as (seq,):
+            await db.incidents.insert_one({**document, "seq": seq})
+    _incident_created(incident)
     return incident
 
+def _bulk_incident_duplicate(incident: IncidentReport):
+    """Open incident a bulk report repeats; otherwise the report is tracked so later ones merge into it"""
+    if not incident_dedup.enabled or incident.status == "resolved":
+        return None
+    reported = dedup.timestamp(incident.reported_at)
+    duplicate_of = incident_dedup.match(incident.lat, incident.lng, incident.type, reported)
+    if duplicate_of is None:
+        incident_dedup.track(incident.id, incident.lat, incident.lng, incident.type, reported)
+    return duplicate_of
+
+@app.post("/api/incidents:bulk")
+async def create_incidents_bulk(request: Request):
+    """Insert a JSON array or NDJSON stream of incident reports in unordered batches, merging duplicates"""
+    return await _bulk_create(
+        request, db.incidents, IncidentReport, _new_incident_document, _incident_created,
+        _bulk_incident_duplicate, _merge_incident_report,
+    )
+
+async def _nearest_resources(incidents, type, k, status, priority, min_capacity, max_distance_m):
+    """[(incident, [resource + distance_m, ...]), ...] ranked by haversine distance"""
+    if not 1 <= k <= MAX_NEAREST_K:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_NEAREST_K}")
+    if min_capacity is not None and min_capacity < 0:
+        raise HTTPException(status_code=400, detail="min_capacity must not be negative")
+    rows = resource_arrays.candidates(type=type, status=status or None, priority=priority, min_capacity=min_capacity)
+    hits = resource_arrays.nearest([(incident["lat"], incident["lng"]) for incident in incidents], k, rows, max_distance_m)
+    ids = list({key for ranked in hits for key, _ in ranked})
+    docs = await db.emergency_resources.find({"id": {"$in": ids}}, {"_id": 0, "location": 0}).to_list(length=None)
+    by_id = {doc["id"]: doc for doc in docs}
+    return [
+        (incident, [{**by_id[key], "distance_m": round(distance, 1)} for key, distance in ranked if key in by_id])
+        for incident, ranked in zip(incidents, hits)
+    ]
+
+NEAREST_INCIDENT_FIELDS = {"_id": 0, "id": 1, "title": 1, "title_he": 1, "type": 1, "status": 1, "priority": 1, "lat": 1, "lng": 1}
+
+def _rollup_params(since, until, type, priority):
+    """Time window (default: the last TIMESERIES_DEFAULT_HOURS) and field filters of a rollup query"""
+    try:
+        until = rollups.parse_time(until) if until else datetime.now()
+        since = rollups.parse_time(since) if since else until - timedelta(hours=TIMESERIES_DEFAULT_HOURS)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since and until must be ISO 8601 timestamps")
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    return since, until, {"type": type, "priority": priority}
+
+@app.get("/api/incidents/timeseries")
+async def get_incident_timeseries(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    interval: str = 'hour',
+    by: Optional[str] = 'type',
+    type: Optional[str] = None,
+    priority: Optional[str] = None,
+    geohash: Optional[str] = None,
+):
+    """Incidents and reports per hour or day, broken down by type or priority (`by=` for totals only)"""
+    since, until, filters = _rollup_params(since, until, type, priority)
+    if interval not in rollups.INTERVAL_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(rollups.INTERVAL_WIDTHS)}")
+    if by and by not in rollups.BREAKDOWNS:
+        raise HTTPException(status_code=400, detail=f"by must be one of {', '.join(rollups.BREAKDOWNS)}")
+    step = timedelta(hours=1) if interval == 'hour' else timedelta(days=1)
+    if (until - since) / step > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_TIMESERIES_BUCKETS} buckets per request")
+    if geohash and (len(geohash) > ROLLUP_GEOHASH_PRECISION or set(geohash) - set(geo.GEOHASH_ALPHABET)):
+        raise HTTPException(status_code=400, detail=f"geohash must be up to {ROLLUP_GEOHASH_PRECISION} geohash characters")
+    buckets = await incident_rollups.timeseries(since, until, interval, by or None, filters, geohash)
+    return {"since": since.isoformat(), "until": until.isoformat(), "interval": interval, "buckets": buckets}
+
+@app.get("/api/incidents/heatmap")
+async def get_incident_heatmap(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    precision: int = 5,
+    type: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[str] = None,
+):
+    """Incident density per geohash cell of `precision` characters, optionally limited to a bbox"""
+    since, until, filters = _rollup_params(since, until, type, priority)
+    if not 1 <= precision <= ROLLUP_GEOHASH_PRECISION:
+        raise HTTPException(status_code=400, detail=f"precision must be between 1 and {ROLLUP_GEOHASH_PRECISION}")
+    try:
+        bounds = geo.parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cells = await incident_rollups.heatmap(since, until, precision, filters, bounds)
+    return {"since": since.isoformat(), "until": until.isoformat(), "precision": precision, "cells": cells}
+
+@app.get("/api/incidents/{incident_id}/nearest-resources")
+async def get_nearest_resources(
+    incident_id: str,
+    type: Optional[str] = None,
+    k: int = 5,
+    status: Optional[str] = 'active',
+    priority: Optional[str] = None,
+    min_capacity: Optional[int] = None,
+    max_distance_m: Optional[float] = None,
+):
+    """The `k` closest resources to an incident matching type/status/priority/capacity (`status=` for any)"""
+    incident = await db.incidents.find_one({"id": incident_id}, NEAREST_INCIDENT_FIELDS)
+    if incident is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    [(incident, resources)] = await _nearest_resources([incident], type, k, status, priority, min_capacity, max_distance_m)
+    return {"incident": incident, "resources": resources}
+
+@app.post("/api/incidents/nearest-resources")
+async def batch_nearest_resources(request: NearestResourcesRequest):
+    """Nearest resources for many incidents (all unresolved ones by default) in one vectorized pass"""
+    if request.incident_ids is None:
+        query = {"status": {"$ne": "resolved"}}
+    elif len(request.incident_ids) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"at most {BULK_MAX_ITEMS} incidents per request")
+    else:
+        query = {"id": {"$in": request.incident_ids}}
+    incidents = await db.incidents.find(query, NEAREST_INCIDENT_FIELDS).to_list(length=BULK_MAX_ITEMS)
+    results = await _nearest_resources(
+        incidents, request.type, request.k, request.status, request.priority, request.min_capacity, request.max_distance_m
+    )
+    found = {incident["id"] for incident in incidents}
+    return {
+        "results": [{"incident": incident, "resources": resources} for incident, resources in results],
+        "not_found": [incident_id for incident_id in request.incident_ids or () if incident_id not in found],
+    }
+
 @app.get("/api/power-outages")
-async def get_power_outages():
-    outages = list(db.power_outages.find({}, {"_id": 0}))
-    return {"outages": outages}
+async def get_power_outages(request: Request, fields: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    fields_projection, limit = _list_params(PowerOutage, fields, limit, REPORT_SORT_KEYS)
+    outages, next_cursor = await _fetch_page(
+        db.power_outages, {}, REPORT_SORT_KEYS, fields_projection, limit, cursor
+    )
+    return encoding.respond(request.headers.get("accept"), {"outages": outages, "next_cursor": next_cursor}, "outages")
 
 @app.post("/api/power-outages")
 async def create_power_outage(outage: PowerOutage):
     outage.id = str(uuid.uuid4())
     outage.reported_at = datetime.now().isoformat()
-    db.power_outages.insert_one(outage.dict())
+    if WRITE_BEHIND_ENABLED:
+        await write_behind.submit("power_outages", outage.dict())
+        return outage
+    async with change_sequence.reserve() as (seq,):
+        await db.power_outages.insert_one({**outage.dict(), "seq": seq})
+    _outage_created(outage)
+    return outage
+
+def _outage_created(outage: PowerOutage):
+    statistics.record_insert("power_outages", outage.dict())
+    outage_polygons.invalidate()
+    publish_change("outage.created", outage.dict())
+
+def _write_behind_flushed(collection, documents):
+    """Post-insert bookkeeping for a write-behind batch once it is in Mongo"""
+    for document in documents:
+        if collection == "incidents":
+            incident = IncidentReport(**document)
+            incident_dedup.end_insert(incident.id)
+            _incident_created(incident)
+        else:
+            _outage_created(PowerOutage(**document))
+
+@app.put("/api/power-outages/{outage_id}")
+async def update_power_outage(outage_id: str, outage: PowerOutage):
+    outage.id = outage_id
+    async with change_sequence.reserve() as (seq,):
+        previous = await db.power_outages.find_one_and_update(
+            {"id": outage_id},
+            {"$set": {**outage.dict(exclude={"id", "reported_at"}), "seq": seq}},
+            projection=STATS_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+        )
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Power outage not found")
+    statistics.record_update("power_outages", previous, outage.dict())
+    outage_polygons.invalidate()
+    publish_change("outage.updated", outage.dict(), previous)
     return outage
 
+async def _active_outage_polygons():
+    if outage_polygons.stale:
+        generation = outage_polygons.generation
+        active = await db.power_outages.find({"status": "active"}, {"_id": 0}).to_list(length=None)
+        outage_polygons.load(active, generation)
+    return outage_polygons
+
+AFFECTED_RESOURCE_FIELDS = {"_id": 0, "id": 1, "name": 1, "name_he": 1, "type": 1, "status": 1, "priority": 1, "capacity": 1, "lat": 1, "lng": 1}
+AFFECTED_INCIDENT_FIELDS = {"_id": 0, "id": 1, "title": 1, "title_he": 1, "type": 1, "status": 1, "priority": 1, "lat": 1, "lng": 1}
+
+@app.get("/api/power-outages/affected")
+async def get_outage_affected(outage_id: Optional[str] = None, type: Optional[str] = None):
+    """Resources and unresolved incidents inside each active outage polygon"""
+    polygons = await _active_outage_polygons()
+    if outage_id is not None and outage_id not in polygons.ids:
+        raise HTTPException(status_code=404, detail="Active power outage not found")
+    # Only documents inside some polygon's bounding box are fetched; the
+    # polygon test then runs on those candidates. Plain lat/lng ranges, since
+    # a $geoWithin box has geodesic edges that miss points near them
+    boxes = polygons.boxes(outage_id)
+    if not boxes:
+        return {"outages": []}
+    ranges = [{"lat": {"$gte": box[0], "$lte": box[2]}, "lng": {"$gte": box[1], "$lte": box[3]}} for box in boxes]
+    resource_query = {"$or": ranges, **({"type": type} if type else {})}
+    incident_query = {"status": {"$ne": "resolved"}, "$or": ranges}
+    resources, incidents = await asyncio.gather(
+        db.emergency_resources.find(resource_query, AFFECTED_RESOURCE_FIELDS).to_list(length=None),
+        db.incidents.find(incident_query, AFFECTED_INCIDENT_FIELDS).to_list(length=None),
+    )
+
+    def point_set(docs):
+        return outages.PointSet(
+            np.fromiter((doc["lat"] for doc in docs), dtype=np.float64, count=len(docs)),
+            np.fromiter((doc["lng"] for doc in docs), dtype=np.float64, count=len(docs)),
+        )
+
+    resource_hits = polygons.contains(point_set(resources), outage_id)
+    incident_hits = polygons.contains(point_set(incidents), outage_id)
+
+    affected = []
+    for summary in polygons.summaries:
+        if outage_id is not None and summary["id"] != outage_id:
+            continue
+        affected.append({
+            **summary,
+            "resources": [resources[i] for i in resource_hits.get(summary["id"], ())],
+            "incidents": [incidents[i] for i in incident_hits.get(summary["id"], ())],
+        })
+    return {"outages": affected}
+
+EXPORT_COLLECTIONS = {
+    "resources": ("emergency_resources", EmergencyResource),
+    "incidents": ("incidents", IncidentReport),
+    "power-outages": ("power_outages", PowerOutage),
+}
+
+@app.get("/api/export/{collection}")
+async def export_collection(
+    collection: str,
+    format: str = "ndjson",
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    if format not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(export.MEDIA_TYPES)}")
+
+    collection_name, model = EXPORT_COLLECTIONS[collection]
+    query = {}
+    if type:
+        query["type"] = type
+    if status:
+        query["status"] = status
+
+    docs = db[collection_name].find(query, {"_id": 0, "location": 0}).batch_size(EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        export.stream(docs, format, list(model.__fields__)),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{export.EXTENSIONS[format]}"'},
+    )
+
+STREAM_TOPICS = {"resource", "incident", "outage"}
+
+@app.get("/api/stream")
+async def stream_changes(topics: Optional[str] = None):
+    """Server-Sent Events feed of create/update events, optionally limited to some topics"""
+    selected = [topic.strip() for topic in topics.split(",") if topic.strip()] if topics else None
+    if selected and not set(selected) <= STREAM_TOPICS:
+        raise HTTPException(status_code=400, detail=f"topics must be among {', '.join(sorted(STREAM_TOPICS))}")
+    subscriber = broadcaster.subscribe(selected)
+    return StreamingResponse(
+        broadcaster.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/changes")
+async def get_changes(since: int = 0, limit: Optional[int] = None):
+    """Resources, incidents, outages and deletions written after change `since`.
+
+    Clients keep the returned `next_since` and pass it on their next call;
+    while `has_more` is true there are further changes to fetch right away.
+    """
+    if since < 0:
+        raise HTTPException(status_code=400, detail="since must not be negative")
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    limit = min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+    horizon = await change_sequence.horizon()
+    return await changes.changes_since(db, since, horizon, limit)
+
 @app.get("/api/statistics")
 async def get_statistics():
-    total_resources = db.emergency_resources.count_documents({})
-    active_resources = db.emergency_resources.count_documents({"status": "active"})
-    open_incidents = db.incidents.count_documents({"status": "open"})
-    active_outages = db.power_outages.count_documents({"status": "active"})
-    
-    return {
-        "total_resources": total_resources,
-        "active_resources": active_resources,
-        "open_incidents": open_incidents,
-        "active_outages": active_outages
-    }
+    return statistics.snapshot()
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return response_cache.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    # CONTENT_TYPE_LATEST already carries the charset, so it is not passed as media_type
+    return Response(generate_latest(metrics.registry), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+@app.get("/api/debug/profiler")
+async def get_profile(format: str = 'collapsed'):
+    """Samples collected so far: collapsed stacks (flamegraph input) or ?format=status"""
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if format == 'status':
+        return sampling_profiler.status()
+    if format != 'collapsed':
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'status'")
+    return PlainTextResponse(sampling_profiler.collapsed())
+
+@app.put("/api/debug/profiler")
+async def toggle_profiler(enabled: bool):
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Started from a request handler, so the sampled thread is the event loop's
+    if enabled:
+        sampling_profiler.start()
+    else:
+        sampling_profiler.stop()
+    return sampling_profiler.status()
 
 @app.get("/api/health")
 async def health_check():
@@ -229,4 +1197,8 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    if WORKERS > 1:
+        # Workers import the app themselves, so it is passed by name
+        uvicorn.run("server:app", host="0.0.0.0", port=8001, workers=WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,91 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+
+# Fields broken down per collection in /api/statistics
+BREAKDOWN_FIELDS = {
+    "emergency_resources": ("type", "status", "priority"),
+    "incidents": ("type", "status", "priority"),
+    "power_outages": ("status",),
+}
+
+
+class StatisticsCounters:
+    """Per-collection document counts by field value, maintained on every write.
+
+    Counts start from a Mongo aggregation (`reconcile`) and are then adjusted
+    in memory by the write handlers, so reads never touch the database.
+    Periodic reconciliation corrects drift from writes made by other
+    processes or directly in Mongo.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, int] = {name: 0 for name in BREAKDOWN_FIELDS}
+        self.counts: Dict[str, Dict[str, Counter]] = {
+            name: {field: Counter() for field in fields} for name, fields in BREAKDOWN_FIELDS.items()
+        }
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    def _apply(self, collection: str, doc: Dict[str, Any], delta: int) -> None:
+        self.totals[collection] += delta
+        for field, counter in self.counts[collection].items():
+            value = doc.get(field)
+            counter[value] += delta
+            if counter[value] <= 0:
+                del counter[value]
+        self._snapshot = None
+
+    def record_insert(self, collection: str, doc: Dict[str, Any]) -> None:
+        self._apply(collection, doc, 1)
+
+    def record_update(self, collection: str, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        fields = BREAKDOWN_FIELDS[collection]
+        if any(before.get(field) != after.get(field) for field in fields):
+            self._apply(collection, before, -1)
+            self._apply(collection, after, 1)
+
+    def record_delete(self, collection: str, doc: Dict[str, Any]) -> None:
+        self._apply(collection, doc, -1)
+
+    def count(self, collection: str, field: str, value: Any) -> int:
+        return self.counts[collection][field].get(value, 0)
+
+    def load(self, collection: str, total: int, groups: Dict[str, Iterable[Dict[str, Any]]]) -> None:
+        """Replace a collection's counts with `$group` results ({"_id": value, "count": n} per field)"""
+        self.totals[collection] = total
+        for field in BREAKDOWN_FIELDS[collection]:
+            self.counts[collection][field] = Counter(
+                {group["_id"]: group["count"] for group in groups.get(field, ())}
+            )
+        self._snapshot = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self._snapshot is None:
+            snapshot = {
+                "total_resources": self.totals["emergency_resources"],
+                "active_resources": self.count("emergency_resources", "status", "active"),
+                "open_incidents": self.count("incidents", "status", "open"),
+                "active_outages": self.count("power_outages", "status", "active"),
+            }
+            for name, key in (("emergency_resources", "resources"), ("incidents", "incidents"), ("power_outages", "outages")):
+                breakdown = {"total": self.totals[name]}
+                for field, counter in self.counts[name].items():
+                    breakdown[f"by_{field}"] = {str(value): count for value, count in sorted(counter.items(), key=lambda item: str(item[0]))}
+                snapshot[key] = breakdown
+            self._snapshot = snapshot
+        return self._snapshot
+
+
+def reconcile_pipeline(collection: str) -> list:
+    """Single `$facet` aggregation returning the total and one `$group` per breakdown field"""
+    facets = {"total": [{"$count": "count"}]}
+    for field in BREAKDOWN_FIELDS[collection]:
+        facets[field] = [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+    return [{"$facet": facets}]
+
+
+async def reconcile(db, counters: StatisticsCounters) -> None:
+    for collection in BREAKDOWN_FIELDS:
+        result = await db[collection].aggregate(reconcile_pipeline(collection)).to_list(length=1)
+        facets = result[0] if result else {}
+        total = facets.get("total") or [{"count": 0}]
+        counters.load(collection, total[0]["count"], facets)
@@ -0,0 +1,264 @@
+import asyncio
+import glob
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from pymongo.errors import BulkWriteError
+
+import metrics
+
+DUPLICATE_KEY = 11000
+
+# (journal number, collection, document)
+Entry = Tuple[int, str, Dict[str, Any]]
+
+
+def orphaned_journals(base_path: str) -> List[str]:
+    """Per-worker journals (`<base_path>.<pid>`) on this host whose process has exited.
+
+    Journals being adopted are named `<base_path>.<pid>.claimed-<adopter pid>`
+    and count as orphaned again if the adopter died too.
+    """
+    orphans = []
+    for path in glob.glob(glob.escape(base_path) + ".*"):
+        pid = path[len(base_path) + 1:].rsplit(".claimed-", 1)[-1]
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            orphans.append(path)
+        except PermissionError:
+            pass
+    return orphans
+
+
+class WriteBehindQueue:
+    """Acknowledged write buffer that batches inserts into periodic `insert_many` flushes.
+
+    `submit` appends the document to an append-only JSON-lines journal and
+    returns; a background task inserts the queued documents at least every
+    `flush_interval_s`, or as soon as `batch_size` are waiting, stamping
+    each with a change `seq` at flush time. Flushed documents are recorded
+    by a checkpoint line, and the journal is truncated whenever the queue
+    empties (or rewritten with just the pending entries once it grows past
+    `compact_bytes`). On startup `recover` re-inserts anything journalled
+    after the last checkpoint; replays are idempotent because every
+    collection has a unique `id` index.
+
+    Journal lines are flushed to the OS on submit, so a process crash loses
+    nothing; with `fsync` they are also fsynced before each flush, so power
+    loss can cost at most the last `flush_interval_s`. Memory is bounded by
+    `max_pending`: submitters wait for a flush once that many are queued.
+    """
+
+    def __init__(
+        self,
+        db,
+        journal_path: str,
+        sequence=None,
+        batch_size: int = 500,
+        max_pending: int = 10000,
+        flush_interval_s: float = 0.05,
+        compact_bytes: int = 16 * 1024 * 1024,
+        fsync: bool = True,
+    ):
+        self.db = db
+        self.journal_path = journal_path
+        self.sequence = sequence
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.flush_interval_s = flush_interval_s
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        # Called with (collection, documents) after each successful insert,
+        # leaving out documents a replay found already stored
+        self.on_flushed: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None
+        self._pending: Deque[Entry] = deque()
+        self._journal = None
+        self._next = 1
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @staticmethod
+    def _read_journal(path: str) -> Tuple[List[Entry], int]:
+        """Entries journalled after the last checkpoint, and the last entry number; a torn final line is ignored"""
+        entries: List[Entry] = []
+        checkpoint = 0
+        try:
+            with open(path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if "checkpoint" in record:
+                        checkpoint = max(checkpoint, record["checkpoint"])
+                    else:
+                        entries.append((record["n"], record["collection"], record["doc"]))
+        except FileNotFoundError:
+            pass
+        last = entries[-1][0] if entries else 0
+        return [entry for entry in entries if entry[0] > checkpoint], last
+
+    def _append(self, collection: str, document: Dict[str, Any]) -> None:
+        n = self._next
+        self._next += 1
+        self._journal.write(json.dumps({"n": n, "collection": collection, "doc": document}, default=str) + "\n")
+        self._journal.flush()
+        self._pending.append((n, collection, document))
+
+    async def recover(self, orphans: Sequence[str] = ()) -> int:
+        """Open the journal and insert what was acknowledged but never flushed.
+
+        `orphans` are journals of other processes that are no longer running
+        (see `orphaned_journals`). Each is claimed with an atomic rename, so
+        when several workers start at once only one of them replays it.
+        """
+        entries, last = self._read_journal(self.journal_path)
+        self._next = last + 1
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._pending.extend(entries)
+        recovered = len(entries)
+        for path in orphans:
+            claimed = f"{path}.claimed-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            adopted, _ = self._read_journal(claimed)
+            # Re-journalled before the orphan is removed, so a crash here loses nothing
+            for _, collection, document in adopted:
+                self._append(collection, document)
+            os.remove(claimed)
+            recovered += len(adopted)
+        while self._pending:
+            await self._flush_batch()
+        return recovered
+
+    async def submit(self, collection: str, document: Dict[str, Any]) -> None:
+        """Journal `document` for insertion into `collection`; returns once it is durable locally"""
+        while len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+            await self._flushed.wait()
+        self._append(collection, document)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _flush_batch(self) -> None:
+        batch = list(islice(self._pending, self.batch_size))
+        started = time.perf_counter()
+        if self.fsync:
+            await asyncio.get_running_loop().run_in_executor(None, os.fsync, self._journal.fileno())
+
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for _, collection, document in batch:
+            by_collection.setdefault(collection, []).append(document)
+        if self.sequence is None:
+            inserted = await self._insert(by_collection, None)
+        else:
+            async with self.sequence.reserve(len(batch)) as seqs:
+                inserted = await self._insert(by_collection, iter(seqs))
+
+        for _ in batch:
+            self._pending.popleft()
+        self._journal.write(json.dumps({"checkpoint": batch[-1][0]}) + "\n")
+        self._journal.flush()
+        if not self._pending:
+            self._journal.seek(0)
+            self._journal.truncate()
+        elif self._journal.tell() > self.compact_bytes:
+            self._compact()
+
+        self.flushed += len(batch)
+        self.batches += 1
+        metrics.WRITE_BEHIND_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        metrics.WRITE_BEHIND_BATCH_SIZE.observe(len(batch))
+        self._flushed.set()
+        self._flushed = asyncio.Event()
+        if self.on_flushed is not None:
+            for collection, documents in inserted.items():
+                if documents:
+                    self.on_flushed(collection, documents)
+
+    async def _insert(self, by_collection: Dict[str, List[Dict[str, Any]]], seqs) -> Dict[str, List[Dict[str, Any]]]:
+        """Insert each collection's documents; returns the ones that were not already stored"""
+        inserted: Dict[str, List[Dict[str, Any]]] = {}
+        for collection, documents in by_collection.items():
+            stamped = [{**document, "seq": next(seqs)} if seqs is not None else dict(document) for document in documents]
+            try:
+                await self.db[collection].insert_many(stamped, ordered=False)
+                inserted[collection] = documents
+            except BulkWriteError as e:
+                # Documents already inserted by an earlier, interrupted flush
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+                duplicates = {error["index"] for error in errors}
+                inserted[collection] = [document for i, document in enumerate(documents) if i not in duplicates]
+        return inserted
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only the pending entries"""
+        compacted = self.journal_path + ".tmp"
+        with open(compacted, "w", encoding="utf-8") as journal:
+            for n, collection, document in self._pending:
+                journal.write(json.dumps({"n": n, "collection": collection, "doc": document}, default=str) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        self._journal.close()
+        os.replace(compacted, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    async def run(self) -> None:
+        """Flush every `flush_interval_s` (or when a batch fills), retrying failures with backoff"""
+        retry_in = self.flush_interval_s
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                try:
+                    await self._flush_batch()
+                    retry_in = self.flush_interval_s
+                except Exception as e:
+                    self.failures += 1
+                    print(f"Write-behind flush of {len(self._pending)} documents failed, retrying in {retry_in:.2f}s: {e}")
+                    await asyncio.sleep(retry_in)
+                    retry_in = min(retry_in * 2, 5.0)
+
+    async def close(self) -> None:
+        """Flush what is queued (anything left stays journalled for `recover`) and close the journal"""
+        try:
+            while self._pending:
+                await self._flush_batch()
+        except Exception as e:
+            print(f"Write-behind: {len(self._pending)} documents left in {self.journal_path}: {e}")
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            if not self._pending:
+                os.remove(self.journal_path)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": len(self._pending),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+        }
@@ -0,0 +1,1058 @@
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+# Israel's bounding box, used for synthetic datasets
+ISRAEL_BBOX = (34.2, 29.5, 35.9, 33.3)  # min_lng, min_lat, max_lng, max_lat
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+def summarize(outcomes, elapsed, concurrency):
+    """Throughput and latency percentiles of (ok, latency_ms) outcomes"""
+    latencies = sorted(latency for ok, latency in outcomes if ok)
+    return {
+        "requests": len(outcomes),
+        "concurrency": concurrency,
+        "errors": len(outcomes) - len(latencies),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.mean(latencies), 2) if latencies else 0.0,
+    }
+
+
+class EmergencyPlatformBenchmark:
+    def __init__(self, base_url, concurrency, total_requests, only=None):
+        self.base_url = base_url.rstrip("/")
+        self.only = only
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.results = {}
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, endpoint, data=None):
+        url = f"{self.base_url}/{endpoint}"
+        start = time.perf_counter()
+        try:
+            if method == 'GET':
+                response = self.session.get(url)
+            elif method == 'POST':
+                response = self.session.post(url, json=data)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return ok, (time.perf_counter() - start) * 1000.0
+
+    def run_load(self, name, method, endpoint, data=None):
+        """Drive `total_requests` calls at `concurrency` in-flight requests and record latency"""
+        print(f"\n🔍 Benchmarking {name} ({self.concurrency} concurrent, {self.total_requests} requests)...")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            outcomes = list(pool.map(
+                lambda _: self._request(method, endpoint, data),
+                range(self.total_requests),
+            ))
+        elapsed = time.perf_counter() - started
+
+        result = summarize(outcomes, elapsed, self.concurrency)
+        self.results[name] = result
+
+        print(f"✅ {result['rps']} req/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, {result['errors']} errors")
+        return result
+
+    def run_all(self):
+        print("🚀 Starting Emergency Platform API Benchmark")
+        print(f"🔗 Base URL: {self.base_url}")
+        print("=" * 50)
+
+        test_incident = {
+            "title": "Benchmark Incident",
+            "title_he": "אירוע בדיקת עומס",
+            "description": "Synthetic incident for load testing",
+            "description_he": "אירוע סינתטי לבדיקת עומס",
+            "lat": 32.0853,
+            "lng": 34.7818,
+            "type": "other",
+        }
+
+        scenarios = [
+            ("Health", "GET", "api/health", None),
+            ("Resources", "GET", "api/resources", None),
+            ("Resources by type", "GET", "api/resources?type=medical", None),
+            ("Resource markers page", "GET", "api/resources?limit=500&fields=id,lat,lng,type,status,priority", None),
+            ("Incidents", "GET", "api/incidents", None),
+            ("Incidents page", "GET", "api/incidents?limit=100", None),
+            ("Power outages", "GET", "api/power-outages", None),
+            ("Statistics", "GET", "api/statistics", None),
+            ("Export resources NDJSON", "GET", "api/export/resources?format=ndjson", None),
+            ("Create incident", "POST", "api/incidents", test_incident),
+        ]
+
+        for name, method, endpoint, data in scenarios:
+            if self.only and self.only.lower() not in name.lower():
+                continue
+            self.run_load(name, method, endpoint, data)
+            print("-" * 50)
+
+        try:
+            cache_stats = self.session.get(f"{self.base_url}/api/cache/stats").json()
+            print(
+                f"📦 Response cache: hit ratio {cache_stats['hit_ratio']:.1%}, "
+                f"{cache_stats['not_modified']} x 304, {cache_stats['bytes_saved']} bytes saved"
+            )
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+
+        return self.results
+
+
+def print_comparison(baseline, current, prefix=""):
+    """Print per-scenario change against a saved baseline report"""
+    if not prefix:
+        print("\n📊 Comparison against baseline:")
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"- {prefix}{name}: no baseline")
+        elif isinstance(result, dict) and "rps" in result:
+            rps_change = (result["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0.0
+            p99_change = (result["p99_ms"] / before["p99_ms"] - 1) * 100 if before["p99_ms"] else 0.0
+            print(
+                f"- {prefix}{name}: {before['rps']} -> {result['rps']} req/s ({rps_change:+.1f}%), "
+                f"p99 {before['p99_ms']} -> {result['p99_ms']} ms ({p99_change:+.1f}%)"
+            )
+        elif isinstance(result, dict):
+            print_comparison(before, result, prefix=f"{prefix}{name}.")
+        elif isinstance(result, (int, float)) and isinstance(before, (int, float)):
+            change = (result / before - 1) * 100 if before else 0.0
+            print(f"- {prefix}{name}: {before} -> {result} ({change:+.1f}%)")
+
+
+def random_points(count, seed=42):
+    rng = random.Random(seed)
+    min_lng, min_lat, max_lng, max_lat = ISRAEL_BBOX
+    return [(rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)) for _ in range(count)]
+
+
+def time_queries(name, queries, fn):
+    started = time.perf_counter()
+    for query in queries:
+        fn(*query)
+    per_query_ms = (time.perf_counter() - started) * 1000.0 / len(queries)
+    print(f"✅ {name}: {per_query_ms:.3f} ms/query")
+    return round(per_query_ms, 3)
+
+
+def bench_geo(args):
+    """Grid index versus a linear scan for viewport, radius and k-nearest lookups"""
+    import geo
+
+    print(f"🚀 Geo index benchmark: {args.points} resources, {args.queries} queries")
+    points = random_points(args.points)
+    types = ["generator", "medical", "shelter", "supply"]
+
+    started = time.perf_counter()
+    grid = geo.GridIndex()
+    for i, (lat, lng) in enumerate(points):
+        grid.insert(str(i), lat, lng, types[i % len(types)])
+    print(f"✅ Build: {(time.perf_counter() - started) * 1000.0:.1f} ms")
+
+    centers = random_points(args.queries, seed=7)
+    viewports = [(lng - 0.05, lat - 0.03, lng + 0.05, lat + 0.03) for lat, lng in centers]
+
+    def scan_bbox(min_lng, min_lat, max_lng, max_lat):
+        return [i for i, (lat, lng) in enumerate(points) if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng]
+
+    def scan_nearest(lat, lng):
+        return sorted((geo.haversine_m(lat, lng, plat, plng), i) for i, (plat, plng) in enumerate(points))[:10]
+
+    results = {
+        "bbox_grid_ms": time_queries("bbox (grid)", viewports, grid.within_bbox),
+        "bbox_scan_ms": time_queries("bbox (scan)", viewports[:20], scan_bbox),
+        "radius_grid_ms": time_queries("radius 2km (grid)", centers, lambda lat, lng: grid.within_radius(lat, lng, 2000)),
+        "nearest_grid_ms": time_queries("nearest 10 (grid)", centers, lambda lat, lng: grid.nearest(lat, lng, 10)),
+        "nearest_scan_ms": time_queries("nearest 10 (scan)", centers[:5], scan_nearest),
+    }
+    return results
+
+
+def bench_clusters(args):
+    """Cluster index build, incremental writes and tile reads versus shipping every marker"""
+    import clusters
+
+    print(f"🚀 Cluster benchmark: {args.points} resources, zoom levels 0-{args.max_zoom}")
+    points = random_points(args.points)
+    types = ["generator", "medical", "shelter", "supply", "water"]
+    priorities = ["low", "medium", "high", "critical"]
+    keys = [str(i) for i in range(len(points))]
+
+    started = time.perf_counter()
+    index = clusters.ClusterIndex(args.max_zoom)
+    index.load(
+        keys,
+        [lat for lat, _ in points],
+        [lng for _, lng in points],
+        [types[i % len(types)] for i in range(len(points))],
+        [priorities[i % len(priorities)] for i in range(len(points))],
+    )
+    build_ms = (time.perf_counter() - started) * 1000.0
+    print(f"✅ Build: {build_ms:.1f} ms")
+
+    moves = random_points(1000, seed=5)
+    started = time.perf_counter()
+    for i, (lat, lng) in enumerate(moves):
+        index.insert(keys[i], lat, lng, "medical", "high")
+    write_us = (time.perf_counter() - started) * 1e6 / len(moves)
+    print(f"✅ Incremental move: {write_us:.1f} µs/write")
+
+    results = {"build_ms": round(build_ms, 1), "write_us": round(write_us, 1)}
+    for zoom in (7, 10, 13):
+        tiles = list(clusters.tile_range(zoom, *ISRAEL_BBOX))
+        for label in ("cold", "warm"):
+            started = time.perf_counter()
+            payload = [index.tile(zoom, x, y) for x, y in tiles]
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            results[f"z{zoom}_{label}_ms"] = round(elapsed_ms, 2)
+        size = len(json.dumps(payload))
+        results[f"z{zoom}_bytes"] = size
+        print(f"✅ z{zoom}: {len(tiles)} tiles, cold {results[f'z{zoom}_cold_ms']} ms, "
+              f"warm {results[f'z{zoom}_warm_ms']} ms, {size / 1024:.0f} KB")
+
+    markers = [{"id": key, "lat": lat, "lng": lng, "type": types[i % len(types)]} for i, (key, (lat, lng)) in enumerate(zip(keys, points))]
+    results["all_markers_bytes"] = len(json.dumps(markers))
+    print(f"✅ Every marker (client-side clustering): {results['all_markers_bytes'] / 1024:.0f} KB")
+    return results
+
+
+def synthetic_resources(count, seed=9):
+    """Resource documents shaped like the stored ones, bilingual text included"""
+    rng = random.Random(seed)
+    types = ["generator", "medical", "shelter", "evacuation", "supply", "fire_station", "police", "water"]
+    docs = []
+    for i, (lat, lng) in enumerate(random_points(count, seed=seed)):
+        docs.append({
+            "id": f"{i:08d}-0000-4000-8000-000000000000",
+            "name": f"Resource {i}",
+            "name_he": f"משאב {i}",
+            "type": rng.choice(types),
+            "lat": lat,
+            "lng": lng,
+            "status": rng.choice(["active", "active", "active", "inactive", "maintenance"]),
+            "capacity": rng.choice([None, 50, 100, 200, 500]),
+            "description": "Synthetic resource used for payload benchmarks",
+            "description_he": "משאב סינתטי לבדיקת גודל תגובה",
+            "contact_phone": "03-1234567",
+            "last_updated": "2024-01-01T12:00:00.000000",
+            "priority": rng.choice(["low", "medium", "high", "critical"]),
+            "seq": i + 1,
+        })
+    return docs
+
+
+def bench_encoding(args):
+    """Size and serialization time of the list payload as JSON, MessagePack and columnar"""
+    import encoding
+
+    print(f"🚀 Encoding benchmark: {args.docs} resources")
+    docs = synthetic_resources(args.docs)
+    map_fields = ("id", "lat", "lng", "type", "status", "priority")
+    variants = {
+        "full": docs,
+        "map": [{field: doc[field] for field in map_fields} for doc in docs],
+    }
+    codings = ["gzip"] + (["br"] if encoding.brotli is not None else [])
+
+    results = {}
+    for variant, payload in variants.items():
+        for media_type in (encoding.JSON, encoding.MSGPACK, encoding.COLUMNAR):
+            name = f"{variant} {media_type.split('/')[1]}"
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                response = encoding.respond(media_type, {"resources": payload, "next_cursor": None}, "resources")
+            encode_ms = (time.perf_counter() - started) * 1000.0 / args.repeat
+            body = response.body
+            result = {"bytes": len(body), "encode_ms": round(encode_ms, 2)}
+            for coding in codings:
+                started = time.perf_counter()
+                compressed = encoding.compress(body, coding)
+                result[f"{coding}_bytes"] = len(compressed)
+                result[f"{coding}_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+            results[name] = result
+            sizes = ", ".join(f"{coding} {result[f'{coding}_bytes'] / 1024:.0f} KB" for coding in codings)
+            print(f"✅ {name}: {len(body) / 1024:.0f} KB in {encode_ms:.1f} ms ({sizes})")
+    return results
+
+
+def random_polygons(count, seed=11):
+    """Irregular convex-ish polygons (a few km across) scattered over Israel"""
+    import math
+
+    rng = random.Random(seed)
+    polygons = []
+    for i, (lat, lng) in enumerate(random_points(count, seed=seed)):
+        sides = rng.randint(4, 12)
+        radius = rng.uniform(0.005, 0.03)
+        coordinates = []
+        for side in range(sides):
+            angle = 2 * math.pi * side / sides
+            r = radius * rng.uniform(0.6, 1.0)
+            coordinates.append([lat + r * math.sin(angle), lng + r * math.cos(angle)])
+        polygons.append({"id": str(i), "status": "active", "coordinates": coordinates})
+    return polygons
+
+
+def bench_pip(args):
+    """Outage point-in-polygon join: bbox-prefiltered engine versus testing every point"""
+    import numpy as np
+    import outages
+
+    print(f"🚀 Point-in-polygon benchmark: {args.polygons} polygons x {args.points} points")
+    points = np.asarray(random_points(args.points))
+    polygons = random_polygons(args.polygons)
+
+    started = time.perf_counter()
+    engine = outages.OutagePolygons()
+    engine.load(polygons, engine.generation)
+    build_ms = (time.perf_counter() - started) * 1000.0
+    print(f"✅ Polygon preprocessing: {build_ms:.1f} ms")
+
+    started = time.perf_counter()
+    point_set = outages.PointSet(points[:, 0], points[:, 1])
+    sort_ms = (time.perf_counter() - started) * 1000.0
+    print(f"✅ Point sort: {sort_ms:.1f} ms")
+
+    started = time.perf_counter()
+    hits = engine.contains(point_set)
+    join_ms = (time.perf_counter() - started) * 1000.0
+    print(f"✅ Join: {join_ms:.1f} ms ({sum(len(v) for v in hits.values())} containments)")
+
+    # Unfiltered baseline on a sample of polygons, extrapolated
+    sample = polygons[:max(1, min(len(polygons), 50))]
+    started = time.perf_counter()
+    for polygon in sample:
+        coords = np.asarray(polygon["coordinates"])
+        outages.points_in_polygon(points[:, 0], points[:, 1], coords[:, 0], coords[:, 1])
+    naive_ms = (time.perf_counter() - started) * 1000.0 * len(polygons) / len(sample)
+    print(f"✅ Unfiltered join (extrapolated): {naive_ms:.1f} ms")
+
+    return {
+        "build_ms": round(build_ms, 2),
+        "point_sort_ms": round(sort_ms, 2),
+        "join_ms": round(join_ms, 2),
+        "unfiltered_join_ms": round(naive_ms, 2),
+    }
+
+
+def bench_stream(args):
+    """Fan-out of change events to many simulated SSE subscribers, some of them slow"""
+    import asyncio
+    import events
+
+    async def run():
+        broadcaster = events.Broadcaster(buffer_size=args.buffer_size)
+        slow_every = max(1, int(1 / args.slow_fraction)) if args.slow_fraction > 0 else 0
+        subscribers = [broadcaster.subscribe() for _ in range(args.subscribers)]
+
+        async def consumer(index, subscriber):
+            slow = slow_every and index % slow_every == 0
+            async for _ in broadcaster.stream(subscriber):
+                if slow:
+                    # Simulates a client on a congested link
+                    await asyncio.sleep(0.5)
+
+        tasks = [asyncio.create_task(consumer(i, subscriber)) for i, subscriber in enumerate(subscribers)]
+        await asyncio.sleep(0)
+
+        publish_times = []
+        event = {"id": "bench", "title": "Benchmark Incident", "lat": 32.0853, "lng": 34.7818, "type": "fire"}
+        started = time.perf_counter()
+        for _ in range(args.events):
+            t0 = time.perf_counter()
+            broadcaster.publish("incident.created", event)
+            publish_times.append((time.perf_counter() - t0) * 1000.0)
+            await asyncio.sleep(1.0 / args.rate)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.5)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        publish_times.sort()
+        total = sum(subscriber.delivered for subscriber in subscribers)
+        overflows = broadcaster.dropped
+        print(f"✅ Publish p50 {percentile(publish_times, 50):.3f} ms, p99 {percentile(publish_times, 99):.3f} ms")
+        expected = args.subscribers * args.events
+        print(f"✅ Delivered {total}/{expected} frames ({total / elapsed:.0f} frames/s), {overflows} slow-consumer overflows")
+        return {
+            "publish_p50_ms": round(percentile(publish_times, 50), 3),
+            "publish_p99_ms": round(percentile(publish_times, 99), 3),
+            "frames_per_s": round(total / elapsed, 1),
+            "overflows": overflows,
+        }
+
+    print(f"🚀 Stream fan-out benchmark: {args.subscribers} subscribers, {args.events} events")
+    return asyncio.run(run())
+
+
+def synthetic_incidents(count, seed=3):
+    rng = random.Random(seed)
+    types = ["fire", "medical", "evacuation", "power", "other"]
+    priorities = ["low", "medium", "high", "critical"]
+    return [
+        {
+            "title": f"Synthetic incident {i}",
+            "title_he": f"אירוע סינתטי {i}",
+            "description": "Generated for benchmarking",
+            "description_he": "נוצר לבדיקת ביצועים",
+            "lat": lat,
+            "lng": lng,
+            "type": rng.choice(types),
+            "priority": rng.choice(priorities),
+        }
+        for i, (lat, lng) in enumerate(random_points(count, seed=seed))
+    ]
+
+
+def bench_dedup(args):
+    """Duplicate matching of incoming reports against the open incidents"""
+    import dedup
+
+    print(f"🚀 Dedup benchmark: {args.open} open incidents, {args.reports} reports, {args.distance:.0f} m window")
+    now = time.time()
+    index = dedup.IncidentDeduplicator(args.distance, 1800)
+    open_incidents = synthetic_incidents(args.open)
+    started = time.perf_counter()
+    for i, incident in enumerate(open_incidents):
+        index.track(str(i), incident["lat"], incident["lng"], incident["type"], now - 600)
+    build_ms = (time.perf_counter() - started) * 1000.0
+    print(f"✅ Build: {build_ms:.1f} ms")
+
+    # Half the reports repeat an open incident from a few tens of meters away
+    rng = random.Random(17)
+    reports = []
+    for incident in synthetic_incidents(args.reports // 2, seed=23):
+        reports.append((incident["lat"], incident["lng"], incident["type"]))
+    for _ in range(args.reports - len(reports)):
+        incident = rng.choice(open_incidents)
+        reports.append((incident["lat"] + rng.uniform(-2e-4, 2e-4), incident["lng"] + rng.uniform(-2e-4, 2e-4), incident["type"]))
+    rng.shuffle(reports)
+
+    started = time.perf_counter()
+    matched = sum(1 for lat, lng, type in reports if index.match(lat, lng, type, now) is not None)
+    match_us = (time.perf_counter() - started) * 1e6 / len(reports)
+    print(f"✅ Match: {match_us:.1f} µs/report, {matched}/{len(reports)} merged")
+    return {"build_ms": round(build_ms, 1), "match_us": round(match_us, 1), "merged": matched}
+
+
+def bench_nearest(args):
+    """k-nearest active resources for many incidents: batch, per incident and pure Python"""
+    import dispatch
+    import geo
+
+    print(f"🚀 Nearest-resource benchmark: {args.resources} resources x {args.incidents} incidents, k={args.k}")
+    rng = random.Random(31)
+    types = ["generator", "medical", "shelter", "supply", "water"]
+    resources = [
+        {"id": str(i), "lat": lat, "lng": lng, "type": types[i % len(types)],
+         "status": "active" if rng.random() < 0.8 else "inactive", "priority": "high", "capacity": rng.choice([None, 0, 50, 500])}
+        for i, (lat, lng) in enumerate(random_points(args.resources))
+    ]
+    incidents = random_points(args.incidents, seed=13)
+
+    started = time.perf_counter()
+    arrays = dispatch.ResourceArrays()
+    arrays.load(resources)
+    build_ms = (time.perf_counter() - started) * 1000.0
+    print(f"✅ Build: {build_ms:.1f} ms")
+
+    results = {"build_ms": round(build_ms, 1)}
+    for label, filters in (("active", {"status": "active"}), ("shelter_capacity", {"type": "shelter", "status": "active", "min_capacity": 1})):
+        rows = arrays.candidates(**filters)
+        started = time.perf_counter()
+        batch = arrays.nearest(incidents, args.k, rows)
+        batch_ms = (time.perf_counter() - started) * 1000.0
+
+        started = time.perf_counter()
+        for point in incidents[:100]:
+            arrays.nearest([point], args.k, arrays.candidates(**filters))
+        single_ms = (time.perf_counter() - started) * 1000.0 / min(100, len(incidents))
+
+        candidates = [resources[row] for row in rows.tolist()]
+        started = time.perf_counter()
+        for lat, lng in incidents[:3]:
+            sorted((geo.haversine_m(lat, lng, r["lat"], r["lng"]), r["id"]) for r in candidates)[:args.k]
+        python_ms = (time.perf_counter() - started) * 1000.0 / min(3, len(incidents))
+
+        assert batch[0] == arrays.nearest([incidents[0]], args.k, rows)[0]
+        results[label] = {
+            "candidates": len(rows),
+            "batch_ms": round(batch_ms, 1),
+            "per_incident_ms": round(single_ms, 2),
+            "python_per_incident_ms": round(python_ms, 1),
+        }
+        print(f"✅ {label} ({len(rows)} candidates): batch {batch_ms:.1f} ms total, "
+              f"{single_ms:.2f} ms/incident one at a time, {python_ms:.1f} ms/incident in pure Python")
+    return results
+
+
+def bench_bulk(args):
+    """Ingest throughput: one POST per incident versus /api/incidents:bulk (JSON and NDJSON)"""
+    base_url = args.url.rstrip("/")
+    items = synthetic_incidents(args.items)
+    session = requests.Session()
+    print(f"🚀 Bulk ingest benchmark: {args.items} incidents against {base_url}")
+
+    def post(item):
+        sent = time.perf_counter()
+        status = session.post(f"{base_url}/api/incidents", json=item).status_code
+        return status, (time.perf_counter() - sent) * 1000.0
+
+    # Compare a server running with WRITE_BEHIND_ENABLED=true to see the batched write path
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        posted = list(pool.map(post, items))
+    single_s = time.perf_counter() - started
+    statuses = [status for status, _ in posted]
+    single = summarize([(status < 400, latency) for status, latency in posted], single_s, args.concurrency)
+    print(f"✅ Single-item POSTs ({args.concurrency} concurrent): {args.items / single_s:.0f} items/s, "
+          f"p50 {single['p50_ms']:.1f} ms, p99 {single['p99_ms']:.1f} ms")
+
+    # Each pass sends new reports: repeats of earlier ones would be merged into them
+    items = synthetic_incidents(args.items, seed=4)
+    started = time.perf_counter()
+    for i in range(0, len(items), args.batch):
+        response = session.post(f"{base_url}/api/incidents:bulk", json=items[i:i + args.batch])
+        statuses.append(response.status_code)
+    bulk_s = time.perf_counter() - started
+    print(f"✅ Bulk JSON ({args.batch} per request): {args.items / bulk_s:.0f} items/s")
+
+    body = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in synthetic_incidents(args.items, seed=5)).encode("utf-8")
+    started = time.perf_counter()
+    response = session.post(
+        f"{base_url}/api/incidents:bulk", data=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    statuses.append(response.status_code)
+    ndjson_s = time.perf_counter() - started
+    print(f"✅ Bulk NDJSON (single stream): {args.items / ndjson_s:.0f} items/s")
+
+    errors = sum(1 for status in statuses if status >= 400)
+    return 0 if errors == 0 else 1, {
+        "single_items_per_s": round(args.items / single_s, 1),
+        "single_p50_ms": single["p50_ms"],
+        "single_p99_ms": single["p99_ms"],
+        "bulk_json_items_per_s": round(args.items / bulk_s, 1),
+        "bulk_ndjson_items_per_s": round(args.items / ndjson_s, 1),
+    }
+
+
+def bench_startup(args):
+    """Cold start: spawn uvicorn and time until /api/health answers, per seed mode"""
+    import subprocess
+
+    backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+    results = {}
+    for mode in args.seed_modes.split(","):
+        timings = []
+        for _ in range(args.runs):
+            env = {**os.environ, "SEED_MODE": mode}
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port)],
+                cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                while time.perf_counter() - started < args.timeout:
+                    try:
+                        if requests.get(f"http://127.0.0.1:{args.port}/api/health", timeout=0.5).ok:
+                            timings.append((time.perf_counter() - started) * 1000.0)
+                            break
+                    except requests.RequestException:
+                        time.sleep(0.02)
+            finally:
+                process.terminate()
+                process.wait()
+        if timings:
+            results[f"{mode}_ready_ms"] = round(statistics.median(timings), 1)
+            print(f"✅ SEED_MODE={mode}: ready in {results[f'{mode}_ready_ms']} ms (median of {len(timings)})")
+        else:
+            print(f"❌ SEED_MODE={mode}: server never became ready")
+    return 0 if results else 1, results
+
+
+def _scaling_client(url, paths, concurrency, duration):
+    """One load-generator process: `concurrency` connections cycling through `paths` for `duration` s"""
+    import asyncio
+    import httpx
+
+    async def run():
+        outcomes = []
+        deadline = time.perf_counter() + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+            async def worker(offset):
+                i = offset
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        ok = (await client.get(paths[i % len(paths)])).status_code < 400
+                    except httpx.HTTPError:
+                        ok = False
+                    outcomes.append((ok, (time.perf_counter() - start) * 1000.0))
+                    i += 1
+
+            await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return outcomes
+
+    return asyncio.run(run())
+
+
+def bench_scaling(args):
+    """Throughput of one server as uvicorn workers are added, with WORKER_COORDINATION=mongo.
+
+    Needs a reachable mongod (--mongo-url). Load comes from --clients
+    separate processes on this host, so keep workers + clients within the
+    available cores (or point --url at another machine's server and run one
+    worker count at a time). Efficiency is throughput relative to N times
+    the single-worker figure.
+    """
+    import subprocess
+    from concurrent.futures import ProcessPoolExecutor
+
+    backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+    url = f"http://127.0.0.1:{args.port}"
+    paths = args.path or [
+        "/api/resources?limit=100",
+        "/api/statistics",
+        "/api/clusters?bbox={},{},{},{}&zoom=8".format(*ISRAEL_BBOX),
+        "/api/incidents?limit=50",
+    ]
+    print(f"🚀 Worker scaling benchmark: {args.clients} client processes x {args.concurrency} connections, "
+          f"{args.duration:.0f} s per worker count, {os.cpu_count()} cores")
+    results = {}
+    baseline_rps = None
+    for workers in (int(count) for count in args.workers.split(",")):
+        env = {**os.environ, "MONGO_URL": args.mongo_url, "WORKER_COORDINATION": "mongo", "SEED_MODE": "if-empty"}
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--workers", str(workers),
+             "--log-level", "warning"],
+            cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            started = time.perf_counter()
+            while time.perf_counter() - started < args.timeout:
+                try:
+                    if requests.get(f"{url}/api/health", timeout=0.5).ok:
+                        break
+                except requests.RequestException:
+                    time.sleep(0.1)
+            else:
+                print(f"❌ {workers} workers: server never became ready")
+                continue
+            # Every worker must have finished its startup before the clock starts
+            time.sleep(args.settle)
+            with ProcessPoolExecutor(max_workers=args.clients) as pool:
+                runs = list(pool.map(
+                    _scaling_client, [url] * args.clients, [paths] * args.clients,
+                    [args.concurrency] * args.clients, [args.duration] * args.clients,
+                ))
+        finally:
+            process.terminate()
+            process.wait()
+
+        result = summarize([outcome for run in runs for outcome in run], args.duration, args.clients * args.concurrency)
+        baseline_rps = baseline_rps or result["rps"] / workers
+        result["efficiency"] = round(result["rps"] / (baseline_rps * workers), 3) if baseline_rps else 0.0
+        results[f"workers_{workers}"] = result
+        print(f"✅ {workers} workers: {result['rps']} req/s, p99 {result['p99_ms']} ms, "
+              f"{result['efficiency']:.0%} of linear, {result['errors']} errors")
+    return 0 if results and all(r["errors"] == 0 for r in results.values()) else 1, results
+
+
+def bench_load(args):
+    benchmark = EmergencyPlatformBenchmark(args.url, args.concurrency, args.requests, args.only)
+    results = benchmark.run_all()
+    return 0 if all(r["errors"] == 0 for r in results.values()) else 1, results
+
+
+def synthetic_outages(count, seed=11):
+    return [
+        {
+            **polygon,
+            "id": f"outage-{polygon['id']}",
+            "area_name": f"Area {polygon['id']}",
+            "area_name_he": f"אזור {polygon['id']}",
+            "affected_population": 1000,
+            "reported_at": "2024-01-01T12:00:00.000000",
+        }
+        for polygon in random_polygons(count, seed=seed)
+    ]
+
+
+async def drive(client, method, path, concurrency, total, body=None, headers=None):
+    """`total` requests through an httpx client with `concurrency` in flight.
+
+    `path` and `body` may be functions of the request number. `method` may
+    also be a coroutine function taking the path and returning whether the
+    call succeeded, for requests the client cannot make on its own.
+    """
+    import asyncio
+
+    outcomes = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for i in remaining:
+            target = path(i) if callable(path) else path
+            payload = body(i) if callable(body) else body
+            start = time.perf_counter()
+            try:
+                if callable(method):
+                    ok = await method(target)
+                else:
+                    response = await client.request(method, target, json=payload, headers=headers)
+                    ok = response.status_code < 400
+            except Exception:
+                ok = False
+            outcomes.append((ok, (time.perf_counter() - start) * 1000.0))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(outcomes, time.perf_counter() - started, concurrency)
+
+
+def bench_suite(args):
+    """Every route but the debug profiler under concurrent load, with the app in-process on a synthetic dataset.
+
+    The app runs in this process behind httpx's ASGI transport, against
+    mongomock (default) or a real mongod given with --mongo-url; either way
+    the data lives in a dedicated `--database` that is dropped first. Client
+    and server share one event loop, so the numbers are the server-side cost
+    of each route without network or HTTP parsing overhead. mongomock scans
+    in Python and has no geo support, so use a real mongod above ~100k.
+    Writes run after the reads so they do not change what the reads see, and
+    the deletes come last, from the end of the resource list.
+    """
+    import asyncio
+    import httpx
+
+    os.environ["SEED_MODE"] = "off"
+    os.environ["STATS_RECONCILE_SECONDS"] = "3600"
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    else:
+        os.environ["GEO_QUERY_BACKEND"] = "memory"
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+    import server
+    import geo
+    import clusters
+
+    if not args.mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+        server.client = AsyncMongoMockClient()
+    server.db = server.client[args.database]
+    for component in (server.change_sequence, server.write_behind, server.incident_rollups, server.startup_lock, server.worker_bus):
+        component.db = server.db
+
+    resources = synthetic_resources(args.resources)
+    incidents = []
+    for i, incident in enumerate(synthetic_incidents(args.incidents)):
+        incidents.append({
+            **incident,
+            "id": f"incident-{i:08d}",
+            "status": random.Random(i).choice(["open", "open", "in_progress", "resolved"]),
+            "reported_by": "benchmark",
+            "reported_at": f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.{i:06d}",
+            "report_count": 1,
+        })
+    outages = synthetic_outages(args.outages)
+    incident_ids = [incident["id"] for incident in incidents]
+    rng = random.Random(5)
+    lat, lng = 32.0853, 34.7818
+    fx, fy = clusters.mercator(lat, lng)
+    scenario_requests = args.requests
+    heavy_requests = args.heavy_requests
+
+    def new_incident(i):
+        point_lat, point_lng = random_points(1, seed=1000 + i)[0]
+        return {**synthetic_incidents(1, seed=i)[0], "lat": point_lat, "lng": point_lng}
+
+    def moved_resource(i):
+        resource = dict(resources[i % len(resources)])
+        resource.pop("seq", None)
+        resource["lat"] += rng.uniform(-0.001, 0.001)
+        return resource
+
+    def new_resource(i):
+        resource = synthetic_resources(1, seed=2000 + i)[0]
+        return {key: value for key, value in resource.items() if key not in ("id", "seq", "last_updated")}
+
+    def new_outage(i):
+        outage = synthetic_outages(1, seed=3000 + i)[0]
+        return {key: value for key, value in outage.items() if key not in ("id", "reported_at")}
+
+    def extended_outage(i):
+        outage = dict(outages[i % len(outages)])
+        outage.pop("seq", None)
+        outage["estimated_restoration"] = f"2024-01-02T{i % 24:02d}:00:00"
+        return outage
+
+    async def open_stream(path):
+        """Subscribe to the SSE feed, wait for its first frame and disconnect.
+
+        httpx's ASGI transport only returns once the response body is
+        complete, which an event stream never is, so this speaks ASGI directly.
+        """
+        target, _, query = path.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": target, "raw_path": target.encode(), "query_string": query.encode(), "root_path": "",
+            "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        first_frame = asyncio.Event()
+        disconnected = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif message.get("body") or not message.get("more_body"):
+                first_frame.set()
+
+        app = asyncio.ensure_future(server.app(scope, receive, send))
+        try:
+            await asyncio.wait_for(first_frame.wait(), timeout=10)
+        finally:
+            # A disconnect rather than a cancel, so the response stops its
+            # body task and the feed unsubscribes
+            disconnected.set()
+            await asyncio.wait_for(app, timeout=10)
+        return statuses == [200]
+
+    # (name, method, path, requests, body, headers)
+    scenarios = [
+        ("health", "GET", "/api/health", scenario_requests, None, None),
+        ("resources page", "GET", "/api/resources?limit=500&fields=id,lat,lng,type,status,priority", scenario_requests, None, None),
+        ("resources page columnar", "GET", "/api/resources?limit=500&fields=id,lat,lng,type,status,priority", scenario_requests, None,
+         {"Accept": "application/vnd.emergency.columnar+msgpack"}),
+        ("resources by type", "GET", "/api/resources?type=medical&limit=100", scenario_requests, None, None),
+        ("resources bbox", "GET", "/api/resources?bbox=34.70,31.95,34.90,32.15&limit=500", scenario_requests, None, None),
+        ("resources nearest", "GET", f"/api/resources?near={lat},{lng}&nearest=10", scenario_requests, None, None),
+        ("resource by id", "GET", f"/api/resources/{resources[0]['id']}", scenario_requests, None, None),
+        ("tile z10", "GET", f"/api/tiles/10/{int(fx * 1024)}/{int(fy * 1024)}", scenario_requests, None, None),
+        ("clusters z8", "GET", "/api/clusters?bbox={},{},{},{}&zoom=8".format(*ISRAEL_BBOX), scenario_requests, None, None),
+        ("incidents page", "GET", "/api/incidents?limit=100", scenario_requests, None, None),
+        ("power outages", "GET", "/api/power-outages?limit=100", scenario_requests, None, None),
+        ("outage affected", "GET", "/api/power-outages/affected", heavy_requests, None, None),
+        ("statistics", "GET", "/api/statistics", scenario_requests, None, None),
+        ("incident timeseries 48h", "GET", "/api/incidents/timeseries?since=2024-01-01T00:00:00&until=2024-01-02T23:00:00&by=type",
+         scenario_requests, None, None),
+        ("incident heatmap", "GET", "/api/incidents/heatmap?since=2024-01-01T00:00:00&until=2024-01-02T23:00:00&precision=5",
+         scenario_requests, None, None),
+        ("cache stats", "GET", "/api/cache/stats", scenario_requests, None, None),
+        ("metrics", "GET", "/metrics", scenario_requests, None, None),
+        ("stream subscribe", open_stream, "/api/stream?topics=incident,outage", scenario_requests, None, None),
+        ("changes", "GET", f"/api/changes?since={max(0, args.resources + args.incidents - 100)}", scenario_requests, None, None),
+        ("nearest resources", "GET", f"/api/incidents/{incident_ids[0]}/nearest-resources?type=shelter&k=5", scenario_requests, None, None),
+        ("nearest resources batch", "POST", "/api/incidents/nearest-resources", heavy_requests,
+         {"incident_ids": incident_ids[:100], "k": 5}, None),
+        ("resources full list", "GET", "/api/resources", heavy_requests, None, None),
+        ("export resources ndjson", "GET", "/api/export/resources?format=ndjson", heavy_requests, None, None),
+        ("create incident", "POST", "/api/incidents", scenario_requests, new_incident, None),
+        ("update resource", "PUT", lambda i: f"/api/resources/{resources[i % len(resources)]['id']}", scenario_requests, moved_resource, None),
+        ("bulk incidents x100", "POST", "/api/incidents:bulk", heavy_requests,
+         lambda i: [new_incident(i * 100 + j) for j in range(100)], None),
+        ("create resource", "POST", "/api/resources", scenario_requests, new_resource, None),
+        ("bulk resources x100", "POST", "/api/resources:bulk", heavy_requests,
+         lambda i: [new_resource(i * 100 + j) for j in range(100)], None),
+        ("create outage", "POST", "/api/power-outages", scenario_requests, new_outage, None),
+        ("update outage", "PUT", lambda i: f"/api/power-outages/{outages[i % len(outages)]['id']}", scenario_requests,
+         extended_outage, None),
+        ("delete resource", "DELETE", lambda i: f"/api/resources/{resources[-1 - i]['id']}",
+         min(scenario_requests, len(resources) // 2), None, None),
+    ]
+
+    async def populate():
+        await server.client.drop_database(args.database)
+        await server.change_sequence.ensure_counter()
+        for collection, docs in (("emergency_resources", resources), ("incidents", incidents), ("power_outages", outages)):
+            for start in range(0, len(docs), 10000):
+                batch = docs[start:start + 10000]
+                async with server.change_sequence.reserve(len(batch)) as seqs:
+                    for doc, seq in zip(batch, seqs):
+                        doc["seq"] = seq
+                        if collection == "emergency_resources":
+                            doc["location"] = geo.point(doc["lat"], doc["lng"])
+                    await server.db[collection].insert_many([dict(doc) for doc in batch])
+        for doc in resources:
+            doc.pop("location", None)
+
+    async def run():
+        started = time.perf_counter()
+        await populate()
+        print(f"✅ Loaded {len(resources)} resources, {len(incidents)} incidents, {len(outages)} outages "
+              f"in {time.perf_counter() - started:.1f} s")
+        started = time.perf_counter()
+        for handler in server.app.router.on_startup:
+            await handler()
+        print(f"✅ App startup in {time.perf_counter() - started:.1f} s")
+
+        results = {"dataset": {"resources": len(resources), "incidents": len(incidents), "outages": len(outages)}}
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name, method, path, total, body, headers in scenarios:
+                if args.only and args.only.lower() not in name.lower():
+                    continue
+                result = await drive(client, method, path, args.concurrency, total, body, headers)
+                results[name] = result
+                print(f"✅ {name}: {result['rps']} req/s, p50 {result['p50_ms']} ms, "
+                      f"p99 {result['p99_ms']} ms, {result['errors']} errors")
+            cache_stats = (await client.get("/api/cache/stats")).json()
+        print(f"📦 Response cache hit ratio {cache_stats['hit_ratio']:.1%}")
+        for handler in server.app.router.on_shutdown:
+            await handler()
+        return results
+
+    print(f"🚀 In-process load suite ({'mongod' if args.mongo_url else 'mongomock'}, "
+          f"{args.concurrency} concurrent, cache {'off' if args.no_cache else 'on'})")
+    results = asyncio.run(run())
+    failed = [name for name, result in results.items() if result.get("errors")]
+    return (1 if failed else 0), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the emergency platform API")
+    parser.add_argument("--save", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON report produced with --save")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load = subparsers.add_parser("load", help="concurrent HTTP load against a running server")
+    load.add_argument("--url", default="http://localhost:8001")
+    load.add_argument("--concurrency", type=int, default=50)
+    load.add_argument("--requests", type=int, default=1000)
+    load.add_argument("--only", help="run only scenarios whose name contains this text, e.g. statistics")
+    load.set_defaults(run=bench_load)
+
+    geo_parser = subparsers.add_parser("geo", help="in-process geo index lookups")
+    geo_parser.add_argument("--points", type=int, default=100000)
+    geo_parser.add_argument("--queries", type=int, default=200)
+    geo_parser.set_defaults(run=lambda args: (0, bench_geo(args)))
+
+    clusters_parser = subparsers.add_parser("clusters", help="server-side marker clustering index")
+    clusters_parser.add_argument("--points", type=int, default=100000)
+    clusters_parser.add_argument("--max-zoom", type=int, default=14)
+    clusters_parser.set_defaults(run=lambda args: (0, bench_clusters(args)))
+
+    encoding_parser = subparsers.add_parser("encoding", help="JSON versus MessagePack versus columnar payloads")
+    encoding_parser.add_argument("--docs", type=int, default=10000)
+    encoding_parser.add_argument("--repeat", type=int, default=5)
+    encoding_parser.set_defaults(run=lambda args: (0, bench_encoding(args)))
+
+    pip_parser = subparsers.add_parser("pip", help="outage point-in-polygon join")
+    pip_parser.add_argument("--polygons", type=int, default=2000)
+    pip_parser.add_argument("--points", type=int, default=100000)
+    pip_parser.set_defaults(run=lambda args: (0, bench_pip(args)))
+
+    stream_parser = subparsers.add_parser("stream", help="SSE broadcaster fan-out to simulated subscribers")
+    stream_parser.add_argument("--subscribers", type=int, default=5000)
+    stream_parser.add_argument("--events", type=int, default=200)
+    stream_parser.add_argument("--rate", type=float, default=100.0, help="events published per second")
+    stream_parser.add_argument("--buffer-size", type=int, default=1024)
+    stream_parser.add_argument("--slow-fraction", type=float, default=0.05)
+    stream_parser.set_defaults(run=lambda args: (0, bench_stream(args)))
+
+    dedup_parser = subparsers.add_parser("dedup", help="incident duplicate matching at ingest")
+    dedup_parser.add_argument("--open", type=int, default=50000)
+    dedup_parser.add_argument("--reports", type=int, default=20000)
+    dedup_parser.add_argument("--distance", type=float, default=200.0)
+    dedup_parser.set_defaults(run=lambda args: (0, bench_dedup(args)))
+
+    nearest_parser = subparsers.add_parser("nearest", help="nearest-resource ranking for dispatch")
+    nearest_parser.add_argument("--resources", type=int, default=100000)
+    nearest_parser.add_argument("--incidents", type=int, default=1000)
+    nearest_parser.add_argument("--k", type=int, default=5)
+    nearest_parser.set_defaults(run=lambda args: (0, bench_nearest(args)))
+
+    bulk_parser = subparsers.add_parser("bulk", help="single-item versus bulk incident ingest")
+    bulk_parser.add_argument("--url", default="http://localhost:8001")
+    bulk_parser.add_argument("--items", type=int, default=2000)
+    bulk_parser.add_argument("--batch", type=int, default=500)
+    bulk_parser.add_argument("--concurrency", type=int, default=20)
+    bulk_parser.set_defaults(run=bench_bulk)
+
+    suite_parser = subparsers.add_parser("suite", help="every route under load, app in-process on a synthetic dataset")
+    suite_parser.add_argument("--resources", type=int, default=10000)
+    suite_parser.add_argument("--incidents", type=int, default=10000)
+    suite_parser.add_argument("--outages", type=int, default=200)
+    suite_parser.add_argument("--mongo-url", help="run against this mongod instead of mongomock")
+    suite_parser.add_argument("--database", default="emergency_platform_bench", help="dropped and refilled by the suite")
+    suite_parser.add_argument("--concurrency", type=int, default=20)
+    suite_parser.add_argument("--requests", type=int, default=200, help="requests per light scenario")
+    suite_parser.add_argument("--heavy-requests", type=int, default=10, help="requests per full-collection scenario")
+    suite_parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    suite_parser.add_argument("--only", help="run only scenarios whose name contains this text")
+    suite_parser.set_defaults(run=bench_suite)
+
+    startup_parser = subparsers.add_parser("startup", help="cold-start time to first healthy response")
+    startup_parser.add_argument("--port", type=int, default=8011)
+    startup_parser.add_argument("--runs", type=int, default=5)
+    startup_parser.add_argument("--timeout", type=float, default=30.0)
+    startup_parser.add_argument("--seed-modes", default="off,if-empty,reset")
+    startup_parser.set_defaults(run=bench_startup)
+
+    scaling_parser = subparsers.add_parser("scaling", help="throughput as uvicorn workers are added (needs mongod)")
+    scaling_parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    scaling_parser.add_argument("--mongo-url", default="mongodb://localhost:27017/")
+    scaling_parser.add_argument("--port", type=int, default=8012)
+    scaling_parser.add_argument("--clients", type=int, default=2, help="load-generator processes")
+    scaling_parser.add_argument("--concurrency", type=int, default=32, help="connections per client process")
+    scaling_parser.add_argument("--duration", type=float, default=15.0)
+    scaling_parser.add_argument("--settle", type=float, default=3.0, help="seconds between ready and measuring")
+    scaling_parser.add_argument("--timeout", type=float, default=60.0)
+    scaling_parser.add_argument("--path", action="append", help="route to request (repeatable); defaults to a read mix")
+    scaling_parser.set_defaults(run=bench_scaling)
+
+    args = parser.parse_args()
+    exit_code, results = args.run(args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
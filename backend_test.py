@@ -1,9 +1,28 @@
 
 import requests
 import sys
+import os
 import json
+import uuid
 from datetime import datetime
 
+# Must match SEED_NAMESPACE in backend/server.py; seeded documents get
+# uuid5(SEED_NAMESPACE, name) as their id, so they can be found among
+# whatever earlier test runs have created
+SEED_NAMESPACE = uuid.UUID('5b0f6a8e-2c1d-4e3f-9a7b-6c5d4e3f2a1b')
+SEEDED_RESOURCES = [
+    "Central Generator Unit", "Hospital Backup Generator", "North Generator Station", "South Generator Hub",
+    "Industrial Generator", "Ichilov Hospital", "Hadassah Medical Center", "Rambam Health Care Campus",
+    "Soroka Medical Center", "Emergency Clinic Center", "Central Shelter Complex", "School Emergency Shelter",
+    "Community Center Shelter", "Underground Shelter", "Sports Hall Shelter", "Central Fire Station",
+    "North Fire Station", "South Fire Station", "Central Police Station", "District Police Station",
+    "Emergency Supply Center", "Water Distribution Point", "Mobile Supply Unit",
+]
+SEEDED_OUTAGES = ["Downtown Tel Aviv", "North Jerusalem"]
+
+def seed_id(name):
+    return str(uuid.uuid5(SEED_NAMESPACE, name))
+
 class EmergencyPlatformTester:
     def __init__(self, base_url):
         self.base_url = base_url
@@ -24,6 +43,8 @@ class EmergencyPlatformTester:
                 response = requests.get(url, headers=headers)
             elif method == 'POST':
                 response = requests.post(url, json=data, headers=headers)
+            elif method == 'DELETE':
+                response = requests.delete(url, headers=headers)
             
             # Check status code
             status_success = response.status_code == expected_status
@@ -112,10 +133,12 @@ class EmergencyPlatformTester:
         if success:
             resource_count = len(data.get("resources", []))
             print(f"✅ Resources endpoint returned {resource_count} resources")
-            if resource_count == 23:
-                print("✅ Expected 23 resources, got 23")
+            returned = {r.get("id") for r in data.get("resources", [])}
+            missing = [name for name in SEEDED_RESOURCES if seed_id(name) not in returned]
+            if not missing:
+                print(f"✅ All {len(SEEDED_RESOURCES)} seeded resources are present")
             else:
-                print(f"❌ Expected 23 resources, got {resource_count}")
+                print(f"❌ Seeded resources missing: {', '.join(missing)}")
                 success = False
         return success
 
@@ -157,6 +180,91 @@ class EmergencyPlatformTester:
         
         return success_generator and success_medical
 
+    def test_resources_geo_queries(self):
+        """Test bounding-box and nearest-N resource queries"""
+        # Tel Aviv viewport
+        success_bbox, data_bbox = self.run_test(
+            "Resources Geo - Bounding Box",
+            "GET",
+            "api/resources?bbox=34.75,32.05,34.80,32.10",
+            200
+        )
+        if success_bbox:
+            resources = data_bbox.get("resources", [])
+            print(f"✅ Bounding box returned {len(resources)} resources")
+            inside = all(32.05 <= r["lat"] <= 32.10 and 34.75 <= r["lng"] <= 34.80 for r in resources)
+            if inside and resources:
+                print("✅ All returned resources are inside the bounding box")
+            else:
+                print("❌ Bounding box returned no resources or resources outside it")
+                success_bbox = False
+
+        success_nearest, data_nearest = self.run_test(
+            "Resources Geo - Nearest",
+            "GET",
+            "api/resources?near=32.0853,34.7818&nearest=3&type=medical",
+            200
+        )
+        if success_nearest:
+            resources = data_nearest.get("resources", [])
+            distances = [r.get("distance_m", 0) for r in resources]
+            if len(resources) == 3 and distances == sorted(distances):
+                print("✅ Nearest returned 3 medical resources ordered by distance")
+            else:
+                print(f"❌ Expected 3 resources ordered by distance, got {distances}")
+                success_nearest = False
+
+        return success_bbox and success_nearest
+
+    def test_resources_pagination(self):
+        """Test cursor pagination with a field projection"""
+        resource_ids = []
+        cursor = None
+        pages = 0
+        success = True
+        while True:
+            endpoint = "api/resources?limit=10&fields=id,lat,lng,type,status,priority"
+            if cursor:
+                endpoint += f"&cursor={cursor}"
+            page_success, data = self.run_test(f"Resources Pagination - Page {pages + 1}", "GET", endpoint, 200)
+            if not page_success:
+                return False
+            pages += 1
+            for resource in data.get("resources", []):
+                resource_ids.append(resource["id"])
+                if set(resource) != {"id", "lat", "lng", "type", "status", "priority"}:
+                    print(f"❌ Unexpected fields in projected resource: {sorted(resource)}")
+                    success = False
+            cursor = data.get("next_cursor")
+            if not cursor:
+                break
+
+        if len(resource_ids) == len(set(resource_ids)) and len(resource_ids) >= 23:
+            print(f"✅ Walked {len(resource_ids)} resources over {pages} pages without duplicates")
+        else:
+            print(f"❌ Pagination returned {len(resource_ids)} ids, {len(set(resource_ids))} unique")
+            success = False
+        return success
+
+    def test_map_clusters(self):
+        """Test that the world tile clusters every resource and tiles split it consistently"""
+        success, stats_data = self.run_test("Clusters - Statistics", "GET", "api/statistics", 200)
+        if not success:
+            return False
+        success, world = self.run_test("Clusters - Tile 0/0/0", "GET", "api/tiles/0/0/0", 200)
+        if not success:
+            return False
+        world_count = sum(cluster["count"] for cluster in world["clusters"])
+        success, israel = self.run_test("Clusters - Israel at zoom 8", "GET", "api/clusters?bbox=34.2,29.4,35.9,33.4&zoom=8", 200)
+        if not success:
+            return False
+        israel_count = sum(cluster["count"] for cluster in israel["clusters"])
+        if world_count == stats_data["total_resources"] and 0 < israel_count <= world_count:
+            print(f"✅ {world_count} resources in the world tile, {israel_count} in {len(israel['clusters'])} clusters over Israel")
+            return True
+        print(f"❌ World tile has {world_count} resources (expected {stats_data['total_resources']}), Israel {israel_count}")
+        return False
+
     def test_statistics_endpoint(self):
         """Test the statistics endpoint"""
         success, data = self.run_test(
@@ -201,10 +309,29 @@ class EmergencyPlatformTester:
         if success:
             outage_count = len(data.get("outages", []))
             print(f"✅ Power outages endpoint returned {outage_count} outages")
-            if outage_count == 2:
-                print("✅ Expected 2 power outages, got 2")
+            returned = {o.get("id") for o in data.get("outages", [])}
+            missing = [name for name in SEEDED_OUTAGES if seed_id(name) not in returned]
+            if not missing:
+                print(f"✅ All {len(SEEDED_OUTAGES)} seeded power outages are present")
             else:
-                print(f"❌ Expected 2 power outages, got {outage_count}")
+                print(f"❌ Seeded power outages missing: {', '.join(missing)}")
+                success = False
+        return success
+
+    def test_power_outage_affected(self):
+        """Test the resources/incidents inside active outages endpoint"""
+        success, data = self.run_test(
+            "Power Outages Affected",
+            "GET",
+            "api/power-outages/affected",
+            200
+        )
+        if success:
+            outages = data.get("outages", [])
+            affected = sum(len(o.get("resources", [])) for o in outages)
+            print(f"✅ {len(outages)} active outages cover {affected} resources")
+            if not outages or not affected:
+                print("❌ Expected the sample outages to cover some resources")
                 success = False
         return success
 
@@ -248,6 +375,359 @@ class EmergencyPlatformTester:
         
         return success
 
+    def test_incident_dedup(self):
+        """Test that a second nearby report of the same incident is merged into the first"""
+        report = {
+            "title": "Dedup probe fire",
+            "title_he": "שריפה לבדיקה",
+            "description": "Reported twice from nearby",
+            "description_he": "דווח פעמיים",
+            "lat": 29.5581,
+            "lng": 34.9482,
+            "type": "fire",
+        }
+        success, first = self.run_test("Dedup - First Report", "POST", "api/incidents", 200, None, report)
+        if not success:
+            return False
+        success, second = self.run_test("Dedup - Nearby Report", "POST", "api/incidents", 200, None, {**report, "lat": 29.5584})
+        if not success:
+            return False
+        if second["id"] == first["id"] and second["report_count"] == first["report_count"] + 1:
+            print(f"✅ Merged into incident {first['id']} ({second['report_count']} reports)")
+            return True
+        print(f"❌ Second report stored separately: {first['id']} vs {second['id']}")
+        return False
+
+    def test_nearest_resources(self):
+        """Test nearest-resource ranking for a single incident and in batch mode"""
+        success, data = self.run_test("Nearest - Incidents", "GET", "api/incidents?limit=1", 200)
+        if not success or not data["incidents"]:
+            print("❌ No incident to rank resources for")
+            return False
+        incident_id = data["incidents"][0]["id"]
+        success, single = self.run_test(
+            "Nearest - Single Incident", "GET", f"api/incidents/{incident_id}/nearest-resources?type=shelter&k=3", 200
+        )
+        if not success:
+            return False
+        distances = [resource["distance_m"] for resource in single["resources"]]
+        if distances != sorted(distances) or any(r["type"] != "shelter" or r["status"] != "active" for r in single["resources"]):
+            print(f"❌ Unexpected ranking: {single['resources']}")
+            return False
+        success, batch = self.run_test(
+            "Nearest - Batch", "POST", "api/incidents/nearest-resources", 200, None,
+            {"incident_ids": [incident_id, "missing-incident"], "type": "shelter", "k": 3},
+        )
+        if not success:
+            return False
+        if batch["results"][0]["resources"] == single["resources"] and batch["not_found"] == ["missing-incident"]:
+            print(f"✅ Nearest shelters at {distances} m, batch mode agrees")
+            return True
+        print(f"❌ Batch result differs from the single-incident one: {batch}")
+        return False
+
+    def test_delta_sync(self):
+        """Test that /api/changes returns exactly the writes made after `since`"""
+        success, data = self.run_test("Changes - Current Head", "GET", "api/changes?limit=1", 200)
+        if not success:
+            return False
+        head = data["next_since"]
+        while data.get("has_more"):
+            success, data = self.run_test("Changes - Catch Up", "GET", f"api/changes?since={head}", 200)
+            if not success:
+                return False
+            head = data["next_since"]
+
+        resource = {"name": "Sync Probe", "name_he": "בדיקת סנכרון", "type": "supply", "lat": 32.08, "lng": 34.78}
+        success, created = self.run_test("Changes - Create Resource", "POST", "api/resources", 200, None, resource)
+        if not success:
+            return False
+        success, _ = self.run_test("Changes - Delete Resource", "DELETE", f"api/resources/{created['id']}", 200)
+        if not success:
+            return False
+
+        success, data = self.run_test("Changes - Since Head", "GET", f"api/changes?since={head}", 200)
+        if not success:
+            return False
+        deleted_ids = [tombstone["id"] for tombstone in data["deleted"]]
+        upserted_ids = [doc["id"] for doc in data["resources"]]
+        if created["id"] in deleted_ids and created["id"] not in upserted_ids and data["next_since"] > head:
+            print(f"✅ Delta since {head} reports the deletion and advances to {data['next_since']}")
+            return True
+        print(f"❌ Unexpected delta since {head}: resources={upserted_ids} deleted={deleted_ids}")
+        return False
+
+    def test_incident_rollups(self):
+        """Test that a new incident shows up in the time series and heatmap rollups"""
+        success, before = self.run_test("Rollups - Time Series Before", "GET", "api/incidents/timeseries?by=&interval=day", 200)
+        if not success:
+            return False
+        incident = {
+            "title": "Rollup Probe", "title_he": "בדיקת צבירה", "description": "Rollup probe",
+            "description_he": "בדיקת צבירה", "type": "rollup-probe", "lat": 31.25, "lng": 34.79,
+        }
+        success, _ = self.run_test("Rollups - Create Incident", "POST", "api/incidents", 200, None, incident)
+        if not success:
+            return False
+        success, after = self.run_test("Rollups - Time Series After", "GET", "api/incidents/timeseries?by=&interval=day", 200)
+        if not success:
+            return False
+        success, heatmap = self.run_test("Rollups - Heatmap", "GET", "api/incidents/heatmap?precision=4&type=rollup-probe", 200)
+        if not success:
+            return False
+        added = after["buckets"][-1]["incidents"] - before["buckets"][-1]["incidents"]
+        if added >= 1 and heatmap["cells"]:
+            print(f"✅ Today's bucket grew by {added}; heatmap cell {heatmap['cells'][0]['geohash']}")
+            return True
+        print(f"❌ Rollups did not pick up the new incident (added={added}, cells={heatmap['cells']})")
+        return False
+
+    def test_bulk_ingest(self):
+        """Test per-item results of NDJSON and JSON-array bulk uploads, and the item limit"""
+        self.tests_run += 1
+        print(f"\n🔍 Testing Bulk Ingest...")
+        ndjson = {"Content-Type": "application/x-ndjson"}
+        resource = {"name": "Bulk Probe", "name_he": "בדיקת העלאה", "type": "supply", "lat": 32.06, "lng": 34.77}
+        lines = [json.dumps(resource), "{not json", json.dumps({"name": "Missing fields"}), json.dumps({**resource, "name": "Bulk Probe 2"})]
+        problems = []
+
+        response = requests.post(f"{self.base_url}/api/resources:bulk", data="\n".join(lines).encode("utf-8"), headers=ndjson)
+        body = response.json() if response.status_code == 200 else {}
+        statuses = [(result["index"], result["status"]) for result in body.get("results", [])]
+        if (body.get("created"), body.get("failed")) != (2, 2) or statuses != [(0, "created"), (1, "error"), (2, "error"), (3, "created")]:
+            problems.append(f"NDJSON upload: {response.status_code} {body}")
+        for result in body.get("results", []):
+            if result["status"] == "created":
+                requests.delete(f"{self.base_url}/api/resources/{result['id']}")
+
+        incident = {"title": "Bulk probe", "title_he": "בדיקה", "description": "d", "description_he": "d", "lat": 29.9, "lng": 35.0, "type": "other"}
+        response = requests.post(f"{self.base_url}/api/incidents:bulk", json=[{"title": "Missing fields"}, incident])
+        body = response.json() if response.status_code == 200 else {}
+        statuses = [(result["index"], result["status"]) for result in body.get("results", [])]
+        # A rerun within the dedup window merges the probe into the previous run's incident
+        if body.get("failed") != 1 or statuses not in ([(0, "error"), (1, "created")], [(0, "error"), (1, "merged")]):
+            problems.append(f"JSON array upload: {response.status_code} {body}")
+
+        # Valid items over the limit: the whole upload is refused and nothing is stored
+        max_items = int(os.environ.get("BULK_MAX_ITEMS", "10000"))
+        before = requests.get(f"{self.base_url}/api/statistics").json()["total_resources"]
+        oversized = "\n".join([json.dumps({**resource, "name": "Bulk Overflow"})] * (max_items + 1)).encode("utf-8")
+        response = requests.post(f"{self.base_url}/api/resources:bulk", data=oversized, headers=ndjson)
+        after = requests.get(f"{self.base_url}/api/statistics").json()["total_resources"]
+        if response.status_code != 413 or after != before:
+            problems.append(f"{max_items + 1} items: expected 413 storing nothing, got {response.status_code} storing {after - before}")
+
+        if problems:
+            for problem in problems:
+                print(f"❌ {problem}")
+            self.test_results.append({"name": "Bulk Ingest", "success": False, "error": "; ".join(problems)})
+            return False
+        print(f"✅ Mixed uploads report per-item results in order; {max_items + 1} items get 413 and store nothing")
+        self.tests_passed += 1
+        self.test_results.append({"name": "Bulk Ingest", "success": True})
+        return True
+
+    def test_conditional_get(self):
+        """Test ETag revalidation of a cached route, with and without compression, and invalidation by a write"""
+        self.tests_run += 1
+        print(f"\n🔍 Testing Conditional GET...")
+        url = f"{self.base_url}/api/resources"
+        identity = {"Accept-Encoding": "identity"}
+        gzip = {"Accept-Encoding": "gzip"}
+        problems = []
+
+        first = requests.get(url, headers=identity)
+        etag = first.headers.get("ETag", "")
+        if first.status_code != 200 or not etag or etag.startswith("W/"):
+            problems.append(f"first GET: {first.status_code} with ETag {etag!r}")
+        revalidated = requests.get(url, headers={**identity, "If-None-Match": etag})
+        if revalidated.status_code != 304 or revalidated.content:
+            problems.append(f"revalidation: {revalidated.status_code} with {len(revalidated.content)} body bytes")
+
+        compressed = requests.get(url, headers=gzip)
+        weak = compressed.headers.get("ETag", "")
+        if compressed.headers.get("Content-Encoding") != "gzip" or weak != f"W/{etag}":
+            problems.append(f"compressed GET: encoding {compressed.headers.get('Content-Encoding')!r}, ETag {weak!r}")
+        revalidated = requests.get(url, headers={**gzip, "If-None-Match": weak})
+        if revalidated.status_code != 304 or revalidated.content:
+            problems.append(f"weak revalidation: {revalidated.status_code} with {len(revalidated.content)} body bytes")
+
+        resource = {"name": "ETag Probe", "name_he": "בדיקת ETag", "type": "supply", "lat": 32.07, "lng": 34.79}
+        created = requests.post(url, json=resource).json()
+        after_write = requests.get(url, headers={**identity, "If-None-Match": etag})
+        if after_write.status_code != 200 or after_write.headers.get("ETag") in (None, etag):
+            problems.append(f"after POST: {after_write.status_code} with ETag {after_write.headers.get('ETag')!r}")
+        requests.delete(f"{url}/{created['id']}")
+
+        if problems:
+            for problem in problems:
+                print(f"❌ {problem}")
+            self.test_results.append({"name": "Conditional GET", "success": False, "error": "; ".join(problems)})
+            return False
+        print(f"✅ 304 for {etag} and {weak}, new ETag after a write")
+        self.tests_passed += 1
+        self.test_results.append({"name": "Conditional GET", "success": True})
+        return True
+
+    def test_metrics(self):
+        """Test that /metrics reports the requests made so far under their route templates"""
+        self.tests_run += 1
+        print(f"\n🔍 Testing Prometheus Metrics...")
+        response = requests.get(f"{self.base_url}/metrics")
+        expected = ['route="/api/resources"', 'route="/api/resources/{resource_id}"', "event_loop_lag_seconds", "response_cache_hits_total"]
+        missing = [text for text in expected if text not in response.text]
+        if response.status_code == 200 and not missing:
+            self.tests_passed += 1
+            print(f"✅ /metrics exposes {len(response.text.splitlines())} lines")
+            return True
+        print(f"❌ /metrics returned {response.status_code}, missing {missing}")
+        self.test_results.append({"name": "Prometheus Metrics", "success": False, "error": f"missing {missing}"})
+        return False
+
+    def test_query_plans(self):
+        """Explain the hot route queries against MONGO_URL and fail on any COLLSCAN"""
+        mongo_url = os.environ.get("MONGO_URL")
+        if not mongo_url:
+            print("⏭️  MONGO_URL not set, skipping query plan check")
+            return True
+
+        from pymongo import MongoClient
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+        import indexes
+
+        self.tests_run += 1
+        print("\n🔍 Testing Query Plans...")
+        client = MongoClient(mongo_url, serverSelectionTimeoutMS=5000)
+        try:
+            violations = indexes.check_query_plans(client.emergency_platform)
+        except Exception as e:
+            violations = [f"explain failed: {e}"]
+        finally:
+            client.close()
+
+        if violations:
+            for violation in violations:
+                print(f"❌ {violation}")
+            self.test_results.append({
+                "name": "Query Plans",
+                "success": False,
+                "error": f"{len(violations)} route queries fall back to COLLSCAN"
+            })
+            return False
+
+        print(f"✅ All {len(indexes.ROUTE_QUERIES)} route queries use an index")
+        self.tests_passed += 1
+        self.test_results.append({"name": "Query Plans", "success": True})
+        return True
+
+    def test_write_behind_recovery(self):
+        """Crash write-behind queues against MONGO_URL and check recovery loses and duplicates nothing"""
+        mongo_url = os.environ.get("MONGO_URL")
+        if not mongo_url:
+            print("⏭️  MONGO_URL not set, skipping write-behind recovery check")
+            return True
+
+        import asyncio
+        import subprocess
+        import tempfile
+        from motor.motor_asyncio import AsyncIOMotorClient
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+        import dedup
+        import writebehind
+
+        def crash(queue):
+            # Whatever reached the journal stays; nothing else is flushed
+            queue._journal.close()
+            queue._journal = None
+
+        async def scenario(db, base_path):
+            await db.incidents.create_index("id", unique=True)
+            docs = [{"id": f"wb-{n}", "n": n} for n in range(12)]
+
+            # A worker that flushed wb-0..2 (compacting its journal down to
+            # wb-3..5) and crashed mid-flush, after inserting wb-3 and wb-4
+            # but before checkpointing them
+            crashed = writebehind.WriteBehindQueue(db, f"{base_path}.{os.getpid()}", batch_size=3, compact_bytes=1, fsync=False)
+            await crashed.recover()
+            for doc in docs[:6]:
+                await crashed.submit("incidents", doc)
+            await crashed._flush_batch()
+            await db.incidents.insert_many([dict(doc) for doc in docs[3:5]])
+            crash(crashed)
+
+            # Another worker's journal, left behind by a process that has exited
+            exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+            orphan = writebehind.WriteBehindQueue(db, f"{base_path}.{exited.stdout.strip()}", fsync=False)
+            await orphan.recover()
+            for doc in docs[6:10]:
+                await orphan.submit("incidents", doc)
+            crash(orphan)
+
+            # The restarted worker replays its own journal and adopts the orphan
+            flushed = dedup.IncidentDeduplicator()
+            announced = []
+
+            def on_flushed(collection, documents):
+                for doc in documents:
+                    announced.append(doc["id"])
+                    flushed.end_insert(doc["id"])
+
+            queue = writebehind.WriteBehindQueue(db, f"{base_path}.{os.getpid()}", fsync=False)
+            queue.on_flushed = on_flushed
+            recovered = await queue.recover(writebehind.orphaned_journals(base_path))
+
+            # Duplicates of a queued report wait until its flush has inserted it
+            flushed.begin_insert(docs[10]["id"])
+            await queue.submit("incidents", docs[10])
+            waiter = asyncio.ensure_future(flushed.inserted(docs[10]["id"]))
+            await asyncio.sleep(0.05)
+            waited = not waiter.done()
+            await queue.submit("incidents", docs[11])
+            await queue.close()
+            await asyncio.wait_for(waiter, 1)
+
+            stored = [doc["id"] async for doc in db.incidents.find({}, {"id": 1})]
+            return {
+                "recovered": recovered,
+                "missing": sorted({doc["id"] for doc in docs} - set(stored)),
+                "duplicates": len(stored) - len(set(stored)),
+                # wb-3 and wb-4 were stored before the crash and must not be announced again
+                "announced": sorted(announced, key=lambda id: int(id.split("-")[1])),
+                "leftover_journals": os.listdir(os.path.dirname(base_path)),
+                "waited_for_flush": waited,
+            }
+
+        async def run(directory):
+            client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
+            database = "emergency_platform_write_behind_check"
+            try:
+                await client.drop_database(database)
+                return await scenario(client[database], os.path.join(directory, "write-behind.journal"))
+            finally:
+                await client.drop_database(database)
+                client.close()
+
+        self.tests_run += 1
+        print("\n🔍 Testing Write-Behind Recovery...")
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                result = asyncio.run(run(directory))
+        except Exception as e:
+            result = {"error": str(e)}
+
+        expected = {
+            "recovered": 7, "missing": [], "duplicates": 0, "leftover_journals": [], "waited_for_flush": True,
+            "announced": [f"wb-{n}" for n in range(5, 12)],
+        }
+        if result == expected:
+            print("✅ 7 journalled writes recovered (3 own, 4 adopted) with no loss or duplicates, only new ones announced")
+            self.tests_passed += 1
+            self.test_results.append({"name": "Write-Behind Recovery", "success": True})
+            return True
+        print(f"❌ Unexpected recovery result: {result}")
+        self.test_results.append({"name": "Write-Behind Recovery", "success": False, "error": str(result)})
+        return False
+
     def run_all_tests(self):
         """Run all API tests"""
         print("🚀 Starting Emergency Platform API Tests")
@@ -259,10 +739,23 @@ class EmergencyPlatformTester:
             self.test_health_endpoint,
             self.test_resources_endpoint,
             self.test_resources_filtering,
+            self.test_resources_geo_queries,
+            self.test_resources_pagination,
+            self.test_map_clusters,
             self.test_statistics_endpoint,
             self.test_incidents_endpoint,
             self.test_power_outages_endpoint,
-            self.test_resource_creation
+            self.test_power_outage_affected,
+            self.test_resource_creation,
+            self.test_incident_dedup,
+            self.test_nearest_resources,
+            self.test_delta_sync,
+            self.test_incident_rollups,
+            self.test_bulk_ingest,
+            self.test_conditional_get,
+            self.test_metrics,
+            self.test_query_plans,
+            self.test_write_behind_recovery
         ]
         
         for test in tests: